@@ -10,13 +10,19 @@ from controllers import (
     subscription_controller,
     users_dashboard_controller,
     admin_controller,  
-    user_company_controller 
+    user_company_controller,
+    metrics_controller,
 )
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from core.database import execute_sql_from_file, get_database
+from core.database import execute_sql_from_file, init_pool, close_pool
+from core.executor import init_process_pool, shutdown_process_pool
+from core.auth import close_user_events
+from core.security import shutdown_hash_pool
+from core.events import close_status_events
+from middlewares.TimingMiddleware import TimingMiddleware
 import os
 import logging
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -32,7 +38,16 @@ async def lifespan(app: FastAPI):
     # Update this path as needed
     # await execute_sql_from_file()
     print("Starting up...")
-    yield
+    await init_pool()
+    init_process_pool()
+    try:
+        yield
+    finally:
+        await close_status_events()
+        await close_user_events()
+        shutdown_hash_pool()
+        await shutdown_process_pool()
+        await close_pool()
 
 
 app = FastAPI(
@@ -65,7 +80,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
+# Added last so it wraps CORS and times the whole request
+app.add_middleware(TimingMiddleware)
 
 MAX_FILE_SIZE = 10 * 1024 * 1024
 UPLOAD_DIRECTORY = "uploads"  # Store uploaded files
@@ -89,3 +107,4 @@ app.include_router(users_dashboard_controller.router)
 app.include_router(admin_controller.router)
 app.include_router(company_controller.router)
 app.include_router(user_company_controller.router)
+app.include_router(metrics_controller.router)
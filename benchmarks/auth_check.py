@@ -0,0 +1,196 @@
+"""
+End-to-end check that cached bearer tokens follow changes to their user.
+
+Starts a throwaway PostgreSQL database and app:app under uvicorn with
+several workers, as benchmarks.loadtest does, logs a fresh user in and
+then, over a new connection per request so every worker answers some:
+
+    GET    /auth/me         warms each worker's token cache
+    POST   /user-company/   the company must show in /auth/me everywhere
+    PUT    /user-company/   so must the company the user is moved to
+    DELETE /user-company/   and its removal
+    PUT    /users/{id}      the new name must show in /auth/me everywhere
+    DELETE /users/{id}      /auth/me must answer 401 everywhere
+
+A wrong password must also be refused at /auth/login.
+
+    python -m benchmarks.auth_check --workers 2
+    python -m benchmarks.auth_check --use-server
+
+Prints each failed expectation on stderr and exits with status 1 if any
+failed.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+import asyncpg
+import httpx
+from benchmarks.loadtest import PASSWORD, seed, serve_app
+from benchmarks.local_postgres import throwaway_database
+
+EMAIL = "auth-check@example.com"
+# Other workers see invalidations through LISTEN/NOTIFY, shortly after
+# the request that caused them has returned
+NOTIFY_GRACE = 0.5
+
+
+async def add_user(settings: Dict[str, str]) -> Tuple[int, List[int]]:
+    """
+    Adds the user to log in as and two companies; returns their ids.
+    """
+    from core.security import hash_password
+
+    conn = await asyncpg.connect(
+        host=settings["POSTGRES_HOST"],
+        port=int(settings["POSTGRES_PORT"]),
+        user=settings["POSTGRES_USER"],
+        password=settings["POSTGRES_PASSWORD"],
+        database=settings["POSTGRES_DB"],
+    )
+    try:
+        user_id = await conn.fetchval(
+            """
+            INSERT INTO "user" (email, password_hash, firstname, lastname, role)
+            VALUES ($1, $2, 'Auth', 'Check', 'user')
+            RETURNING id
+            """,
+            EMAIL,
+            hash_password(PASSWORD),
+        )
+        companies = await conn.fetch(
+            """
+            INSERT INTO company (name)
+            SELECT 'Auth Check ' || i FROM generate_series(1, 2) AS i
+            RETURNING id
+            """
+        )
+        return user_id, [row["id"] for row in companies]
+    finally:
+        await conn.close()
+
+
+async def _me(base_url: str, headers: Dict[str, str], requests: int) -> List[httpx.Response]:
+    responses = []
+    for _ in range(requests):
+        # A new connection each time, so the requests spread over workers
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            responses.append(await client.get("/auth/me", headers=headers))
+    return responses
+
+
+def _seen(responses: List[httpx.Response], field: str) -> set:
+    return {r.json()[field] if r.status_code == 200 else r.status_code for r in responses}
+
+
+async def check(
+    base_url: str, user_id: int, company_ids: List[int], requests: int
+) -> List[str]:
+    failures = []
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        r = await client.post("/auth/login", json={"email": EMAIL, "password": "wrong"})
+        if r.status_code != 401:
+            failures.append(f"login with a wrong password returned {r.status_code}")
+        r = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+        if r.status_code != 200:
+            return failures + [f"login returned {r.status_code}"]
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        seen = _seen(await _me(base_url, headers, requests), "firstname")
+        if seen != {"Auth"}:
+            failures.append(f"/auth/me before the update returned {seen}")
+
+        first, second = company_ids
+        r = await client.post(
+            "/user-company/", json={"user_id": user_id, "company_id": first}
+        )
+        if r.status_code != 201:
+            return failures + [f"POST /user-company/ returned {r.status_code}"]
+        link_id = r.json()["id"]
+        steps = [
+            ("joining a company", None, first),
+            ("moving company", "put", second),
+            ("leaving the company", "delete", None),
+        ]
+        for step, method, expected in steps:
+            if method == "put":
+                r = await client.put(
+                    "/user-company/",
+                    params={"user_company_id": link_id},
+                    json={"user_id": user_id, "company_id": expected},
+                )
+            elif method == "delete":
+                r = await client.delete(
+                    "/user-company/", params={"user_company_id": link_id}
+                )
+            if r.status_code >= 300:
+                return failures + [f"{step} returned {r.status_code}"]
+            await asyncio.sleep(NOTIFY_GRACE)
+            seen = _seen(await _me(base_url, headers, requests), "company_id")
+            if seen != {expected}:
+                failures.append(f"/auth/me after {step} returned company {seen}")
+
+        r = await client.put(
+            f"/users/{user_id}",
+            json={
+                "email": EMAIL,
+                "password": PASSWORD,
+                "firstname": "Renamed",
+                "lastname": "Check",
+            },
+        )
+        if r.status_code != 200:
+            return failures + [f"PUT /users/{user_id} returned {r.status_code}"]
+        await asyncio.sleep(NOTIFY_GRACE)
+        seen = _seen(await _me(base_url, headers, requests), "firstname")
+        if seen != {"Renamed"}:
+            failures.append(f"/auth/me after the update returned {seen}")
+
+        r = await client.delete(f"/users/{user_id}")
+        if r.status_code != 204:
+            return failures + [f"DELETE /users/{user_id} returned {r.status_code}"]
+        await asyncio.sleep(NOTIFY_GRACE)
+        seen = _seen(await _me(base_url, headers, requests), "firstname")
+        if seen != {401}:
+            failures.append(f"/auth/me after the delete returned {seen}")
+    return failures
+
+
+async def run(args) -> List[str]:
+    async with throwaway_database(args.pg_bin, args.use_server) as settings:
+        await seed(settings, 0)
+        user_id, company_ids = await add_user(settings)
+        env = {**os.environ, **settings}
+        env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+        async with serve_app(env, args.workers, args.server_logs) as base_url:
+            return await check(base_url, user_id, company_ids, args.requests)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2, help="uvicorn worker processes")
+    parser.add_argument(
+        "--requests", type=int, default=20, help="/auth/me requests per step"
+    )
+    parser.add_argument("--pg-bin", help="directory holding initdb and pg_ctl")
+    parser.add_argument(
+        "--use-server",
+        action="store_true",
+        help="create the throwaway database on the POSTGRES_* server instead",
+    )
+    parser.add_argument("--server-logs", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    failures = asyncio.run(run(args))
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+    print("auth cache check passed", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
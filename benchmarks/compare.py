@@ -0,0 +1,71 @@
+"""
+Compares two benchmarks.pipeline_benchmark result files.
+
+    python -m benchmarks.compare base.json head.json --threshold 0.10
+
+Prints the best wall time and peak pool RSS of every case in both runs
+and the relative change. The minimum over the repeats is compared since
+it is the least noisy figure. Exits with status 1 if any case got slower
+by more than the threshold (and by more than --min-delta seconds, so
+millisecond jitter on tiny documents is ignored); this can gate a CI job.
+"""
+import argparse
+import json
+import sys
+
+
+def _index(report: dict) -> dict:
+    return {(row["case"], row["target"]): row for row in report["results"]}
+
+
+def compare(base: dict, head: dict, threshold: float, min_delta: float) -> list:
+    """
+    Returns (case, target, base seconds, head seconds, change, regressed)
+    for every case present in both reports.
+    """
+    base_rows, head_rows = _index(base), _index(head)
+    rows = []
+    for key in base_rows:
+        if key not in head_rows:
+            continue
+        before = base_rows[key]["wall_seconds_min"]
+        after = head_rows[key]["wall_seconds_min"]
+        change = (after - before) / before if before else 0.0
+        regressed = change > threshold and after - before > min_delta
+        rows.append((*key, before, after, change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument("--min-delta", type=float, default=0.005)
+    args = parser.parse_args()
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    print(f"base {base['meta'].get('commit')}  head {head['meta'].get('commit')}")
+    machine = ("machine", "cpus", "pdf_process_workers")
+    if any(base["meta"].get(key) != head["meta"].get(key) for key in machine):
+        print("warning: results come from different setups", file=sys.stderr)
+    rows = compare(base, head, args.threshold, args.min_delta)
+    head_rows = _index(head)
+    base_rows = _index(base)
+    for case, target, before, after, change, regressed in rows:
+        rss_before = base_rows[(case, target)]["peak_rss_mb"]["pool"]
+        rss_after = head_rows[(case, target)]["peak_rss_mb"]["pool"]
+        print(
+            f"{case:<16} {target:<10} {before:8.3f}s -> {after:8.3f}s "
+            f"{change:+7.1%}  pool RSS {rss_before:7.1f} -> {rss_after:7.1f} MB"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+    if any(row[-1] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
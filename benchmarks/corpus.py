@@ -0,0 +1,185 @@
+"""
+Synthetic PDF corpus for the benchmarks.
+
+generate_pdf writes a deterministic document (same spec and seed, same
+bytes) whose size and content can be dialled to exercise each part of
+the pipeline: a dotted-leader TOC page for the TOC strategy, numbered
+headings for the bullet strategy, plain larger-font headings for the
+font-size strategy, and images, links, annotations and a mix of fonts
+for QC.
+
+    python -m benchmarks.corpus out.pdf --pages 500 --images 1 --links 2
+"""
+import argparse
+import random
+from dataclasses import asdict, dataclass
+from typing import List, Tuple
+import pymupdf
+
+# Base-14 fonts, so nothing is embedded and generation stays fast
+BASE_FONTS = ("helv", "tiro", "cour")
+# MuPDF's built-in CJK font, embedded; QC reports it as non-standard
+CJK_FONT = "china-s"
+
+BODY_SIZE = 10
+HEADING_SIZES = (18, 15, 12.5)
+LINE_HEIGHT = 14
+MARGIN = 56
+# Headings per page; every page starts with one
+HEADINGS_PER_PAGE = 2
+WORDS = (
+    "analysis subject protocol dose study report safety efficacy patient "
+    "endpoint sample visit adverse event baseline cohort randomised period"
+).split()
+
+
+@dataclass
+class CorpusSpec:
+    pages: int = 100
+    # Body text fonts, cycled per paragraph; BASE_FONTS codes or CJK_FONT
+    fonts: Tuple[str, ...] = BASE_FONTS
+    images_per_page: int = 0
+    links_per_page: int = 0
+    annotations_per_page: int = 0
+    # Number headings "2.3 Title" (bullet strategy) or leave them plain
+    # so only their size marks them (font-size strategy)
+    numbered_headings: bool = True
+    # Start with a dotted-leader table of contents page
+    toc_page: bool = False
+    seed: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _outline(spec: CorpusSpec) -> List[Tuple[int, str, int]]:
+    """
+    (level, title, 0-based page) of every heading, before any TOC page
+    is inserted: a chapter every eight pages, sections and subsections
+    in between.
+    """
+    headings = []
+    chapter = section = sub = 0
+    for page in range(spec.pages):
+        for slot in range(HEADINGS_PER_PAGE):
+            if page % 8 == 0 and slot == 0:
+                chapter, section, sub = chapter + 1, 0, 0
+                level, number = 1, f"{chapter}"
+            elif slot == 0 or section == 0:
+                section, sub = section + 1, 0
+                level, number = 2, f"{chapter}.{section}"
+            else:
+                sub += 1
+                level, number = 3, f"{chapter}.{section}.{sub}"
+            title = f"Section {number} {WORDS[(page + slot) % len(WORDS)].title()}"
+            if spec.numbered_headings:
+                title = f"{number} {title}"
+            headings.append((level, title, page))
+    return headings
+
+
+def _noise_image(rng: random.Random, size: int = 64) -> pymupdf.Pixmap:
+    samples = bytes(rng.getrandbits(8) for _ in range(size * size * 3))
+    return pymupdf.Pixmap(pymupdf.csRGB, size, size, samples, False)
+
+
+def _write_toc_page(doc: pymupdf.Document, headings, offset: int):
+    page = doc.new_page(0)
+    page.insert_text((MARGIN, MARGIN), "Table of Contents", fontsize=HEADING_SIZES[0])
+    y = MARGIN + 2 * LINE_HEIGHT
+    for level, title, number in headings:
+        if level > 2:
+            continue
+        if y > page.rect.height - MARGIN:
+            break
+        # TOC page numbers are 1-based and count the TOC page itself
+        line = f"{title} {'.' * 20} {number + offset + 1}"
+        page.insert_text((MARGIN + 12 * (level - 1), y), line, fontsize=BODY_SIZE)
+        y += LINE_HEIGHT
+
+
+def generate_pdf(path: str, spec: CorpusSpec) -> dict:
+    """
+    Writes the document described by spec to path and returns its page
+    and heading counts.
+    """
+    rng = random.Random(spec.seed)
+    headings = _outline(spec)
+    by_page: List[list] = [[] for _ in range(spec.pages)]
+    for level, title, page in headings:
+        by_page[page].append((level, title))
+    image = _noise_image(rng) if spec.images_per_page else None
+
+    doc = pymupdf.open()
+    for number in range(spec.pages):
+        page = doc.new_page()
+        width, height = page.rect.width, page.rect.height
+        y = MARGIN
+        paragraph = 0
+        for level, title in by_page[number]:
+            size = HEADING_SIZES[level - 1]
+            page.insert_text((MARGIN, y + size), title, fontsize=size, fontname="hebo")
+            y += size + LINE_HEIGHT
+            for _ in range(6):
+                font = spec.fonts[paragraph % len(spec.fonts)]
+                paragraph += 1
+                page.insert_text(
+                    (MARGIN, y + BODY_SIZE),
+                    _sentence(rng),
+                    fontsize=BODY_SIZE,
+                    fontname=font,
+                )
+                y += LINE_HEIGHT
+            y += LINE_HEIGHT
+        for i in range(spec.images_per_page):
+            x = MARGIN + i * 80
+            page.insert_image(pymupdf.Rect(x, height - 150, x + 64, height - 86), pixmap=image)
+        for i in range(spec.links_per_page):
+            rect = pymupdf.Rect(MARGIN, y + i * LINE_HEIGHT, width / 2, y + (i + 1) * LINE_HEIGHT)
+            page.insert_link(
+                {"kind": pymupdf.LINK_URI, "from": rect, "uri": f"https://example.com/{number}/{i}"}
+            )
+        for i in range(spec.annotations_per_page):
+            page.add_text_annot((width - MARGIN, MARGIN + i * 24), f"Note {number}.{i}")
+    if spec.toc_page:
+        _write_toc_page(doc, headings, offset=1)
+    # no_new_id keeps the trailer /ID out, so output depends on spec only
+    doc.save(path, garbage=1, deflate=True, no_new_id=True)
+    doc.close()
+    return {
+        "pages": spec.pages + (1 if spec.toc_page else 0),
+        "headings": len(headings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--fonts", default=",".join(BASE_FONTS))
+    parser.add_argument("--images", type=int, default=0)
+    parser.add_argument("--links", type=int, default=0)
+    parser.add_argument("--annotations", type=int, default=0)
+    parser.add_argument("--plain-headings", action="store_true")
+    parser.add_argument("--toc", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    spec = CorpusSpec(
+        pages=args.pages,
+        fonts=tuple(args.fonts.split(",")),
+        images_per_page=args.images,
+        links_per_page=args.links,
+        annotations_per_page=args.annotations,
+        numbered_headings=not args.plain_headings,
+        toc_page=args.toc,
+        seed=args.seed,
+    )
+    print(generate_pdf(args.path, spec))
+
+
+if __name__ == "__main__":
+    main()
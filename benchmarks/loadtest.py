@@ -0,0 +1,357 @@
+"""
+End-to-end HTTP load test of the API.
+
+Starts a throwaway PostgreSQL database (see benchmarks.local_postgres),
+loads core/scripts.sql into it (schema and subscription plans), seeds
+users with subscriptions and payments, boots app:app under uvicorn
+against it and drives a weighted mix of traffic from concurrent virtual
+users:
+
+    login       POST /auth/login
+    upload      POST /pdf/upload-pdf/ with several synthetic PDFs
+    getpds      GET  /pdf/getpds
+    dashboard   GET  /users-dashboard/* (one of the four counters)
+
+    python -m benchmarks.loadtest --workers 2 --concurrency 32 --duration 30
+    python -m benchmarks.loadtest --use-server --mix login=1,getpds=8
+
+Reports throughput and p50/p95/p99 latency per endpoint, as a table on
+stderr and optionally as JSON (-o), to size gunicorn workers and
+DB_POOL_* from data. Nothing runs the PDF job worker, so uploads only
+measure the API side.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncpg
+import httpx
+from benchmarks.corpus import CorpusSpec, generate_pdf
+from benchmarks.local_postgres import throwaway_database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "load-test-password"
+DASHBOARD_PATHS = (
+    "/users-dashboard/user-count",
+    "/users-dashboard/document-count",
+    "/users-dashboard/total-revenue",
+    "/users-dashboard/subscription-count",
+)
+DEFAULT_MIX = "login=1,upload=1,getpds=4,dashboard=4"
+
+
+async def seed(settings: Dict[str, str], users: int):
+    """
+    Loads the schema and plans from core/scripts.sql, then adds users
+    (all with PASSWORD), an active subscription and a payment for each.
+    """
+    from core.security import hash_password
+
+    with open(os.path.join(ROOT, "core", "scripts.sql"), encoding="utf-8") as f:
+        schema = f.read()
+    # One hash for everyone: bcrypt is deliberately slow
+    password_hash = hash_password(PASSWORD)
+    conn = await asyncpg.connect(
+        host=settings["POSTGRES_HOST"],
+        port=int(settings["POSTGRES_PORT"]),
+        user=settings["POSTGRES_USER"],
+        password=settings["POSTGRES_PASSWORD"],
+        database=settings["POSTGRES_DB"],
+    )
+    try:
+        await conn.execute(schema)
+        await conn.execute(
+            """
+            INSERT INTO "user" (email, password_hash, firstname, lastname, role, subscription_id)
+            SELECT 'load' || i || '@example.com', $1, 'Load', 'User ' || i, 'user',
+                   (SELECT id FROM subscription ORDER BY id OFFSET i % 3 LIMIT 1)
+            FROM generate_series(1, $2) AS i
+            """,
+            password_hash,
+            users,
+        )
+        await conn.execute(
+            """
+            INSERT INTO usersubscription (
+                user_id, subscription_id, stripe_customer_id, stripe_subscription_id,
+                status, start_date
+            )
+            SELECT id, subscription_id, 'cus_' || id, 'sub_' || id, 'active', NOW()
+            FROM "user"
+            """
+        )
+        await conn.execute(
+            """
+            INSERT INTO userpayment (
+                user_subscription_id, stripe_payment_id, amount, currency, status,
+                payment_date
+            )
+            SELECT us.id, 'pi_' || us.id, s.monthly_price, 'usd', 'succeeded', NOW()
+            FROM usersubscription us JOIN subscription s ON s.id = us.subscription_id
+            """
+        )
+    finally:
+        await conn.close()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(base_url: str, server: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+            try:
+                if (await client.get("/openapi.json")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise TimeoutError("uvicorn did not become ready")
+
+
+@asynccontextmanager
+async def serve_app(
+    env: Dict[str, str], workers: int = 1, server_logs: bool = False
+) -> AsyncIterator[str]:
+    """
+    Runs app:app under uvicorn on a free local port with env as its
+    environment and yields its base URL once it answers.
+    """
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=None if server_logs else subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        await _wait_ready(base_url, server)
+        yield base_url
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def make_uploads(folder: str, files: int, pages: int) -> List[Tuple[str, bytes]]:
+    uploads = []
+    for i in range(files):
+        path = os.path.join(folder, f"load-{i}.pdf")
+        generate_pdf(path, CorpusSpec(pages=pages, seed=i))
+        with open(path, "rb") as f:
+            uploads.append((os.path.basename(path), f.read()))
+    return uploads
+
+
+class Traffic:
+    def __init__(self, client: httpx.AsyncClient, users: int, uploads, seed: int):
+        self.client = client
+        self.users = users
+        self.uploads = uploads
+        self.rng = random.Random(seed)
+        # endpoint -> [(seconds, status)]
+        self.samples: Dict[str, List[Tuple[float, int]]] = defaultdict(list)
+
+    async def _timed(self, endpoint: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        self.samples[endpoint].append((time.perf_counter() - start, status))
+
+    async def login(self):
+        user = self.rng.randint(1, self.users)
+        await self._timed(
+            "POST /auth/login",
+            "POST",
+            "/auth/login",
+            json={"email": f"load{user}@example.com", "password": PASSWORD},
+        )
+
+    async def upload(self):
+        # Each request creates new rows, so getpds sees a growing table
+        files = [
+            ("files", (f"{self.rng.getrandbits(32):08x}-{name}", data, "application/pdf"))
+            for name, data in self.uploads
+        ]
+        await self._timed(
+            "POST /pdf/upload-pdf/",
+            "POST",
+            "/pdf/upload-pdf/",
+            data={"user_id": str(self.rng.randint(1, self.users))},
+            files=files,
+        )
+
+    async def getpds(self):
+        await self._timed("GET /pdf/getpds", "GET", "/pdf/getpds", params={"limit": 50})
+
+    async def dashboard(self):
+        path = self.rng.choice(DASHBOARD_PATHS)
+        await self._timed(f"GET {path}", "GET", path)
+
+    async def virtual_user(self, mix: Dict[str, int], deadline: float):
+        scenarios = [getattr(self, name) for name in mix]
+        weights = list(mix.values())
+        while time.monotonic() < deadline:
+            await self.rng.choices(scenarios, weights)[0]()
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    # Nearest-rank, so small samples report an observed latency
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(q / 100 * len(sorted_values) + 0.5))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples: Dict[str, List[Tuple[float, int]]], elapsed: float) -> List[dict]:
+    rows = []
+    everything = [sample for endpoint in samples.values() for sample in endpoint]
+    for endpoint, values in sorted(samples.items()) + [("ALL", everything)]:
+        latencies = sorted(seconds for seconds, _ in values)
+        statuses: Dict[str, int] = defaultdict(int)
+        for _, status in values:
+            statuses[str(status)] += 1
+        rows.append(
+            {
+                "endpoint": endpoint,
+                "requests": len(values),
+                "errors": sum(1 for _, status in values if not 200 <= status < 400),
+                "statuses": dict(statuses),
+                "throughput_rps": len(values) / elapsed,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+            }
+        )
+    return rows
+
+
+def print_table(rows: List[dict]):
+    print(
+        f"{'endpoint':<42} {'reqs':>6} {'err':>5} {'rps':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}",
+        file=sys.stderr,
+    )
+    for row in rows:
+        print(
+            f"{row['endpoint']:<42} {row['requests']:>6} {row['errors']:>5} "
+            f"{row['throughput_rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+            f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}",
+            file=sys.stderr,
+        )
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("login", "upload", "getpds", "dashboard"):
+            raise ValueError(f"unknown scenario: {name}")
+        weights[name] = int(weight or 1)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix)
+    async with throwaway_database(args.pg_bin, args.use_server) as settings:
+        await seed(settings, args.users)
+        with tempfile.TemporaryDirectory() as folder:
+            uploads = make_uploads(folder, args.upload_files, args.upload_pages)
+            env = {
+                **os.environ,
+                **settings,
+                "UPLOAD_DIR": os.path.join(folder, "uploads"),
+                "SERVER_TIMING_HEADER": "false",
+            }
+            # Metric files would outlive the run; keep metrics in-process
+            env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+            async with serve_app(env, args.workers, args.server_logs) as base_url:
+                limits = httpx.Limits(max_connections=args.concurrency)
+                async with httpx.AsyncClient(
+                    base_url=base_url, limits=limits, timeout=args.timeout
+                ) as client:
+                    traffic = Traffic(client, args.users, uploads, args.seed)
+                    start = time.monotonic()
+                    deadline = start + args.duration
+                    await asyncio.gather(
+                        *(traffic.virtual_user(mix, deadline) for _ in range(args.concurrency))
+                    )
+                    elapsed = time.monotonic() - start
+    return {
+        "meta": {
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "duration": elapsed,
+            "users": args.users,
+            "mix": mix,
+            "upload_files": args.upload_files,
+            "upload_pages": args.upload_pages,
+            "cpus": os.cpu_count(),
+        },
+        "results": summarize(traffic.samples, elapsed),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of traffic")
+    parser.add_argument("--users", type=int, default=100, help="seeded users")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--upload-files", type=int, default=3)
+    parser.add_argument("--upload-pages", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pg-bin", help="directory holding initdb and pg_ctl")
+    parser.add_argument(
+        "--use-server",
+        action="store_true",
+        help="create the throwaway database on the POSTGRES_* server instead",
+    )
+    parser.add_argument("--server-logs", action="store_true")
+    parser.add_argument("-o", "--output", help="write JSON results here")
+    args = parser.parse_args(argv)
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # App modules configure INFO logging; one line per request is noise here
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    report = asyncio.run(run(args))
+    print_table(report["results"])
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
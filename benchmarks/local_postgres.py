@@ -0,0 +1,120 @@
+"""
+Throwaway PostgreSQL databases for the load test.
+
+throwaway_database() yields the POSTGRES_* settings of an empty database
+that is removed again afterwards, either
+
+- on a private cluster started with initdb/pg_ctl from pg_bin (or PATH),
+  listening only on a Unix socket in a temporary directory, or
+- with use_server=True, as a uniquely named database on the server
+  core.config points at, dropped on exit.
+
+PostgreSQL refuses to run as root, so use the second form there.
+"""
+import asyncio
+import os
+import shutil
+import subprocess
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+import asyncpg
+
+SUPERUSER = "postgres"
+DATABASE = "wizdocx_load"
+
+
+def _pg_tool(pg_bin: Optional[str], name: str) -> str:
+    path = os.path.join(pg_bin, name) if pg_bin else shutil.which(name)
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError(
+            f"{name} not found; pass --pg-bin or use an existing server"
+        )
+    return path
+
+
+async def _admin_execute(settings: Dict[str, str], *statements: str):
+    conn = await asyncpg.connect(
+        host=settings["POSTGRES_HOST"],
+        port=int(settings["POSTGRES_PORT"]),
+        user=settings["POSTGRES_USER"],
+        password=settings["POSTGRES_PASSWORD"],
+        database="postgres",
+    )
+    try:
+        for statement in statements:
+            await conn.execute(statement)
+    finally:
+        await conn.close()
+
+
+def _drop(settings: Dict[str, str]) -> str:
+    return f'DROP DATABASE IF EXISTS "{settings["POSTGRES_DB"]}" WITH (FORCE)'
+
+
+def _create(settings: Dict[str, str]) -> str:
+    return f'CREATE DATABASE "{settings["POSTGRES_DB"]}"'
+
+
+@asynccontextmanager
+async def _private_cluster(pg_bin: Optional[str]) -> AsyncIterator[Dict[str, str]]:
+    folder = tempfile.mkdtemp(prefix="wizdocx-pg-")
+    data = os.path.join(folder, "data")
+    try:
+        await asyncio.to_thread(
+            subprocess.run,
+            [_pg_tool(pg_bin, "initdb"), "-D", data, "-U", SUPERUSER, "-A", "trust",
+             "--no-sync"],
+            check=True,
+            capture_output=True,
+        )
+        # No TCP listener; durability is irrelevant for a throwaway cluster
+        options = f"-c listen_addresses='' -k {folder} -c fsync=off -c synchronous_commit=off"
+        await asyncio.to_thread(
+            subprocess.run,
+            [_pg_tool(pg_bin, "pg_ctl"), "-D", data, "-o", options,
+             "-l", os.path.join(folder, "postgres.log"), "-w", "start"],
+            check=True,
+            capture_output=True,
+        )
+        try:
+            yield {
+                "POSTGRES_HOST": folder,
+                "POSTGRES_PORT": "5432",
+                "POSTGRES_USER": SUPERUSER,
+                "POSTGRES_PASSWORD": "",
+                "POSTGRES_DB": DATABASE,
+            }
+        finally:
+            await asyncio.to_thread(
+                subprocess.run,
+                [_pg_tool(pg_bin, "pg_ctl"), "-D", data, "-m", "fast", "-w", "stop"],
+                capture_output=True,
+            )
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+@asynccontextmanager
+async def throwaway_database(
+    pg_bin: Optional[str] = None, use_server: bool = False
+) -> AsyncIterator[Dict[str, str]]:
+    if use_server:
+        from core import config
+
+        settings = {
+            "POSTGRES_HOST": config.POSTGRES_HOST,
+            "POSTGRES_PORT": str(config.POSTGRES_PORT),
+            "POSTGRES_USER": config.POSTGRES_USER,
+            "POSTGRES_PASSWORD": config.POSTGRES_PASSWORD,
+            "POSTGRES_DB": f"{DATABASE}_{os.getpid()}",
+        }
+        await _admin_execute(settings, _drop(settings), _create(settings))
+        try:
+            yield settings
+        finally:
+            await _admin_execute(settings, _drop(settings))
+        return
+    async with _private_cluster(pg_bin) as settings:
+        await _admin_execute(settings, _create(settings))
+        yield settings
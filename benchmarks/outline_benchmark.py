@@ -0,0 +1,108 @@
+"""
+Benchmark for the bookmark outline builder.
+
+Generates a synthetic document with numbered headings three levels deep,
+some of them printed twice, then times each stage of the bullet
+strategy on it: the layout scan, build_outline and the incremental
+outline write. build_outline is also timed on its own over the scanned
+records, repeated so the figure is stable.
+
+    python -m benchmarks.outline_benchmark --headings 10000
+
+Prints one JSON object with the timings in seconds.
+"""
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import time
+import pymupdf
+from pdfservices.bookmarks import scan_document, write_outline
+from pdfservices.outline import OutlineRecord, build_outline
+
+LINES_PER_PAGE = 40
+LINE_HEIGHT = 18
+# Every n-th heading is printed again on the next line, as a running
+# header or a cross reference would be
+REPEAT_EVERY = 20
+
+
+def heading_numbers(fanout: int = 10):
+    """
+    Yields dotted section numbers in document order: chapters with fanout
+    sections of fanout subsections each.
+    """
+    for chapter in itertools.count(1):
+        yield f"{chapter}"
+        for section in range(1, fanout + 1):
+            yield f"{chapter}.{section}"
+            for sub in range(1, fanout + 1):
+                yield f"{chapter}.{section}.{sub}"
+
+
+def generate_document(path: str, headings: int) -> int:
+    """
+    Writes a PDF with the given number of distinct headings to path and
+    returns the number of heading lines printed, repeats included.
+    """
+    lines = []
+    for i, number in enumerate(itertools.islice(heading_numbers(), headings)):
+        lines.append(f"{number} Heading {number}")
+        if i % REPEAT_EVERY == 0:
+            lines.append(f"{number} Heading {number}")
+    doc = pymupdf.open()
+    for start in range(0, len(lines), LINES_PER_PAGE):
+        page = doc.new_page()
+        for row, text in enumerate(lines[start:start + LINES_PER_PAGE]):
+            page.insert_text((72, 72 + row * LINE_HEIGHT), text, fontsize=11)
+    doc.save(path, garbage=1, deflate=True)
+    doc.close()
+    return len(lines)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def run(headings: int, repeat: int) -> dict:
+    with tempfile.TemporaryDirectory() as folder:
+        source = os.path.join(folder, "synthetic.pdf")
+        output = os.path.join(folder, "synthetic_bookmarked.pdf")
+        printed = generate_document(source, headings)
+        (_, bullets, _), scan_time = timed(scan_document, source)
+        records = [
+            OutlineRecord(b["key"], b["title"], b["page"], b["level"] + 1)
+            for b in bullets
+        ]
+        outline, build_time = timed(build_outline, records)
+        build_times = [timed(build_outline, records)[1] for _ in range(repeat)]
+        mode, write_time = timed(write_outline, source, output, outline)
+        return {
+            "headings_printed": printed,
+            "records": len(records),
+            "outline_entries": len(outline),
+            "max_depth": max((level for level, _, _ in outline), default=0),
+            "pages": -(-printed // LINES_PER_PAGE),
+            "source_bytes": os.path.getsize(source),
+            "output_bytes": os.path.getsize(output),
+            "scan_seconds": scan_time,
+            "build_seconds": build_time,
+            "build_seconds_best": min(build_times, default=build_time),
+            "write_seconds": write_time,
+            "write_mode": mode,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--headings", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.headings, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
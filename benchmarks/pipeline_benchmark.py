@@ -0,0 +1,205 @@
+"""
+Benchmark of the PDF pipeline on the synthetic corpus.
+
+For every size and variant a document is generated with
+benchmarks.corpus, then analyze_pdf_quality and add_bookmarks_to_pdf_file
+are each run in a fresh Python process (so peak RSS is not inherited from
+earlier cases) against a warmed process pool. Reported per case: wall
+time (min and median of --repeat runs), pages per second at the median,
+and peak RSS of the main process and of the largest pool child.
+
+    python -m benchmarks.pipeline_benchmark --sizes 10,100,500 -o head.json
+    python -m benchmarks.compare base.json head.json
+
+Results are JSON and carry the git commit, so runs from two commits on
+the same machine can be compared with benchmarks.compare.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import pymupdf
+from benchmarks.corpus import BASE_FONTS, CJK_FONT, CorpusSpec, generate_pdf
+
+DEFAULT_SIZES = (10, 100, 500)
+# Corpus settings per variant; each steers the bookmark engine to one
+# strategy, and "rich" gives QC every page feature to look for
+VARIANTS = {
+    "toc": dict(toc_page=True),
+    "bullets": dict(),
+    "fonts": dict(numbered_headings=False),
+    "rich": dict(
+        images_per_page=1,
+        links_per_page=2,
+        annotations_per_page=1,
+        fonts=BASE_FONTS + (CJK_FONT,),
+    ),
+}
+TARGETS = ("qc", "bookmarks")
+
+
+def _peak_rss_mb(who: int) -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+async def _measure(target: str, path: str, repeat: int) -> list:
+    from core import config
+    from core.executor import init_process_pool, run_in_process, shutdown_process_pool
+    from pdfservices.bookmarks import add_bookmarks_to_pdf_file
+    from pdfservices.layout import get_page_count
+    from pdfservices.qcCheck import analyze_pdf_quality
+
+    init_process_pool()
+    # Start every pool process before timing anything
+    await asyncio.gather(
+        *(run_in_process(get_page_count, path) for _ in range(config.PDF_PROCESS_WORKERS))
+    )
+    walls = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            if target == "qc":
+                await analyze_pdf_quality(path)
+            else:
+                result = await add_bookmarks_to_pdf_file(path)
+                if result.get("status") == "error":
+                    raise RuntimeError(result.get("message"))
+            walls.append(time.perf_counter() - start)
+    finally:
+        # Joining the pool makes its processes count in RUSAGE_CHILDREN
+        await shutdown_process_pool()
+    return walls
+
+
+def run_target(target: str, path: str, repeat: int) -> dict:
+    """
+    Runs one target in this process; invoked through --run by run_case.
+    """
+    walls = asyncio.run(_measure(target, path, repeat))
+    return {
+        "wall_seconds": walls,
+        "peak_rss_mb": {
+            "main": round(_peak_rss_mb(resource.RUSAGE_SELF), 1),
+            "pool": round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+        },
+    }
+
+
+def run_case(target: str, path: str, repeat: int) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.pipeline_benchmark", "--run", target, path,
+         "--repeat", str(repeat)],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _git_commit() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def run(sizes, variants, repeat: int, seed: int) -> dict:
+    from core import config
+
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for pages in sizes:
+            for variant in variants:
+                spec = CorpusSpec(pages=pages, seed=seed, **VARIANTS[variant])
+                path = os.path.join(folder, f"{variant}-{pages}.pdf")
+                summary = generate_pdf(path, spec)
+                for target in TARGETS:
+                    measured = run_case(target, path, repeat)
+                    walls = measured["wall_seconds"]
+                    median = statistics.median(walls)
+                    results.append(
+                        {
+                            "case": f"{variant}-{pages}",
+                            "target": target,
+                            "variant": variant,
+                            "pages": summary["pages"],
+                            "file_bytes": os.path.getsize(path),
+                            "wall_seconds_min": min(walls),
+                            "wall_seconds_median": median,
+                            "pages_per_second": summary["pages"] / median,
+                            "peak_rss_mb": measured["peak_rss_mb"],
+                        }
+                    )
+                    print(
+                        f"{variant}-{pages} {target}: {median:.3f}s median, "
+                        f"{summary['pages'] / median:.0f} pages/s",
+                        file=sys.stderr,
+                    )
+    return {
+        "meta": {
+            **_git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "pymupdf": pymupdf.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "pdf_process_workers": config.PDF_PROCESS_WORKERS,
+            "pdf_parallel_min_pages": config.PDF_PARALLEL_MIN_PAGES,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)))
+    parser.add_argument("--variants", default=",".join(VARIANTS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="write results here instead of stdout")
+    parser.add_argument("--run", nargs=2, metavar=("TARGET", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        target, path = args.run
+        print(json.dumps(run_target(target, path, args.repeat)))
+        return
+
+    variants = args.variants.split(",")
+    unknown = set(variants) - set(VARIANTS)
+    if unknown:
+        parser.error(f"unknown variants: {', '.join(sorted(unknown))}")
+    sizes = [int(size) for size in args.sizes.split(",")]
+    report = json.dumps(run(sizes, variants, args.repeat, args.seed), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,9 @@
+import asyncio
+import os
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from core import queries
+from core.profiling import list_profiles, profile_path
 from services.admin_service import AdminService
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
@@ -18,3 +23,34 @@ async def get_user(user_id: int, admin_service: AdminService = Depends(get_admin
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
     return user
+
+
+@router.get("/query-stats")
+async def get_query_stats():
+    """
+    Calls, errors and latency of the registered (prepared) queries, as
+    seen by the worker process serving this request.
+    """
+    return queries.stats()
+
+
+@router.get("/profiles/{pdf_file_id}")
+async def get_profiles(pdf_file_id: int):
+    """
+    Lists the cProfile captures stored for a PDF file, oldest first.
+    """
+    profiles = await asyncio.to_thread(list_profiles, pdf_file_id)
+    return [profile._asdict() for profile in profiles]
+
+
+@router.get("/profiles/{pdf_file_id}/{name}")
+async def download_profile(pdf_file_id: int, name: str):
+    try:
+        path = profile_path(pdf_file_id, name)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not os.path.isfile(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+        )
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
@@ -3,6 +3,7 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
 from core import security
+from core.auth import get_current_user
 from services.user_service import UserService
 from services.company_service import CompanyService
 from services.user_comapny_service import UserCompanyService
@@ -11,7 +12,7 @@ from schemas.company_schema import CompanyCreate
 from schemas.user_company_schema import UserCompanyCreate, UserCompanyRead
 from schemas.auth_schema import GoogleAuth, Login, Register
 from typing import Optional
-from core.security import hash_password, verify_password
+from core.security import hash_password_async, verify_password_async
 
 
 logger = logging.getLogger(__name__)
@@ -50,6 +51,9 @@ async def register_user(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
         )
+    # Before any rows are written, so a 429 from a saturated hashing pool
+    # leaves nothing behind
+    hashed_password = await hash_password_async(user_data.password)
     if user_data.account_type == "company":
         try:
             company_id = 0
@@ -78,7 +82,6 @@ async def register_user(
                     detail="Failed to create company: company ID is None after creation",
                 )
             logger.info(f"company ID: {company_id}")
-            hashed_password = hash_password(user_data.password)
 
             add_user = CreateUser(
                 firstname=user_data.firstname,
@@ -102,7 +105,6 @@ async def register_user(
             logger.error(f"Error during company registration: {e}")
             raise
     else:
-        hashed_password = security.hash_password(user_data.password)
         add_user = CreateUser(
             firstname=user_data.firstname,
             lastname=user_data.lastname,
@@ -127,17 +129,17 @@ async def login_for_access_token(
     user_service: UserService = Depends(get_user_service),
     user_company: UserCompanyService = Depends(get_user_company_service),
 ) -> JSONResponse:  # type: ignore
-    verify_password_result = False
     user = await user_service.get_user_by_email(login_data.email)
     verify_password_result = False
     if user:
-        verify_password_result = verify_password(
+        verify_password_result = await verify_password_async(
             login_data.password, user.password_hash
         )
     if verify_password_result == True:
-        subject = f"email:{user.email},id:{user.id},role:{user.role}"
         access_token = security.create_access_token(
-            subject=subject,
+            user.id,
+            user.email,
+            user.role,
             expires_delta=timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES),
         )
         return JSONResponse(
@@ -154,31 +156,9 @@ async def login_for_access_token(
                 "company_id": user.company_id,
             },
         )
-    else:
-        JSONResponse(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            content={"detail": "Incorrect email or password"},
-        )
-
-    subject = f"email:{user.email},id:{user.id},role:{user.role}"
-    access_token = security.create_access_token(
-        subject=subject,
-        expires_delta=timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES),
-    )
-
     return JSONResponse(
-        status_code=status.HTTP_200_OK,
-        content={
-            "access_token": access_token,
-            "token_type": "bearer",
-            "id": user.id,
-            "firstname": user.firstname,
-            "lastname": user.lastname,
-            "email": user.email,
-            "subscription_id": user.subscription_id,
-            "role": user.role,
-            "company_id": user.company_id,
-        },
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        content={"detail": "Incorrect email or password"},
     )
 
 
@@ -188,8 +168,8 @@ async def google_auth(
     user_service: UserService = Depends(get_user_service),
 ) -> JSONResponse:
     try:
-        email = security.decode_access_token(google_auth_data.token)
-        user = await user_service.get_user_by_email(email)
+        claims = security.decode_access_token(google_auth_data.token)
+        user = await user_service.get_user_by_email(claims.email)
 
         if not user:
             raise HTTPException(
@@ -197,7 +177,9 @@ async def google_auth(
             )
 
         access_token = security.create_access_token(
-            subject=f"email:{user.email},id:{user.id},role:{user.role}",
+            user.id,
+            user.email,
+            user.role,
             expires_delta=timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES),
         )
 
@@ -217,3 +199,8 @@ async def google_auth(
         )
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/me", response_model=GetUser)
+async def read_current_user(user: GetUser = Depends(get_current_user)):
+    return user
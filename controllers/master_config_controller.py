@@ -1,5 +1,4 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from core.database import get_database
 from schemas.master_config_schema import PdfMasterConfigCreate, PdfMasterConfigRead
 from services.master_config_service import PdfMasterConfigService
 
@@ -7,7 +6,7 @@ from services.master_config_service import PdfMasterConfigService
 router = APIRouter(prefix="/pdf-config", tags=["pdf-configs"])
 
 
-def get_pdf_config_service(db=Depends(get_database)):
+def get_pdf_config_service():
     return PdfMasterConfigService()
 
 
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, Response
+from prometheus_client.core import GaugeMetricFamily
+from core import metrics
+from services.pdfjob_service import PDFJobService
+import logging
+
+router = APIRouter(tags=["metrics"])
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+def get_pdfjob_service():
+    return PDFJobService()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics(jobservice: PDFJobService = Depends(get_pdfjob_service)):
+    """
+    Prometheus scrape endpoint. Process metrics are aggregated across all
+    gunicorn workers (and same-host PDF workers); the job queue depth is
+    read from the database at scrape time.
+    """
+    queue = GaugeMetricFamily(
+        "pdf_jobs", "PDF jobs queued or running", labels=["job_type", "status"]
+    )
+    try:
+        for job_type, status, count in await jobservice.count_pending_jobs():
+            queue.add_metric([job_type, status], count)
+    except Exception as e:
+        # Still serve the process metrics when the database is unavailable
+        logger.error(f"Error reading PDF job queue depth: {e}")
+    body, content_type = metrics.render([queue])
+    return Response(content=body, media_type=content_type)
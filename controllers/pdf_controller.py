@@ -5,23 +5,37 @@ from fastapi import (
     Depends,
     Form,
     HTTPException,
-    BackgroundTasks,
+    Header,
+    Query,
+    Request,
+    Response,
 )
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
+import asyncio
+import json
 import os
-from pdfservices.qcCheck import analyze_pdf_quality
-from core.database import get_database
+import orjson
+from datetime import datetime
+from typing import AsyncIterator, NamedTuple, Optional, Tuple
+from core import config, metrics, timing
+from core.cache import LRUCache
+from core.database import transaction
+from core.events import status_events
+from core.uploads import StoredUpload, save_upload, discard_uploads
+from services.bookmark_service import BookmarkService
 from services.pdfFile_service import PDFFileService
 from services.user_service import UserService
 from services.pdfqc_service import PDFQCService
 from services.status_service import StatusService
+from services.pdfjob_service import PDFJobService
+from schemas.bookmark_schema import BookmarkItemRead
 from schemas.pdffile_schema import PDFFileRead, PDFFileCreate
 from schemas.pdfqc_schema import PDFQCRead, PDFQCCreate
 from schemas.status_schema import SiteStatusRead, SiteStatusCreate
+from schemas.pdfjob_schema import PDFJobCreate, PDFJobRead, JOB_QC, JOB_BOOKMARKS
 import logging
 from fastapi.responses import FileResponse
-from pdfservices.bookmarks import add_bookmarks_to_pdf_file
 
 load_dotenv()
 
@@ -31,154 +45,488 @@ logging.basicConfig(level=logging.INFO)
 
 router = APIRouter(prefix="/pdf", tags=["pdf"])
 
-MAX_FILE_SIZE = 90 * 1024 * 1024  # 5 MB
+MAX_FILE_SIZE = config.UPLOAD_MAX_FILE_SIZE
 
-upload_dir = os.getenv("UPLOAD_DIR", "uploads")
 
-
-def get_user_service(db=Depends(get_database)):
+def get_user_service():
     return UserService()
 
 
-def get_pdf_service(db=Depends(get_database)):
+def get_pdf_service():
     return PDFFileService()
 
 
-def get_pdfqc_service(db=Depends(get_database)):
+def get_pdfqc_service():
     return PDFQCService()
 
 
-def get_status_service(db=Depends(get_database)):
+def get_status_service():
     return StatusService()
 
 
-async def qc_background_task(
-    files: [],
-    pdfqcservice: PDFQCService = Depends(get_pdfqc_service),
-    statusservice: StatusService = Depends(get_status_service),
-):
-    try:
-        logger.info("Starting background task for PDF QC files are", files)
-        for file in files:
-            statuscreate: SiteStatusCreate = SiteStatusCreate(
-                status_type="PDF_QC_START",
-                status_message=f"PDF QC completed for {file.filename}.",
-                pdf_file_id=file.id,
-            )
-            full_file_path = os.path.abspath(os.path.join(file.path, file.filename))
-
-            qcresult = await analyze_pdf_quality(full_file_path)
-            pdfqccreate: PDFQCCreate = PDFQCCreate(
-                doc_id=file.id,
-                is_security=qcresult["is_security"],
-                is_encrypted=qcresult["is_encrypted"],
-                has_bookmarks=qcresult["has_bookmarks"],
-                has_tags=qcresult["has_tags"],
-                has_annotations=qcresult["has_annotations"],
-                has_form_fields=qcresult["has_form_fields"],
-                has_images=qcresult["has_images"],
-                has_fonts=qcresult["has_fonts"],
-                has_tables=qcresult["has_tables"],
-                has_links=qcresult["has_links"],
-                has_media=qcresult["has_media"],
-            )
-            await pdfqcservice.create_pdf_qc(pdfqccreate)
-            statuscreate: SiteStatusCreate = SiteStatusCreate(
-                status_type="PDF_QC_END",
-                status_message=f"PDF QC completed for {file.filename}.",
-                pdf_file_id=file.id,
-            )
-            await statusservice.create_site_status(statuscreate)
+def get_pdfjob_service():
+    return PDFJobService()
 
-    except Exception as e:
-        logger.error(f"Error in background task: {e}")
 
+def get_bookmark_service():
+    return BookmarkService()
 
-async def add_bookmarks_to_pdf_files(source, destination):
-    bookmarks = add_bookmarks_to_pdf_file(source, destination)
+
+def _job_payload(profile: bool, **options) -> dict:
+    # "profile" is only set when requested, so PDF_PROFILE on the worker
+    # still applies to everything else
+    if profile:
+        options["profile"] = True
+    return options
 
 
 @router.post("/upload-pdf/")
 async def upload_pdf(
-    background_tasks: BackgroundTasks,
     user_id: int = Form(...),
     files: list[UploadFile] = File(...),
-    pdfservice: PDFQCService = Depends(get_pdf_service),
+    pdfservice: PDFFileService = Depends(get_pdf_service),
     pdfqcservice: PDFQCService = Depends(get_pdfqc_service),
     statusservice: StatusService = Depends(get_status_service),
-    
+    jobservice: PDFJobService = Depends(get_pdfjob_service),
+    x_profile: bool = Header(False),
 ):
-    # Ensure uploads/user_id directory exists
-    try:
-        upload_dir = os.path.join("uploads", str(user_id))
-        os.makedirs(upload_dir, exist_ok=True)
-        relative_path = "uploads/" + str(user_id)
-        results = []
-        for file in files:
-            if file.content_type != "application/pdf":
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Only PDF files are allowed. Invalid file: {file.filename}",
-                )
+    for file in files:
+        if file.content_type != "application/pdf":
+            raise HTTPException(
+                status_code=400,
+                detail=f"Only PDF files are allowed. Invalid file: {file.filename}",
+            )
 
-            contents = await file.read()
-            if len(contents) > MAX_FILE_SIZE:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"File size exceeds 5 MB limit: {file.filename}",
+    upload_dir = os.path.join(config.UPLOAD_DIR, str(user_id))
+    content_store = config.CONTENT_STORE_DIR if config.UPLOAD_CONTENT_ADDRESSED else None
+    stored: list[StoredUpload] = []
+    try:
+        # Stream every file to disk before touching the database, so the
+        # transaction below is short and does not wait on the client.
+        with timing.stage("upload"):
+            for file in files:
+                stored.append(
+                    await save_upload(
+                        file, upload_dir, max_size=MAX_FILE_SIZE, content_store=content_store
+                    )
                 )
+                metrics.UPLOAD_BYTES.inc(stored[-1].size)
+                metrics.UPLOAD_FILES.inc()
 
-            file_path = os.path.join(upload_dir, file.filename)
-            with open(file_path, "wb") as f_out:
-                f_out.write(contents)
-                pdffilecreate: PDFFileCreate = PDFFileCreate(
+        pdffilecreates: list[PDFFileCreate] = []
+        for file, upload in zip(files, stored):
+            original_filename = os.path.basename(file.filename or "") or upload.filename
+            pdffilecreates.append(
+                PDFFileCreate(
                     user_id=user_id,
-                    filename=file.filename or "unnamed.pdf",
-                    path=relative_path,
-                    size=len(contents),
-                    original_filename=file.filename,
+                    filename=upload.filename,
+                    path=upload.directory,
+                    size=upload.size,
+                    original_filename=original_filename,
                     status="uploaded",
-                    status_message=f"File {file.filename} uploaded successfully.",
+                    status_message=f"File {original_filename} uploaded successfully.",
+                    content_hash=upload.sha256,
                 )
-                pdffile: PDFFileRead = await pdfservice.create_pdf_file(pdffilecreate)
-                if pdffile:
-                    results.append(pdffile)
-                    statuscreate: SiteStatusCreate = SiteStatusCreate(
+            )
+
+        # One transaction for the whole batch: either every file gets its
+        # row, status and QC job, or none does.
+        async with transaction() as conn:
+            results = await pdfservice.create_pdf_files(pdffilecreates, conn=conn)
+            await statusservice.create_site_statuses(
+                [
+                    SiteStatusCreate(
                         status_type="UPLOAD_FILE",
-                        status_message=f"File {file.filename} uploaded successfully.",
+                        status_message=pdffile.status_message,
                         pdf_file_id=pdffile.id,
                     )
-                    await statusservice.create_site_status(statuscreate)
-
+                    for pdffile in results
+                ],
+                conn=conn,
+            )
+            await jobservice.enqueue_jobs(
+                [
+                    PDFJobCreate(
+                        pdf_file_id=pdffile.id,
+                        job_type=JOB_QC,
+                        payload=_job_payload(profile=x_profile),
+                    )
+                    for pdffile in results
+                ],
+                conn=conn,
+            )
 
+    except HTTPException:
+        await asyncio.to_thread(discard_uploads, stored)
+        raise
     except Exception as e:
         logger.error(f"Error uploading file: {e}")
+        await asyncio.to_thread(discard_uploads, stored)
         raise HTTPException(status_code=500, detail="Internal server error")
 
     return results
 
 
-@router.get("/getpds")
-async def getdocs(pdfqcservice: PDFQCService = Depends(get_pdfqc_service)):
+# Flush exports to the client in chunks of about this many bytes
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+async def _json_array(rows: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    """
+    Serializes rows as one JSON array, sent in chunks as rows arrive.
+    """
+    buffer = bytearray(b"[")
+    first = True
+    async for row in rows:
+        if not first:
+            buffer += b","
+        buffer += orjson.dumps(row)
+        first = False
+        if len(buffer) >= EXPORT_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b"]"
+    yield bytes(buffer)
+
+
+def _json_export(rows: AsyncIterator[dict], filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        _json_array(rows),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/getpds", response_model=list[PDFQCRead])
+async def getdocs(
+    response: Response,
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(config.PAGE_SIZE_DEFAULT, ge=1, le=config.PAGE_SIZE_MAX),
+    pdfqcservice: PDFQCService = Depends(get_pdfqc_service),
+):
+    """
+    PDF files with their latest QC result, newest first, one page at a
+    time. When more rows follow, the X-Next-Cursor response header holds
+    the cursor to pass for the next page.
+    """
     try:
-        return await pdfqcservice.get_all_pdf_qc()
+        items, next_cursor = await pdfqcservice.get_pdf_qc_page(
+            limit,
+            cursor,
+            user_id=user_id,
+            status=status,
+            created_from=created_from,
+            created_to=created_to,
+        )
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error uploading file: {e}")
+        logger.error(f"Error listing PDF files: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 
-@router.get("/get_pdf/{id}")
-async def get_pdf(id: int, pdf_file_service: PDFFileService = Depends(get_pdf_service)):
+@router.get("/getpds/export")
+async def export_docs(
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    pdfqcservice: PDFQCService = Depends(get_pdfqc_service),
+):
+    """
+    The whole /pdf/getpds listing for the given filters as one streamed
+    JSON array.
+    """
+    rows = pdfqcservice.iter_pdf_qc(
+        user_id=user_id, status=status, created_from=created_from, created_to=created_to
+    )
+    return _json_export(rows, "pdf-files.json")
+
+
+@router.get("/statuses", response_model=list[SiteStatusRead])
+async def get_statuses(
+    response: Response,
+    user_id: Optional[int] = None,
+    pdf_file_id: Optional[int] = None,
+    status_type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(config.PAGE_SIZE_DEFAULT, ge=1, le=config.PAGE_SIZE_MAX),
+    statusservice: StatusService = Depends(get_status_service),
+):
+    """
+    Processing status entries, newest first, paginated like /pdf/getpds.
+    """
     try:
-        pdf_file = await pdf_file_service.get_pdf_file(id)
-        if not pdf_file:
-            raise HTTPException(status_code=404, detail="PDF file not found")
-        file_path = os.path.join(pdf_file.path, pdf_file.filename)
-        logger.info(f"Serving file: {file_path}")
-        if not os.path.isfile(file_path):
-            raise HTTPException(status_code=404, detail="File not found")
-        return FileResponse(
-            path=file_path, filename=pdf_file.filename, media_type="application/pdf"
+        items, next_cursor = await statusservice.get_site_status_page(
+            limit,
+            cursor,
+            user_id=user_id,
+            pdf_file_id=pdf_file_id,
+            status_type=status_type,
+            created_from=created_from,
+            created_to=created_to,
         )
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching PDF: {e}")
+        logger.error(f"Error listing site statuses: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+
+@router.get("/statuses/export")
+async def export_statuses(
+    user_id: Optional[int] = None,
+    pdf_file_id: Optional[int] = None,
+    status_type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    statusservice: StatusService = Depends(get_status_service),
+):
+    rows = statusservice.iter_site_statuses(
+        user_id=user_id,
+        pdf_file_id=pdf_file_id,
+        status_type=status_type,
+        created_from=created_from,
+        created_to=created_to,
+    )
+    return _json_export(rows, "statuses.json")
+
+
+@router.post("/{id}/bookmarks", response_model=PDFJobRead)
+async def create_bookmarks(
+    id: int,
+    optimize: bool = config.PDF_OPTIMIZE_OUTPUT,
+    pdf_file_service: PDFFileService = Depends(get_pdf_service),
+    jobservice: PDFJobService = Depends(get_pdfjob_service),
+    x_profile: bool = Header(False),
+):
+    pdf_file = await pdf_file_service.get_pdf_file(id)
+    if not pdf_file:
+        raise HTTPException(status_code=404, detail="PDF file not found")
+    return await jobservice.enqueue_job(
+        PDFJobCreate(
+            pdf_file_id=id,
+            job_type=JOB_BOOKMARKS,
+            payload=_job_payload(profile=x_profile, optimize=optimize),
+        )
+    )
+
+
+@router.get("/{id}/bookmarks", response_model=list[BookmarkItemRead])
+async def get_bookmarks(
+    id: int,
+    pdf_file_service: PDFFileService = Depends(get_pdf_service),
+    bookmarkservice: BookmarkService = Depends(get_bookmark_service),
+):
+    """
+    Returns the outline stored by the last bookmark job, in document order.
+    Served from the database; the PDF itself is not opened.
+    """
+    bookmarks = await bookmarkservice.get_bookmarks(id)
+    if not bookmarks and not await pdf_file_service.get_pdf_file(id):
+        raise HTTPException(status_code=404, detail="PDF file not found")
+    return bookmarks
+
+
+def _sse_message(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    message = f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+    if event_id is not None:
+        message = f"id: {event_id}\n{message}"
+    return message
+
+
+@router.get("/{id}/events")
+async def pdf_events(
+    id: int,
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    pdf_file_service: PDFFileService = Depends(get_pdf_service),
+    statusservice: StatusService = Depends(get_status_service),
+):
+    """
+    Server-Sent Events stream of a file's processing: UPLOAD_FILE,
+    PDF_QC_START/END, BOOKMARKS_START/END and PDF_PROGRESS.
+
+    Status rows already recorded are replayed first (after Last-Event-ID
+    when reconnecting), then new ones are pushed as the database
+    notifies them.
+    """
+    if not await pdf_file_service.get_pdf_file(id):
+        raise HTTPException(status_code=404, detail="PDF file not found")
+    after_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+
+    async def stream():
+        nonlocal after_id
+        # Subscribe before replaying so nothing inserted in between is lost
+        async with status_events.subscribe(id) as queue:
+            for status in await statusservice.get_site_statuses_for_file(id, after_id):
+                yield _sse_message(
+                    status.status_type, status.model_dump(mode="json"), status.id
+                )
+                after_id = status.id
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=config.SSE_KEEPALIVE_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                event_id = event.get("id")
+                if event_id is not None:
+                    if event_id <= after_id:
+                        continue
+                    after_id = event_id
+                yield _sse_message(event["status_type"], event, event_id)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{id}/jobs", response_model=list[PDFJobRead])
+async def get_jobs(id: int, jobservice: PDFJobService = Depends(get_pdfjob_service)):
+    return await jobservice.get_jobs_for_file(id)
+
+
+class PDFDownloadResponse(FileResponse):
+    """
+    FileResponse handles Range and If-Range itself and hands the file to
+    the server via the ASGI pathsend extension (sendfile) when the server
+    supports it; otherwise it is streamed in chunks of this size.
+    """
+    chunk_size = config.DOWNLOAD_CHUNK_SIZE
+
+
+class _Download(NamedTuple):
+    path: str
+    filename: str
+    # (st_mtime_ns, st_size) when cached; a mismatch means the file was
+    # replaced (e.g. bookmarks regenerated) and the metadata is re-read
+    signature: Tuple[int, int]
+
+    @property
+    def etag(self) -> str:
+        # Strong validator of the bytes on disk: outputs and uploads are
+        # only ever replaced by rename, which changes the mtime
+        mtime_ns, size = self.signature
+        return f'"{mtime_ns:x}-{size:x}"'
+
+
+_download_cache = LRUCache(config.DOWNLOAD_CACHE_SIZE, config.DOWNLOAD_CACHE_TTL)
+
+
+def _download_target(
+    pdf_file: PDFFileRead, bookmarked: bool
+) -> Optional[Tuple[str, str]]:
+    """
+    (path, download filename) of the original upload or of its bookmarked
+    output, or None if no bookmarked output exists yet.
+    """
+    display_name = pdf_file.original_filename or pdf_file.filename
+    if not bookmarked:
+        return os.path.join(pdf_file.path, pdf_file.filename), display_name
+    if not pdf_file.processed_filename:
+        return None
+    base, ext = os.path.splitext(display_name)
+    path = os.path.join(pdf_file.processed_path, pdf_file.processed_filename)
+    return path, f"{base}_bookmarked{ext or '.pdf'}"
+
+
+async def _resolve_download(
+    id: int, bookmarked: bool, pdf_file_service: PDFFileService
+) -> Tuple[_Download, os.stat_result]:
+    key = (id, bookmarked)
+    download = _download_cache.get(key)
+    if download is not None:
+        try:
+            stat_result = await asyncio.to_thread(os.stat, download.path)
+            if (stat_result.st_mtime_ns, stat_result.st_size) == download.signature:
+                return download, stat_result
+        except FileNotFoundError:
+            pass
+        _download_cache.pop(key)
+
+    pdf_file = await pdf_file_service.get_pdf_file(id)
+    if not pdf_file:
+        raise HTTPException(status_code=404, detail="PDF file not found")
+    target = _download_target(pdf_file, bookmarked)
+    if target is None:
+        raise HTTPException(status_code=404, detail="Bookmarked file not available")
+    path, filename = target
+    try:
+        stat_result = await asyncio.to_thread(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    download = _Download(
+        path=path,
+        filename=filename,
+        signature=(stat_result.st_mtime_ns, stat_result.st_size),
+    )
+    _download_cache.set(key, download)
+    return download, stat_result
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in tags
+
+
+async def _serve_pdf(
+    request: Request, id: int, bookmarked: bool, pdf_file_service: PDFFileService
+) -> Response:
+    download, stat_result = await _resolve_download(id, bookmarked, pdf_file_service)
+    headers = {"Cache-Control": "private, no-cache", "ETag": download.etag}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, download.etag):
+        return Response(status_code=304, headers=headers)
+    return PDFDownloadResponse(
+        path=download.path,
+        headers=headers,
+        media_type="application/pdf",
+        filename=download.filename,
+        stat_result=stat_result,
+    )
+
+
+@router.get("/get_pdf/{id}")
+async def get_pdf(
+    id: int,
+    request: Request,
+    pdf_file_service: PDFFileService = Depends(get_pdf_service),
+):
+    return await _serve_pdf(request, id, False, pdf_file_service)
+
+
+@router.get("/{id}/download")
+async def download_pdf(
+    id: int,
+    request: Request,
+    bookmarked: bool = False,
+    pdf_file_service: PDFFileService = Depends(get_pdf_service),
+):
+    """
+    Downloads the original upload, or with bookmarked=true the generated
+    *_bookmarked output. Supports Range/If-Range and conditional requests
+    on a strong ETag derived from the served file's mtime and size.
+    """
+    return await _serve_pdf(request, id, bookmarked, pdf_file_service)
@@ -1,11 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from core.database import get_database
 from schemas.user_config_schema import PdfUserConfigCreate, PdfUserConfigRead
 from services.user_config_service import PdfUserConfigService
 
 router = APIRouter(prefix="/user-config", tags=["user-configs"])
 
-def get_user_config_service(db=Depends(get_database)):
+def get_user_config_service():
     return PdfUserConfigService()
 
 
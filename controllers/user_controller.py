@@ -1,5 +1,4 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from core.database import get_database
 from schemas.user_schema import GetUser, CreateUser
 from services.user_service import UserService
 
@@ -7,7 +6,7 @@ router = APIRouter(prefix="/users", tags=["Users"])
 
 USER_NOT_FOUND = "User not found"
 
-def get_user_service(db=Depends(get_database)):
+def get_user_service():
     return UserService()
 
 @router.get("/", response_model=list[GetUser])
@@ -0,0 +1,179 @@
+"""
+Current-user resolution for authenticated routes.
+
+    @router.get("/me")
+    async def me(user: GetUser = Depends(get_current_user)): ...
+
+get_current_user verifies the bearer token and loads its user. Both are
+cached per worker, keyed by the token's signature, until the token
+expires (at most AUTH_CACHE_TTL seconds), so repeat requests with the
+same token skip JWT verification and the database.
+
+UserService calls invalidate_user after changing or deleting a user. It
+marks the user's entries in this worker as stale and NOTIFYs
+AUTH_EVENTS_CHANNEL so the other workers do the same. If the LISTEN
+connection is down, entries in that worker can be stale for up to
+AUTH_CACHE_TTL.
+"""
+import asyncio
+import logging
+import time
+from typing import NamedTuple, Optional
+import asyncpg
+from fastapi import Depends
+from core import config, queries, security
+from core.cache import LRUCache
+from core.database import acquire, connect
+from schemas.auth_schema import TokenClaims
+from schemas.user_schema import GetUser
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GET_USER = queries.register(
+    "auth.get_user",
+    """
+        SELECT u.id, u.email, u.phone_number, u.profile_picture, u.firstname,
+               u.lastname, u.role, u.subscription_id, uc.company_id,
+               u.createdon, u.updatedon
+        FROM "user" u
+        LEFT JOIN usercompany uc ON u.id = uc.user_id
+        WHERE u.id = $1
+    """,
+)
+
+
+class _CachedToken(NamedTuple):
+    token: str
+    claims: TokenClaims
+    user: GetUser
+    # time.monotonic() just before the user was loaded
+    loaded_at: float
+
+
+_tokens = LRUCache(config.AUTH_CACHE_SIZE, config.AUTH_CACHE_TTL)
+# time.monotonic() of each user's last invalidation; entries loaded before
+# it are treated as misses. No entry outlives AUTH_CACHE_TTL, so neither
+# does an invalidation.
+_invalidated = LRUCache(config.AUTH_CACHE_SIZE, config.AUTH_CACHE_TTL)
+
+
+def _invalidate_local(user_id: int):
+    if _invalidated.get(user_id) is None and len(_invalidated) >= _invalidated.maxsize:
+        # Making room would forget an invalidation that cached entries may
+        # still depend on; drop those entries instead
+        _tokens.clear()
+        _invalidated.clear()
+    _invalidated.set(user_id, time.monotonic())
+
+
+def _is_current(cached: _CachedToken) -> bool:
+    invalidated = _invalidated.get(cached.user.id)
+    return invalidated is None or cached.loaded_at > invalidated
+
+
+class _UserEventListener:
+    """
+    LISTENs for other workers' invalidations on a dedicated connection,
+    opened on first use.
+    """
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self._conn: Optional[asyncpg.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def ensure_listening(self):
+        if self._conn is not None and not self._conn.is_closed():
+            return
+        async with self._lock:
+            if self._conn is not None and not self._conn.is_closed():
+                return
+            try:
+                conn = await connect()
+                conn.add_termination_listener(self._on_terminated)
+                await conn.add_listener(self.channel, self._on_notify)
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning(f"Could not LISTEN on {self.channel}: {e}")
+                return
+            self._conn = conn
+
+    def _on_notify(self, conn, pid, channel, payload):
+        try:
+            _invalidate_local(int(payload))
+        except ValueError:
+            logger.error(f"Invalid user event payload on {channel}: {payload}")
+
+    def _on_terminated(self, conn):
+        logger.warning(f"LISTEN connection for {self.channel} closed")
+        self._conn = None
+        # Invalidations may have been missed meanwhile
+        _tokens.clear()
+
+    async def close(self):
+        async with self._lock:
+            if self._conn is not None:
+                conn, self._conn = self._conn, None
+                await conn.close()
+
+
+user_events = _UserEventListener(config.AUTH_EVENTS_CHANNEL)
+
+
+async def close_user_events():
+    await user_events.close()
+
+
+async def invalidate_user(user_id: int, conn: Optional[asyncpg.Connection] = None):
+    """
+    Drops cached tokens of user_id in every worker. Call it after the
+    user's row changed or was deleted.
+    """
+    _invalidate_local(user_id)
+    async with acquire(conn) as conn:
+        await conn.execute(
+            "SELECT pg_notify($1, $2)", config.AUTH_EVENTS_CHANNEL, str(user_id)
+        )
+
+
+async def _load_user(user_id: int) -> Optional[GetUser]:
+    async with acquire() as conn:
+        row = await queries.fetchrow(conn, GET_USER, user_id)
+    if row is None:
+        return None
+    return GetUser(
+        id=row["id"],
+        email=row["email"],
+        phone_number=row["phone_number"],
+        profile_picture=row["profile_picture"],
+        firstname=row["firstname"],
+        lastname=row["lastname"],
+        role=row["role"],
+        subscription_id=row["subscription_id"],
+        company_id=row["company_id"],
+        createdOn=row["createdon"],
+        updatedOn=row["updatedon"],
+    )
+
+
+async def get_current_user(token: str = Depends(security.oauth2_scheme)) -> GetUser:
+    """
+    FastAPI dependency returning the user of the request's bearer token;
+    401 if the token is invalid, expired or its user no longer exists.
+    """
+    key = token.rpartition(".")[2]
+    cached = _tokens.get(key)
+    if cached is not None and cached.token == token and _is_current(cached):
+        return cached.user
+
+    claims = security.decode_access_token(token)
+    await user_events.ensure_listening()
+    # Taken before loading, so an invalidation during the load wins
+    loaded_at = time.monotonic()
+    user = await _load_user(claims.user_id)
+    if user is None:
+        raise security.credentials_exception()
+    ttl = min(config.AUTH_CACHE_TTL, claims.exp.timestamp() - time.time())
+    if ttl > 0:
+        _tokens.set(key, _CachedToken(token, claims, user, loaded_at), ttl)
+    return user
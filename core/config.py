@@ -0,0 +1,109 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _int_env(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _float_env(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def _bool_env(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+
+POSTGRES_USER = os.getenv("POSTGRES_USER", "postgres")
+POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "postgres")
+POSTGRES_DB = os.getenv("POSTGRES_DB", "wizdocx")
+POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
+POSTGRES_PORT = _int_env("POSTGRES_PORT", 5432)
+
+# Connection pool, one per gunicorn worker process
+DB_POOL_MIN_SIZE = _int_env("DB_POOL_MIN_SIZE", 2)
+DB_POOL_MAX_SIZE = _int_env("DB_POOL_MAX_SIZE", 10)
+# Idle connections older than this (seconds) are closed and reopened on demand
+DB_POOL_MAX_INACTIVE_LIFETIME = _float_env("DB_POOL_MAX_INACTIVE_LIFETIME", 300.0)
+# A connection is recycled after serving this many queries (0 disables)
+DB_POOL_MAX_QUERIES = _int_env("DB_POOL_MAX_QUERIES", 50000)
+# Server-side statement_timeout in milliseconds (0 disables)
+DB_STATEMENT_TIMEOUT_MS = _int_env("DB_STATEMENT_TIMEOUT_MS", 30000)
+
+# Uploads
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+UPLOAD_MAX_FILE_SIZE = _int_env("UPLOAD_MAX_FILE_SIZE", 90 * 1024 * 1024)
+UPLOAD_CHUNK_SIZE = _int_env("UPLOAD_CHUNK_SIZE", 1024 * 1024)
+# Store uploads once per distinct content under UPLOAD_DIR/objects/<aa>/<sha256>.pdf
+# instead of per user under UPLOAD_DIR/<user_id>/<filename>
+UPLOAD_CONTENT_ADDRESSED = _bool_env("UPLOAD_CONTENT_ADDRESSED", False)
+CONTENT_STORE_DIR = os.getenv("CONTENT_STORE_DIR", os.path.join(UPLOAD_DIR, "objects"))
+
+# PDF processing pool. Each gunicorn worker owns one pool, so the default
+# splits the cores between the two workers started by the Procfile.
+PDF_PROCESS_WORKERS = _int_env("PDF_PROCESS_WORKERS", max(1, (os.cpu_count() or 2) // 2))
+# Child processes are replaced after this many tasks to cap MuPDF memory growth
+PDF_PROCESS_MAX_TASKS_PER_CHILD = _int_env("PDF_PROCESS_MAX_TASKS_PER_CHILD", 50)
+# Documents are split into page ranges of at least this many pages, one
+# per pool process, so only large files are analysed in parallel
+PDF_PARALLEL_MIN_PAGES = _int_env("PDF_PARALLEL_MIN_PAGES", 200)
+# Default for the per-job "optimize" option of bookmark jobs (compact rewrite
+# of the *_bookmarked.pdf output)
+PDF_OPTIMIZE_OUTPUT = _bool_env("PDF_OPTIMIZE_OUTPUT", False)
+
+# PDF job queue workers
+JOB_WORKER_CONCURRENCY = _int_env("JOB_WORKER_CONCURRENCY", PDF_PROCESS_WORKERS)
+JOB_POLL_INTERVAL = _float_env("JOB_POLL_INTERVAL", 2.0)
+# A running job whose worker stops heartbeating is re-queued after this many seconds
+JOB_VISIBILITY_TIMEOUT = _int_env("JOB_VISIBILITY_TIMEOUT", 300)
+JOB_MAX_ATTEMPTS = _int_env("JOB_MAX_ATTEMPTS", 3)
+JOB_RETRY_BACKOFF_BASE = _float_env("JOB_RETRY_BACKOFF_BASE", 30.0)
+JOB_RETRY_BACKOFF_MAX = _float_env("JOB_RETRY_BACKOFF_MAX", 3600.0)
+
+# Processing events. Every sitestatus insert is NOTIFYed on this channel by
+# a trigger in scripts.sql; change both together.
+STATUS_EVENTS_CHANNEL = os.getenv("STATUS_EVENTS_CHANNEL", "sitestatus_events")
+# Seconds between keep-alive comments on idle event streams
+SSE_KEEPALIVE_INTERVAL = _float_env("SSE_KEEPALIVE_INTERVAL", 15.0)
+
+# Keyset-paginated listings
+PAGE_SIZE_DEFAULT = _int_env("PAGE_SIZE_DEFAULT", 100)
+PAGE_SIZE_MAX = _int_env("PAGE_SIZE_MAX", 1000)
+# Rows fetched per round trip by streaming exports
+EXPORT_FETCH_SIZE = _int_env("EXPORT_FETCH_SIZE", 1000)
+
+# Downloads. File metadata (id -> path, ETag) is cached per worker so
+# repeated range requests from PDF viewers skip the database.
+DOWNLOAD_CACHE_SIZE = _int_env("DOWNLOAD_CACHE_SIZE", 4096)
+DOWNLOAD_CACHE_TTL = _float_env("DOWNLOAD_CACHE_TTL", 300.0)
+DOWNLOAD_CHUNK_SIZE = _int_env("DOWNLOAD_CHUNK_SIZE", 1024 * 1024)
+
+# Send per-request stage timings (DB waits, queries, uploads, PDF work) to
+# clients in a Server-Timing header. They are logged either way.
+SERVER_TIMING_HEADER = _bool_env("SERVER_TIMING_HEADER", True)
+
+# Port on which a PDF job worker serves its own Prometheus metrics (0 = off).
+# Only needed when the worker does not share PROMETHEUS_MULTIPROC_DIR with
+# the API on the same host; see core/metrics.py.
+WORKER_METRICS_PORT = _int_env("WORKER_METRICS_PORT", 0)
+
+# cProfile every PDF job (otherwise only jobs enqueued with the X-Profile
+# header are profiled). Profiles are kept per file under PROFILE_DIR.
+PDF_PROFILE = _bool_env("PDF_PROFILE", False)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# Authentication. get_current_user caches verified tokens with their users
+# per worker until the token expires, but for at most AUTH_CACHE_TTL seconds.
+AUTH_CACHE_SIZE = _int_env("AUTH_CACHE_SIZE", 10000)
+AUTH_CACHE_TTL = _float_env("AUTH_CACHE_TTL", 300.0)
+# User updates and deletes are NOTIFYed on this channel so every worker
+# drops its cached entries for the user
+AUTH_EVENTS_CHANNEL = os.getenv("AUTH_EVENTS_CHANNEL", "user_events")
+
+# Password hashing (bcrypt) runs off the event loop in a pool of this many
+# threads per worker. Beyond PASSWORD_HASH_QUEUE_SIZE calls waiting for a
+# thread, register/login/user updates are answered with 429.
+PASSWORD_HASH_WORKERS = _int_env("PASSWORD_HASH_WORKERS", 2)
+PASSWORD_HASH_QUEUE_SIZE = _int_env("PASSWORD_HASH_QUEUE_SIZE", 16)
@@ -1,35 +1,129 @@
+import asyncio
 import asyncpg
+import json
 import os
-from dotenv import load_dotenv
 import pathlib
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from core import config, metrics, queries, timing
 
-load_dotenv()
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
 
 
-async def get_database() -> asyncpg.Connection:
-    load_dotenv()
-    conn = await asyncpg.connect(
-        user=os.getenv("POSTGRES_USER", "postgres"),
-        password=os.getenv("POSTGRES_PASSWORD", "postgres"),
-        database=os.getenv("POSTGRES_DB", "wizdocx"),
-        host=os.getenv("POSTGRES_HOST", "localhost"),
-        port=int(os.getenv("POSTGRES_PORT", 5432)),
+def _connect_kwargs() -> dict:
+    return dict(
+        user=config.POSTGRES_USER,
+        password=config.POSTGRES_PASSWORD,
+        database=config.POSTGRES_DB,
+        host=config.POSTGRES_HOST,
+        port=config.POSTGRES_PORT,
     )
-    return conn
 
 
-async def execute_sql_from_file():
+async def connect() -> asyncpg.Connection:
     """
-    Reads a .sql file from the given local path and executes its contents.
+    Opens a dedicated connection outside the pool, for sessions that hold
+    their connection indefinitely such as LISTEN.
     """
-    conn = await asyncpg.connect(
-        user=os.getenv("POSTGRES_USER", "postgres"),
-        password=os.getenv("POSTGRES_PASSWORD", "postgres"),
-        database=os.getenv("POSTGRES_DB", "wizdocx"),
-        host=os.getenv("POSTGRES_HOST", "localhost"),
-        port=int(os.getenv("POSTGRES_PORT", 5432)),
+    return await asyncpg.connect(**_connect_kwargs())
+
+
+def _record_query_time(query: asyncpg.connection.LoggedQuery):
+    timing.record("db_query", query.elapsed)
+
+
+async def _init_connection(conn: asyncpg.Connection):
+    await conn.set_type_codec(
+        "jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
     )
+    conn.add_query_logger(_record_query_time)
+    await queries.prepare_all(conn)
+
+
+async def init_pool() -> asyncpg.Pool:
+    """
+    Creates the process-wide connection pool. Called from the app lifespan;
+    calling it again while a pool is open returns the existing pool.
+    """
+    global _pool
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await asyncpg.create_pool(
+                **_connect_kwargs(),
+                min_size=config.DB_POOL_MIN_SIZE,
+                max_size=config.DB_POOL_MAX_SIZE,
+                max_queries=config.DB_POOL_MAX_QUERIES,
+                max_inactive_connection_lifetime=config.DB_POOL_MAX_INACTIVE_LIFETIME,
+                server_settings={
+                    "statement_timeout": str(config.DB_STATEMENT_TIMEOUT_MS)
+                },
+                init=_init_connection,
+            )
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
+
+
+@asynccontextmanager
+async def acquire(
+    conn: Optional[asyncpg.Connection] = None,
+) -> AsyncIterator[asyncpg.Connection]:
+    """
+    Borrows a connection from the pool and returns it when the block exits.
+    The pool is created lazily for code running outside the app lifespan
+    (scripts, workers).
 
+    If conn is given it is used as-is, which lets a service method join a
+    transaction its caller already opened.
+    """
+    if conn is not None:
+        yield conn
+        return
+    pool = _pool or await init_pool()
+    start = time.perf_counter()
+    async with pool.acquire() as pooled:
+        waited = time.perf_counter() - start
+        timing.record("db_acquire", waited)
+        metrics.DB_ACQUIRE_SECONDS.observe(waited)
+        metrics.DB_POOL_CONNECTIONS.labels("open").set(pool.get_size())
+        in_use = metrics.DB_POOL_CONNECTIONS.labels("in_use")
+        in_use.inc()
+        try:
+            yield pooled
+        finally:
+            in_use.dec()
+
+
+@asynccontextmanager
+async def transaction() -> AsyncIterator[asyncpg.Connection]:
+    """
+    Borrows a connection and runs the block in a transaction on it; the
+    transaction is rolled back if the block raises.
+    """
+    async with acquire() as conn:
+        async with conn.transaction():
+            yield conn
+
+
+async def get_database() -> AsyncIterator[asyncpg.Connection]:
+    """
+    FastAPI dependency yielding a pooled connection for the request.
+    """
+    async with acquire() as conn:
+        yield conn
+
+
+async def execute_sql_from_file():
+    """
+    Reads a .sql file from the given local path and executes its contents.
+    """
     # Define the local file path for scripts.sql
     file_path = os.path.join(os.path.dirname(__file__), "scripts.sql")
     if not pathlib.Path(file_path).is_file():
@@ -38,5 +132,6 @@ async def execute_sql_from_file():
     with open(file_path, "r", encoding="utf-8") as sql_file:
         sql_text = sql_file.read()
 
-    result = await conn.execute(sql_text)
+    async with acquire() as conn:
+        result = await conn.execute(sql_text)
     return result
@@ -0,0 +1,88 @@
+"""
+In-process fan-out of processing events published with Postgres NOTIFY.
+
+Each API worker holds one dedicated LISTEN connection, however many
+clients are streaming, and routes every notification to the queues of the
+clients watching that PDF file.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+import asyncpg
+from core import config
+from core.database import connect
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per subscriber before the slowest clients start losing them
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class StatusEventHub:
+    def __init__(self, channel: str):
+        self.channel = channel
+        self._conn: Optional[asyncpg.Connection] = None
+        self._lock = asyncio.Lock()
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+
+    async def _ensure_listening(self):
+        async with self._lock:
+            if self._conn is not None and not self._conn.is_closed():
+                return
+            self._conn = await connect()
+            self._conn.add_termination_listener(self._on_terminated)
+            await self._conn.add_listener(self.channel, self._on_notify)
+
+    def _on_notify(self, conn, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.error(f"Invalid event payload on {channel}: {payload}")
+            return
+        for queue in self._subscribers.get(event.get("pdf_file_id"), ()):
+            if queue.full():
+                # Drop the oldest event rather than block the listener
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def _on_terminated(self, conn):
+        logger.warning(f"LISTEN connection for {self.channel} closed")
+        self._conn = None
+        # None ends every open stream; clients reconnect with Last-Event-ID
+        for queues in self._subscribers.values():
+            for queue in queues:
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    @asynccontextmanager
+    async def subscribe(self, pdf_file_id: int) -> AsyncIterator[asyncio.Queue]:
+        """
+        Yields a queue receiving the events of pdf_file_id as dicts, or
+        None once the listener connection is lost.
+        """
+        await self._ensure_listening()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[pdf_file_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[pdf_file_id].discard(queue)
+            if not self._subscribers[pdf_file_id]:
+                del self._subscribers[pdf_file_id]
+
+    async def close(self):
+        async with self._lock:
+            if self._conn is not None:
+                conn, self._conn = self._conn, None
+                await conn.close()
+
+
+status_events = StatusEventHub(config.STATUS_EVENTS_CHANNEL)
+
+
+async def close_status_events():
+    await status_events.close()
@@ -0,0 +1,77 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+from core import config, profiling, timing
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def init_process_pool() -> ProcessPoolExecutor:
+    """
+    Creates the process pool used for CPU-bound PDF work. Called from the app
+    lifespan; calling it again while a pool is open returns the existing pool.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=config.PDF_PROCESS_WORKERS,
+            # max_tasks_per_child cannot be combined with fork
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=config.PDF_PROCESS_MAX_TASKS_PER_CHILD,
+        )
+    return _executor
+
+
+async def shutdown_process_pool():
+    global _executor
+    if _executor is not None:
+        executor, _executor = _executor, None
+        await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+
+async def run_in_process(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Runs func(*args, **kwargs) in the PDF process pool and awaits the result.
+    func and its arguments must be picklable, i.e. module-level functions
+    taking paths rather than open documents.
+
+    Inside a core.profiling.profile_to() block the call is profiled in the
+    child and its stats added to the session.
+    """
+    global _executor
+    executor = init_process_pool()
+    loop = asyncio.get_running_loop()
+    session = profiling.current_session()
+    try:
+        with timing.stage(f"pdf_{func.__name__}"):
+            if session is None:
+                return await loop.run_in_executor(
+                    executor, functools.partial(func, *args, **kwargs)
+                )
+            result, stats_path = await loop.run_in_executor(
+                executor,
+                functools.partial(
+                    profiling.run_profiled,
+                    os.path.dirname(session.path),
+                    func,
+                    *args,
+                    **kwargs,
+                ),
+            )
+            session.parts.append(stats_path)
+            return result
+    except BrokenProcessPool:
+        # A child died (e.g. MuPDF crashed on a malformed file); start a
+        # fresh pool for the next caller instead of failing every task.
+        logger.error(f"PDF process pool broke while running {func.__name__}")
+        if _executor is executor:
+            _executor = None
+            executor.shutdown(wait=False)
+        raise
@@ -0,0 +1,125 @@
+"""
+Prometheus metrics for the API and the PDF pipeline.
+
+gunicorn runs every API worker in its own process, so when
+PROMETHEUS_MULTIPROC_DIR is set prometheus_client keeps each process's
+values in files in that directory and render() aggregates all of them
+(see gunicorn_config.py for the directory's lifecycle). A PDF job worker
+started with the same PROMETHEUS_MULTIPROC_DIR on the same host writes
+there too, so its job and page metrics are served by the API's /metrics;
+a worker on another host can serve its own with WORKER_METRICS_PORT.
+
+Without the variable (e.g. a single uvicorn process) the default
+in-process registry is used.
+"""
+import os
+from typing import Iterable, Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.metrics_core import Metric
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+# Jobs take seconds to minutes rather than milliseconds
+JOB_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, float("inf"))
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, by router (first path segment of the route)",
+    ["router", "method", "status"],
+)
+DB_ACQUIRE_SECONDS = Histogram(
+    "db_pool_acquire_seconds",
+    "Time spent waiting for a pooled database connection",
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "Latency of registered (prepared) queries, by query name",
+    ["query"],
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Database pool connections, open and currently borrowed",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+JOB_SECONDS = Histogram(
+    "pdf_job_duration_seconds",
+    "PDF job run time, by job type and outcome",
+    ["job_type", "outcome"],
+    buckets=JOB_BUCKETS,
+)
+PAGES_PROCESSED = Counter(
+    "pdf_pages_processed_total",
+    "PDF pages analysed by jobs; rate() gives pages per second",
+    ["job_type"],
+)
+UPLOAD_BYTES = Counter("pdf_upload_bytes_total", "Bytes of PDF uploads stored")
+UPLOAD_FILES = Counter("pdf_upload_files_total", "PDF files uploaded")
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending",
+    "Password hash/verify calls running in or queued for the hashing pool",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent computing password hashes, excluding queueing",
+    ["operation"],
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "Password hash/verify calls answered with 429 because the pool was saturated",
+    ["operation"],
+)
+
+
+def router_label(scope: dict) -> str:
+    """
+    Router a request was handled by: the first segment of the matched
+    route's path template, so /pdf/{id}/download is "pdf". Unmatched
+    requests share one label to keep cardinality bounded.
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if not path:
+        return "unmatched"
+    return path.strip("/").split("/", 1)[0] or "root"
+
+
+def observe_request(scope: dict, status: int, seconds: float):
+    REQUEST_SECONDS.labels(router_label(scope), scope["method"], str(status)).observe(
+        seconds
+    )
+
+
+class _Families:
+    def __init__(self, families: Iterable[Metric]):
+        self._families = list(families)
+
+    def collect(self) -> Iterable[Metric]:
+        return self._families
+
+
+def render(extra: Iterable[Metric] = ()) -> Tuple[bytes, str]:
+    """
+    Exposition-format body and content type for every process's metrics,
+    plus extra families computed at scrape time (e.g. from the database).
+    """
+    registry = REGISTRY
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    scraped = CollectorRegistry()
+    scraped.register(_Families(extra))
+    return generate_latest(registry) + generate_latest(scraped), CONTENT_TYPE_LATEST
@@ -0,0 +1,24 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+from fastapi import HTTPException
+
+
+def encode_cursor(created_on: datetime, row_id: int) -> str:
+    """
+    Opaque keyset cursor for the row a page ended on. Listings are ordered
+    by (createdOn, id) descending and the next page starts strictly after
+    this pair, so pages stay stable while new rows are inserted.
+    """
+    raw = json.dumps([created_on.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_on, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_on), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
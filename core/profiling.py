@@ -0,0 +1,129 @@
+"""
+Opt-in cProfile capture of PDF processing.
+
+The expensive work runs in the PDF process pool, so a profiler in the
+worker's own process would only see the event loop waiting. Instead,
+inside a profile_to() block run_in_process runs each task under cProfile
+in the pool child and collects the stats it dumps; when the block exits
+they are merged into one .prof file. A job split into parallel page
+ranges therefore yields a single profile covering every range.
+
+Profiles are stored per PDF file under config.PROFILE_DIR and can be
+opened with pstats, snakeviz and similar tools.
+"""
+import asyncio
+import cProfile
+import os
+import pstats
+import tempfile
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, List, NamedTuple, Optional, Tuple
+from core import config
+
+PROFILE_SUFFIX = ".prof"
+
+
+class ProfileSession(NamedTuple):
+    path: str
+    # Stats files dumped by pool children, merged when the session ends
+    parts: List[str]
+
+
+class ProfileInfo(NamedTuple):
+    name: str
+    size: int
+    created: datetime
+
+
+_session: ContextVar[Optional[ProfileSession]] = ContextVar(
+    "profile_session", default=None
+)
+
+
+def current_session() -> Optional[ProfileSession]:
+    return _session.get()
+
+
+def run_profiled(
+    stats_dir: str, func: Callable[..., Any], *args, **kwargs
+) -> Tuple[Any, str]:
+    """
+    Runs func under cProfile and dumps its stats to a new file in
+    stats_dir. Executed in the pool child; returns (result, stats path).
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    fd, stats_path = tempfile.mkstemp(
+        dir=stats_dir, prefix=".part-", suffix=PROFILE_SUFFIX
+    )
+    os.close(fd)
+    profiler.dump_stats(stats_path)
+    return result, stats_path
+
+
+def _merge(path: str, parts: List[str]):
+    try:
+        if parts:
+            stats = pstats.Stats(parts[0])
+            for part in parts[1:]:
+                stats.add(part)
+            stats.dump_stats(path)
+    finally:
+        for part in parts:
+            try:
+                os.unlink(part)
+            except FileNotFoundError:
+                pass
+
+
+@asynccontextmanager
+async def profile_to(path: str) -> AsyncIterator[ProfileSession]:
+    """
+    Profiles every run_in_process call made inside the block and writes
+    the merged stats to path. Nothing is written if no call was made,
+    e.g. when a job reused a cached result.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    session = ProfileSession(path, [])
+    token = _session.set(session)
+    try:
+        yield session
+    finally:
+        _session.reset(token)
+        await asyncio.to_thread(_merge, path, session.parts)
+
+
+def profile_dir(pdf_file_id: int) -> str:
+    return os.path.join(config.PROFILE_DIR, str(pdf_file_id))
+
+
+def profile_path(pdf_file_id: int, name: str) -> str:
+    """
+    Location of a profile of pdf_file_id. name is a bare file name as
+    listed by list_profiles; anything else is rejected.
+    """
+    if os.path.basename(name) != name or not name.endswith(PROFILE_SUFFIX):
+        raise ValueError(f"Invalid profile name: {name}")
+    return os.path.join(profile_dir(pdf_file_id), name)
+
+
+def list_profiles(pdf_file_id: int) -> List[ProfileInfo]:
+    profiles = []
+    try:
+        entries = list(os.scandir(profile_dir(pdf_file_id)))
+    except FileNotFoundError:
+        return profiles
+    for entry in entries:
+        if entry.name.startswith(".") or not entry.name.endswith(PROFILE_SUFFIX):
+            continue
+        stat = entry.stat()
+        profiles.append(
+            ProfileInfo(
+                entry.name,
+                stat.st_size,
+                datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+            )
+        )
+    return sorted(profiles, key=lambda profile: profile.created)
@@ -0,0 +1,123 @@
+"""
+Registry of hot queries, prepared once per pooled connection.
+
+Services declare a query at import time and run it by name:
+
+    GET_PDF_FILE = queries.register("pdffile.get", "SELECT * FROM pdffile WHERE id = $1")
+    ...
+    async with acquire() as conn:
+        row = await queries.fetchrow(conn, GET_PDF_FILE, file_id)
+
+Calls go through the connection's public fetch/fetchrow/fetchval/execute
+with the registered text, so they use asyncpg's per-connection statement
+cache, which lives as long as the pooled connection. The pool's init hook
+fills that cache with every registered query, so a call only binds and
+executes, without Postgres parsing and planning the text again. Queries
+that could not be prepared at init (e.g. a table created after the pool
+started) are prepared by their first call on that connection, and asyncpg
+re-prepares cached statements invalidated by a schema change.
+
+Calls, errors and latency are kept per query name (stats(), served at
+/admin/query-stats) and exported as the db_query_duration_seconds
+histogram.
+"""
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+import asyncpg
+from core import metrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_queries: Dict[str, str] = {}
+
+
+@dataclass
+class QueryStats:
+    calls: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.calls if self.calls else 0.0
+
+
+_stats: Dict[str, QueryStats] = {}
+
+
+def register(name: str, sql: str) -> str:
+    """
+    Declares a query and returns its name. Registering the same name
+    twice with different SQL is an error.
+    """
+    if _queries.get(name, sql) != sql:
+        raise ValueError(f"query {name!r} is already registered with other SQL")
+    _queries[name] = sql
+    _stats.setdefault(name, QueryStats())
+    return name
+
+
+async def prepare_all(conn: asyncpg.Connection):
+    """
+    Prepares every registered query into conn's statement cache; used as
+    part of the pool's connection init.
+    """
+    for name, sql in _queries.items():
+        try:
+            # An empty executemany prepares through the statement cache and
+            # runs nothing; Connection.prepare would bypass the cache
+            await conn.executemany(sql, [])
+        except asyncpg.PostgresError as e:
+            logger.warning(f"Could not prepare query {name}, will retry on use: {e}")
+
+
+async def _run(conn, name: str, method: str, args) -> Any:
+    stats = _stats[name]
+    start = time.perf_counter()
+    try:
+        return await getattr(conn, method)(_queries[name], *args)
+    except Exception:
+        stats.errors += 1
+        raise
+    finally:
+        # The db_query timing stage is recorded by the pool's query logger
+        elapsed = time.perf_counter() - start
+        stats.calls += 1
+        stats.total_seconds += elapsed
+        stats.max_seconds = max(stats.max_seconds, elapsed)
+        metrics.DB_QUERY_SECONDS.labels(name).observe(elapsed)
+
+
+async def fetch(conn, name: str, *args) -> List[asyncpg.Record]:
+    return await _run(conn, name, "fetch", args)
+
+
+async def fetchrow(conn, name: str, *args) -> Optional[asyncpg.Record]:
+    return await _run(conn, name, "fetchrow", args)
+
+
+async def fetchval(conn, name: str, *args) -> Any:
+    return await _run(conn, name, "fetchval", args)
+
+
+async def execute(conn, name: str, *args) -> str:
+    """
+    Runs the query for its effect and returns the command status, such
+    as "UPDATE 1", like Connection.execute.
+    """
+    return await _run(conn, name, "execute", args)
+
+
+def stats() -> Dict[str, dict]:
+    """
+    Call count, error count and latency of every registered query in
+    this process.
+    """
+    return {
+        name: {**asdict(query_stats), "mean_seconds": query_stats.mean_seconds}
+        for name, query_stats in sorted(_stats.items())
+    }
@@ -85,10 +85,16 @@ CREATE TABLE IF NOT EXISTS pdffile (
     processing_end_time TIMESTAMP WITH TIME ZONE,
     status varchar(50) DEFAULT FALSE,
     status_message VARCHAR(255) NULL,
+    content_hash CHAR(64) NULL, -- SHA-256 of the uploaded bytes
+    processed_hash CHAR(64) NULL, -- SHA-256 of the processed output
     createdOn TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
     updatedOn TIMESTAMP WITH TIME ZONE NULL,
     CONSTRAINT fk_user FOREIGN KEY (user_id) REFERENCES "user"(id)
 );
+CREATE INDEX IF NOT EXISTS idx_pdffile_content_hash ON pdffile (content_hash);
+-- Keyset pagination of listings, newest first, optionally per user
+CREATE INDEX IF NOT EXISTS idx_pdffile_created ON pdffile (createdOn, id);
+CREATE INDEX IF NOT EXISTS idx_pdffile_user_created ON pdffile (user_id, createdOn, id);
 
 DROP TABLE IF EXISTS pdfUserConfig CASCADE;
 
@@ -122,6 +128,8 @@ CREATE TABLE IF NOT EXISTS pdfqc (
     CONSTRAINT fk_pdf_file FOREIGN KEY (doc_id) REFERENCES pdffile(id)
 );
 
+CREATE INDEX IF NOT EXISTS idx_pdfqc_doc_id ON pdfqc (doc_id, id);
+
 -- Drop and create bookmarkitem table
 DROP TABLE IF EXISTS bookmarkitem CASCADE;
 CREATE TABLE IF NOT EXISTS bookmarkitem (
@@ -135,6 +143,8 @@ CREATE TABLE IF NOT EXISTS bookmarkitem (
     CONSTRAINT fk_pdf_file_bookmark FOREIGN KEY (pdf_file_id) REFERENCES pdffile(id)
 );
 
+CREATE INDEX IF NOT EXISTS idx_bookmarkitem_pdf_file_id ON bookmarkitem (pdf_file_id, id);
+
 
 
 -- Drop and create spellcheckresult table
@@ -164,7 +174,50 @@ CREATE TABLE IF NOT EXISTS sitestatus (
     CONSTRAINT fk_pdf_file_spellcheck FOREIGN KEY (pdf_file_id) REFERENCES pdffile(id)
 );
 
-Drop and create UserSubscription table
+CREATE INDEX IF NOT EXISTS idx_sitestatus_pdf_file_id ON sitestatus (pdf_file_id, id);
+CREATE INDEX IF NOT EXISTS idx_sitestatus_created ON sitestatus (createdOn, id);
+
+-- Publish every status row to listeners (GET /pdf/{id}/events)
+CREATE OR REPLACE FUNCTION notify_sitestatus() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('sitestatus_events', json_build_object(
+        'id', NEW.id,
+        'status_type', NEW.status_type,
+        'status_message', NEW.status_message,
+        'pdf_file_id', NEW.pdf_file_id,
+        'createdon', NEW.createdOn
+    )::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER sitestatus_notify AFTER INSERT ON sitestatus
+    FOR EACH ROW EXECUTE FUNCTION notify_sitestatus();
+
+-- Drop and create pdfjob table (durable PDF processing queue)
+DROP TABLE IF EXISTS pdfjob CASCADE;
+CREATE TABLE IF NOT EXISTS pdfjob (
+    id SERIAL PRIMARY KEY,
+    pdf_file_id INTEGER NOT NULL,
+    job_type VARCHAR(50) NOT NULL, -- e.g., QC, BOOKMARKS, SPELLCHECK
+    status VARCHAR(20) NOT NULL DEFAULT 'queued', -- queued, running, done, failed
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    result JSONB NOT NULL DEFAULT '{}'::jsonb, -- handler output, e.g. optimized sizes
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    locked_by VARCHAR(255) NULL,
+    locked_until TIMESTAMP WITH TIME ZONE NULL,
+    last_error TEXT NULL,
+    createdOn TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    updatedOn TIMESTAMP WITH TIME ZONE NULL,
+    CONSTRAINT fk_pdf_file_job FOREIGN KEY (pdf_file_id) REFERENCES pdffile(id) ON DELETE CASCADE
+);
+-- Workers only ever scan claimable jobs
+CREATE INDEX IF NOT EXISTS idx_pdfjob_claimable ON pdfjob (run_after, id)
+    WHERE status IN ('queued', 'running');
+
+-- Drop and create UserSubscription table
 DROP TABLE IF EXISTS "usersubscription" CASCADE;
 CREATE TABLE IF NOT EXISTS "usersubscription" (
     id SERIAL PRIMARY KEY,
@@ -181,7 +234,7 @@ CREATE TABLE IF NOT EXISTS "usersubscription" (
     CONSTRAINT fk_subscription_user FOREIGN KEY (subscription_id) REFERENCES subscription(id)
 );
 
- Drop and create UserPayment table
+-- Drop and create UserPayment table
 DROP TABLE IF EXISTS "userpayment" CASCADE;
 CREATE TABLE IF NOT EXISTS "userpayment" (
     id SERIAL PRIMARY KEY,
@@ -1,9 +1,16 @@
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+import asyncio
 import jwt
 import os
+import time
 from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
+from pydantic import ValidationError
+from core import config, metrics, timing
+from schemas.auth_schema import TokenClaims
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -27,30 +34,131 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+# bcrypt is deliberately slow (hundreds of milliseconds) and releases the
+# GIL, so request handlers hash in this pool instead of on the event loop
+_hash_executor: Optional[ThreadPoolExecutor] = None
+# Calls submitted to the pool and not yet finished, in this worker
+_hash_pending = 0
+
+
+def _hash_pool() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(
+            max_workers=config.PASSWORD_HASH_WORKERS,
+            thread_name_prefix="password-hash",
+        )
+    return _hash_executor
+
+
+def shutdown_hash_pool():
+    global _hash_executor
+    if _hash_executor is not None:
+        executor, _hash_executor = _hash_executor, None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _set_hash_pending(pending: int):
+    global _hash_pending
+    _hash_pending = pending
+    running = min(pending, config.PASSWORD_HASH_WORKERS)
+    metrics.PASSWORD_HASH_PENDING.labels("running").set(running)
+    metrics.PASSWORD_HASH_PENDING.labels("queued").set(pending - running)
+
+
+def _hash_done():
+    _set_hash_pending(_hash_pending - 1)
+
+
+def _call_in_loop(loop: asyncio.AbstractEventLoop, callback: Callable[[], Any]):
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        # The loop has closed; nothing is left to count for
+        pass
+
+
+def _timed_hash(operation: str, func: Callable[..., Any], *args) -> Any:
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        metrics.PASSWORD_HASH_SECONDS.labels(operation).observe(
+            time.perf_counter() - start
+        )
+
+
+async def _run_in_hash_pool(operation: str, func: Callable[..., Any], *args) -> Any:
+    """
+    Runs func in the hashing pool. Once PASSWORD_HASH_QUEUE_SIZE calls are
+    already waiting for a thread, raises a 429 HTTPException instead of
+    queueing more work that would only time out.
+    """
+    if _hash_pending >= config.PASSWORD_HASH_WORKERS + config.PASSWORD_HASH_QUEUE_SIZE:
+        metrics.PASSWORD_HASH_REJECTED.labels(operation).inc()
+        logger.warning(f"Password hashing saturated, rejecting {operation}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many password checks in progress, retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    loop = asyncio.get_running_loop()
+    future = _hash_pool().submit(_timed_hash, operation, func, *args)
+    _set_hash_pending(_hash_pending + 1)
+    # Counted down when the call finishes, not when its caller stops
+    # waiting: a request cancelled by a disconnect leaves bcrypt running
+    future.add_done_callback(lambda _: _call_in_loop(loop, _hash_done))
+    with timing.stage("password_hash"):
+        return await asyncio.wrap_future(future)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hash_pool("hash", hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(
+        "verify", verify_password, plain_password, hashed_password
+    )
+
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
 def create_access_token(
-    subject: str,
+    user_id: int,
+    email: str,
+    role: str,
     expires_delta: timedelta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
 ):
-    expire = datetime.now() + expires_delta
-    to_encode = {"sub": subject, "exp": expire}
+    expire = datetime.now(timezone.utc) + expires_delta
+    to_encode = {"sub": str(user_id), "email": email, "role": role, "exp": expire}
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def decode_access_token(token: str):
+def decode_access_token(token: str) -> TokenClaims:
+    """
+    Verifies the token's signature and expiry and returns its claims.
+    Raises a 401 HTTPException for invalid or expired tokens.
+    """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return email
-    except jwt.exceptions.PyJWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
+        payload = jwt.decode(
+            token,
+            SECRET_KEY,
+            algorithms=[ALGORITHM],
+            options={"require": ["sub", "exp"]},
+        )
+        return TokenClaims(
+            user_id=payload["sub"],
+            email=payload.get("email"),
+            role=payload.get("role"),
+            exp=payload["exp"],
         )
+    except (jwt.exceptions.PyJWTError, ValidationError):
+        raise credentials_exception()
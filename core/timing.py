@@ -0,0 +1,84 @@
+"""
+Stage timings for the request or job being handled.
+
+collect() installs a Timings object in a context variable for the
+duration of a block; code anywhere below it (DB helpers, the PDF process
+pool, upload streaming) adds to it with record() or stage() without
+having it passed in. Outside a collect() block both are no-ops.
+
+Time is summed per stage name, so stages run concurrently within one
+request (e.g. parallel page ranges) can add up to more than its total.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+
+class Timings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        # stage name -> [seconds, count], in first-recorded order
+        self.stages: Dict[str, List[float]] = {}
+
+    def add(self, name: str, seconds: float):
+        totals = self.stages.get(name)
+        if totals is None:
+            self.stages[name] = [seconds, 1]
+        else:
+            totals[0] += seconds
+            totals[1] += 1
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """
+        Server-Timing header value: the total so far followed by every
+        stage, durations in milliseconds.
+        """
+        metrics = [f"total;dur={self.elapsed * 1000:.1f}"]
+        for name, (seconds, count) in self.stages.items():
+            metric = f"{name};dur={seconds * 1000:.1f}"
+            if count > 1:
+                metric += f';desc="{count} calls"'
+            metrics.append(metric)
+        return ", ".join(metrics)
+
+    def log_fields(self) -> str:
+        """
+        The same figures as key=value pairs for a single log line.
+        """
+        fields = [f"total_ms={self.elapsed * 1000:.1f}"]
+        for name, (seconds, count) in self.stages.items():
+            fields.append(f"{name}_ms={seconds * 1000:.1f} {name}_count={count}")
+        return " ".join(fields)
+
+
+_current: ContextVar[Optional[Timings]] = ContextVar("timings", default=None)
+
+
+def record(name: str, seconds: float):
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+@contextmanager
+def collect() -> Iterator[Timings]:
+    timings = Timings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
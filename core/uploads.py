@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import List, Optional
+from fastapi import HTTPException, UploadFile
+from core import config
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    filename: str
+    size: int
+    sha256: str
+    # True for a content-store blob, which other uploads of the same bytes
+    # may already point at; such files are never deleted on rollback
+    shared: bool = False
+
+    @property
+    def directory(self) -> str:
+        return os.path.dirname(self.path)
+
+
+def _too_large(filename: str, max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File size exceeds {max_size // (1024 * 1024)} MB limit: {filename}",
+    )
+
+
+def _write_chunk(f_out, hasher, chunk: bytes):
+    hasher.update(chunk)
+    f_out.write(chunk)
+
+
+def content_store_path(sha256: str, content_store: str) -> str:
+    """
+    Location of a blob in the content-addressed store. Fanned out by the
+    first two hex digits so no directory grows unbounded.
+    """
+    return os.path.join(content_store, sha256[:2], f"{sha256}.pdf")
+
+
+def _commit_to_content_store(tmp_path: str, final_path: str):
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    if os.path.exists(final_path):
+        # Identical bytes are already stored; keep the existing blob
+        os.unlink(tmp_path)
+        return
+    os.replace(tmp_path, final_path)
+
+
+def _commit(tmp_path: str, final_path: str) -> str:
+    """
+    Moves tmp_path to final_path, or to "<name>-1.pdf", "<name>-2.pdf" ...
+    if that is taken, and returns the path used. An existing file is never
+    replaced: other rows point at it and at the hash of its bytes.
+    """
+    base, ext = os.path.splitext(final_path)
+    path, n = final_path, 0
+    while True:
+        try:
+            # Claim the name before moving the data in, so two concurrent
+            # uploads of the same name cannot both get it
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            n += 1
+            path = f"{base}-{n}{ext}"
+            continue
+        os.replace(tmp_path, path)
+        return path
+
+
+def discard_uploads(stored: List[StoredUpload]):
+    """
+    Removes the files a failed upload batch created, which restores the
+    upload directory as it was.
+
+    Content-store blobs are left alone, even ones this batch wrote: a
+    concurrent batch with the same bytes may have committed a row
+    pointing at the blob in the meantime. A blob no row references is
+    only wasted space, and can be swept up later.
+    """
+    for upload in stored:
+        if upload.shared:
+            continue
+        try:
+            os.unlink(upload.path)
+        except FileNotFoundError:
+            pass
+
+
+async def save_upload(
+    file: UploadFile,
+    dest_dir: str,
+    max_size: int = config.UPLOAD_MAX_FILE_SIZE,
+    chunk_size: int = config.UPLOAD_CHUNK_SIZE,
+    content_store: Optional[str] = None,
+) -> StoredUpload:
+    """
+    Streams an UploadFile to dest_dir in fixed-size chunks, computing its
+    SHA-256 on the way.
+
+    The data goes to a temporary file and is renamed to the final name only
+    once complete, so readers never see a partial PDF. If dest_dir already
+    has a file of that name, a numbered name is used instead; the returned
+    filename is the one on disk. The size limit is checked per chunk and
+    the write aborted as soon as it is exceeded.
+
+    With content_store set, dest_dir is ignored and the file is stored once
+    per distinct content at content_store_path(sha256); a re-upload of the
+    same bytes writes nothing new.
+    """
+    filename = os.path.basename(file.filename or "") or "unnamed.pdf"
+    if file.size is not None and file.size > max_size:
+        raise _too_large(filename, max_size)
+
+    tmp_dir = content_store or dest_dir
+    os.makedirs(tmp_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, prefix=".upload-", suffix=".part")
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f_out:
+            while chunk := await file.read(chunk_size):
+                size += len(chunk)
+                if size > max_size:
+                    raise _too_large(filename, max_size)
+                await asyncio.to_thread(_write_chunk, f_out, hasher, chunk)
+        sha256 = hasher.hexdigest()
+        if content_store:
+            final_path = content_store_path(sha256, content_store)
+            filename = os.path.basename(final_path)
+            await asyncio.to_thread(_commit_to_content_store, tmp_path, final_path)
+        else:
+            final_path = await asyncio.to_thread(
+                _commit, tmp_path, os.path.join(dest_dir, filename)
+            )
+            filename = os.path.basename(final_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return StoredUpload(
+        path=final_path,
+        filename=filename,
+        size=size,
+        sha256=sha256,
+        shared=bool(content_store),
+    )
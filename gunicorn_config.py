@@ -1,4 +1,41 @@
-  bind = "0.0.0.0:8080"
-    workers = 1
-    worker_class = "uvicorn.workers.UvicornWorker"
-    worker_tmp_dir = "/dev/shm"
+import glob
+import os
+
+bind = "0.0.0.0:8080"
+workers = 1
+worker_class = "uvicorn.workers.UvicornWorker"
+worker_tmp_dir = "/dev/shm"
+
+# Per-process Prometheus metric files, aggregated by /metrics; see
+# core/metrics.py. Must be set before the workers import the app.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/dev/shm/wizdocx-metrics")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def on_starting(server):
+    """
+    Removes metric files left by processes that no longer run, e.g. the
+    workers of a previous server. Files of a running PDF job worker sharing
+    the directory are kept.
+    """
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(path, exist_ok=True)
+    for db_file in glob.glob(os.path.join(path, "*.db")):
+        pid = os.path.splitext(os.path.basename(db_file))[0].rsplit("_", 1)[-1]
+        if pid.isdigit() and not _pid_alive(int(pid)):
+            os.unlink(db_file)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,53 @@
+import logging
+from core import config, metrics
+from core.timing import collect
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+class TimingMiddleware:
+    """
+    Times every HTTP request and its stages (DB connection waits, DB
+    queries, upload streaming, PDF work) via core.timing.
+
+    The stages so far are sent in a Server-Timing header with the response
+    start, and the final figures, including time spent streaming the body,
+    are logged as one line once the response is complete. The total also
+    feeds the request latency histogram served at /metrics.
+
+    Written as a plain ASGI middleware: BaseHTTPMiddleware would buffer
+    every body chunk through an extra task and queue.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if config.SERVER_TIMING_HEADER:
+                    headers = list(message.get("headers", []))
+                    headers.append(
+                        (b"server-timing", timings.server_timing().encode("latin-1"))
+                    )
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        with collect() as timings:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                metrics.observe_request(scope, status, timings.elapsed)
+                logger.info(
+                    f"request method={scope['method']} path={scope['path']} "
+                    f"status={status} {timings.log_fields()}"
+                )
@@ -1,12 +1,30 @@
+import hashlib
 import re
 import os
 import json
-import asyncio
-from collections import defaultdict
-from pypdf import PdfReader, PdfWriter
+import shutil
+import tempfile
+from typing import Optional
+import pymupdf
+from core.executor import run_in_process
+from pdfservices.headings import FontHeadingCollector
+from pdfservices.optimize import optimize_pdf
+from pdfservices.outline import OutlineRecord, build_outline
+from pdfservices.layout import (
+    PageLayout,
+    ProgressCallback,
+    iter_page_layouts,
+    map_page_ranges,
+    page_ranges,
+)
 
 BULLET_REGEX = re.compile(r"^(\d+(?:\.\d+)*)(?:[.)]?)\s+(.+)")
 TOC_LINE_REGEX = re.compile(r"^(.*?)[\s\.\-]{2,}(\d+)$")
+TOC_NUMBER_REGEX = re.compile(r"^(\d+(?:\.\d+)*)")
+
+
+# Pages searched for a printed table of contents
+TOC_PAGES = 5
 
 
 def extract_toc_from_text(text):
@@ -20,142 +38,230 @@ def extract_toc_from_text(text):
     return toc_entries
 
 
-def extract_bullets_from_doc(reader):
+def extract_bullets_from_page(layout: PageLayout):
     bookmarks = []
-    for i, page in enumerate(reader.pages):
-        text = page.extract_text()
-        if not text:
-            continue
-        for line in text.split("\n"):
-            match = BULLET_REGEX.match(line.strip())
-            if match:
-                bullet = match.group(1)
-                title = match.group(2)
-                level = bullet.count(".")
-                parent_key = ".".join(bullet.split(".")[:-1]) if level > 0 else None
-                bookmarks.append(
-                    {
-                        "key": bullet,
-                        "title": title.strip(),
-                        "page": i,
-                        "level": level,
-                        "parent_key": parent_key,
-                    }
-                )
+    for line in layout.lines:
+        match = BULLET_REGEX.match(line.text)
+        if match:
+            bullet = match.group(1)
+            title = match.group(2)
+            level = bullet.count(".")
+            bookmarks.append(
+                {
+                    "key": bullet,
+                    "title": title.strip(),
+                    "page": layout.number,
+                    "level": level,
+                }
+            )
     return bookmarks
 
 
-def extract_headers_by_font(reader):
-    font_sizes = defaultdict(list)
-    for i, page in enumerate(reader.pages):
-        if not page:
-            continue
-        try:
-            blocks = page.get_text("dict")["blocks"]
-        except Exception:
-            continue
-        for block in blocks:
-            for line in block.get("lines", []):
-                for span in line.get("spans", []):
-                    text = span.get("text", "").strip()
-                    if len(text) > 3 and not text.islower():
-                        font_sizes[round(span["size"], 1)].append((i, text))
-    if not font_sizes:
-        return []
-    top_fonts = sorted(font_sizes.keys(), reverse=True)[:3]
-    bookmarks = []
-    for level, size in enumerate(top_fonts, 1):
-        for page, title in font_sizes[size]:
-            bookmarks.append([level, title.strip(), page])
-    return bookmarks
+def scan_document(input_pdf_path, start=0, stop=None):
+    """
+    Walks the document once and gathers the input of every heuristic:
+    TOC entries from the first TOC_PAGES pages, numbered bullets and
+    font-size heading candidates from all pages. Stops after the TOC
+    pages when a TOC was found.
+
+    start and stop restrict the walk to a page range so a large document
+    can be scanned in parallel; see merge_scans.
+    """
+    toc_entries = []
+    bullets = []
+    headings = FontHeadingCollector()
+    with pymupdf.open(input_pdf_path) as doc:
+        for layout in iter_page_layouts(doc, start, stop):
+            if layout.number < TOC_PAGES:
+                toc_entries.extend(extract_toc_from_text(layout.text))
+            elif toc_entries:
+                # A printed TOC wins; the other heuristics are not needed
+                break
+            bullets.extend(extract_bullets_from_page(layout))
+            headings.add(layout)
+    return toc_entries, bullets, headings
 
 
-def normalize_bookmarks(bookmarks):
-    if not bookmarks:
-        return bookmarks
-    for b in bookmarks:
-        b[0] = int(b[0])
-    min_level = min(b[0] for b in bookmarks)
-    for b in bookmarks:
-        b[0] = b[0] - min_level + 1
-    return bookmarks
+def merge_scans(scans):
+    """
+    Combines scan_document results of consecutive page ranges, given in
+    page order, into the result of scanning the whole document.
+    """
+    toc_entries, bullets, headings = [], [], FontHeadingCollector()
+    for range_toc, range_bullets, range_headings in scans:
+        toc_entries.extend(range_toc)
+        bullets.extend(range_bullets)
+        headings.merge(range_headings)
+    return toc_entries, bullets, headings
+
+
+def to_toc(outline, page_count):
+    """
+    Converts build_outline entries to a PyMuPDF TOC, with pages 1-based
+    and clamped into the document.
+    """
+    return [
+        [level, title, min(max(page + 1, 1), page_count)]
+        for level, title, page in outline
+    ]
+
+
+def write_outline(input_pdf_path, output_pdf_path, outline):
+    """
+    Writes a copy of the input with outline as its bookmarks.
 
+    The copy is made at the OS level and the outline appended as an
+    incremental update, so only the new outline objects are serialized.
+    Documents MuPDF cannot update incrementally (repaired or encrypted
+    ones) are fully rewritten instead.
 
-async def add_bookmarks_to_pdf_file(input_pdf_path):
+    Returns:
+        "incremental" or "rewrite".
+    """
+    folder = os.path.dirname(output_pdf_path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".bookmarks-", suffix=".pdf")
+    os.close(fd)
+    try:
+        with pymupdf.open(input_pdf_path) as doc:
+            if doc.needs_pass:
+                raise ValueError("PDF is password protected")
+            incremental = doc.can_save_incrementally() and not doc.metadata.get(
+                "encryption"
+            )
+            if not incremental:
+                doc.set_toc(to_toc(outline, doc.page_count))
+                doc.save(tmp_path, garbage=1, encryption=pymupdf.PDF_ENCRYPT_KEEP)
+        if incremental:
+            shutil.copyfile(input_pdf_path, tmp_path)
+            with pymupdf.open(tmp_path) as doc:
+                doc.set_toc(to_toc(outline, doc.page_count))
+                doc.saveIncr()
+        os.replace(tmp_path, output_pdf_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return "incremental" if incremental else "rewrite"
+
+
+def bookmarked_suffix(optimize=False):
+    """
+    Name suffix of bookmarked outputs: "_bookmarked", or "_bookmarked_opt"
+    when optimized. Inputs in the content store are shared by every row
+    with their hash, so the two variants must not share a file.
+    """
+    return "_bookmarked_opt" if optimize else "_bookmarked"
+
+
+def bookmarked_path(input_pdf_path, optimize=False):
+    """
+    Where the bookmarked copy of input_pdf_path is written: next to it,
+    as <name><bookmarked_suffix(optimize)>.pdf.
+    """
+    base, ext = os.path.splitext(input_pdf_path)
+    return f"{base}{bookmarked_suffix(optimize)}{ext}"
+
+
+def create_bookmarks(input_pdf_path, scan=None, optimize=False):
     log = []
 
     if not os.path.isfile(input_pdf_path):
         return {"status": "error", "message": "Invalid file path", "log": log}
 
-    folder = os.path.dirname(input_pdf_path)
-    filename = os.path.basename(input_pdf_path)
-    base, ext = os.path.splitext(filename)
-    output_pdf_path = os.path.join(folder, f"{base}_bookmarked{ext}")
+    with pymupdf.open(input_pdf_path) as doc:
+        if doc.needs_pass:
+            # Pages cannot be read, let alone scanned, without the password
+            return {
+                "status": "error",
+                "message": "PDF is password protected",
+                "log": log,
+            }
+        page_count = doc.page_count
 
-    reader = await asyncio.to_thread(PdfReader, input_pdf_path)
-    writer = PdfWriter()
+    output_pdf_path = bookmarked_path(input_pdf_path, optimize)
 
-    for page in reader.pages:
-        writer.add_page(page)
-
-    # Extract TOC from first few pages
-    toc_text = ""
-    for page in reader.pages[:5]:
-        toc_text += page.extract_text() or ""
-
-    toc_entries = extract_toc_from_text(toc_text)
-    bookmarks = []
+    toc_entries, bullets, headings = scan or scan_document(input_pdf_path)
+    records = []
 
     if toc_entries:
         log.append("✅ TOC found.")
         for title, page in toc_entries:
-            level = title.count(".") + 1 if re.match(r"^\d+(\.\d+)*", title) else 1
+            number = TOC_NUMBER_REGEX.match(title)
+            key = number.group(1) if number else None
+            level = key.count(".") + 1 if key else 1
             title_clean = re.sub(r"[\s\.\-]{2,}\d+$", "", title).strip()
-            bookmarks.append([level, title_clean, page - 1])
+            records.append(OutlineRecord(key, title_clean, page - 1, level))
     else:
         log.append("ℹ️ No TOC found. Trying bullet pattern...")
-        bullets = extract_bullets_from_doc(reader)
         if bullets:
             log.append("✅ Bullet pattern found.")
-            bookmarks_map = {}
-            for b in bullets:
-                node = writer.add_outline_item(b["title"], b["page"])
-                bookmarks_map[b["key"]] = node
-            for b in bullets:
-                if b["parent_key"] in bookmarks_map:
-                    child = writer.add_outline_item(
-                        b["title"], b["page"], parent=bookmarks_map[b["parent_key"]]
-                    )
-                    bookmarks_map[b["key"]] = child
+            records = [
+                OutlineRecord(b["key"], b["title"], b["page"], b["level"] + 1)
+                for b in bullets
+            ]
         else:
             log.append("⚠️ No bullets found. Trying font size headers...")
-            bookmarks = extract_headers_by_font(reader)
-            if bookmarks:
+            records = [
+                OutlineRecord(None, title, page, level)
+                for level, title, page in headings.headings()
+            ]
+            if records:
                 log.append("✅ Font size-based headers found.")
-                bookmarks = normalize_bookmarks(bookmarks)
-                for level, title, page in bookmarks:
-                    writer.add_outline_item(title, page)
             else:
                 log.append("❌ No suitable headers found from font sizes.")
 
-    if bookmarks:
-        log.append("✅ Bookmarks added to writer.")
-        bookmarks = normalize_bookmarks(bookmarks)
-        parents = {0: None}
-        for level, title, page in bookmarks:
-            parent = parents.get(level - 1)
-            bookmark = writer.add_outline_item(title, page, parent=parent)
-            parents[level] = bookmark
+    # [level, title, page] for every entry written, whichever strategy won
+    outline = build_outline(records)
+    if outline:
+        log.append(f"✅ Outline built with {len(outline)} entries.")
     else:
         log.append("⚠️ No hierarchical bookmarks constructed.")
 
-    await asyncio.to_thread(writer.write, output_pdf_path)
+    try:
+        mode = write_outline(input_pdf_path, output_pdf_path, outline)
+    except ValueError as e:
+        return {"status": "error", "message": str(e), "log": log}
+    log.append(f"📄 Bookmarked PDF saved to {output_pdf_path} ({mode} save)")
 
-    log.append(f"📄 Bookmarked PDF saved to {output_pdf_path}")
+    optimization = None
+    if optimize:
+        optimization = optimize_pdf(output_pdf_path)
+        log.append(
+            f"🗜️ Output optimized: {optimization['size_before']} -> "
+            f"{optimization['size_after']} bytes"
+        )
+
+    with open(output_pdf_path, "rb") as f:
+        output_sha256 = hashlib.file_digest(f, "sha256").hexdigest()
 
     return {
         "status": "Bookmarks created successfully",
         "bookmarked_file": output_pdf_path,
-        "bookmarks": bookmarks,
+        "bookmarked_sha256": output_sha256,
+        "outline": outline,
+        # The bookmarks as written to the PDF: 1-based, clamped pages
+        "toc": to_toc(outline, page_count),
+        "optimization": optimization,
+        "save_mode": mode,
         "log": log,
     }
+
+
+async def add_bookmarks_to_pdf_file(
+    input_pdf_path,
+    on_progress: Optional[ProgressCallback] = None,
+    optimize: bool = False,
+):
+    ranges = await page_ranges(input_pdf_path)
+    if len(ranges) == 1:
+        result = await run_in_process(
+            create_bookmarks, input_pdf_path, optimize=optimize
+        )
+        if on_progress is not None and ranges[0][1]:
+            await on_progress(ranges[0][1], ranges[0][1])
+        return result
+    # Large document: scan page ranges in separate processes, each opening
+    # the file itself, then build the outline from the merged result.
+    scans = await map_page_ranges(scan_document, input_pdf_path, ranges, on_progress)
+    return await run_in_process(
+        create_bookmarks, input_pdf_path, merge_scans(scans), optimize=optimize
+    )
@@ -0,0 +1,163 @@
+"""
+Font-size based heading detection, the last-resort bookmark heuristic for
+documents with neither a printed TOC nor numbered headings.
+
+FontHeadingCollector is fed one PageLayout at a time during the single
+document pass and keeps only what it needs: a character-weighted font
+size histogram, the lines that could be headings, and the text of lines
+in the page margins. Heading tiers are chosen once the pass is done.
+"""
+import re
+from array import array
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Set
+import numpy as np
+from pdfservices.layout import PageLayout
+
+# Sizes are binned to half a point, so 11.96 and 12.0 count as one size
+SIZE_BIN = 0.5
+# A tier must be at least this much larger than the body text...
+MIN_SIZE_RATIO = 1.1
+# ...and hold at most this share of the document's characters
+MAX_TIER_SHARE = 0.15
+MAX_TIERS = 4
+MAX_TITLE_LENGTH = 150
+# Top and bottom band of the page, as a fraction of its height, where
+# running headers and footers live
+MARGIN_BAND = 0.1
+# Margin text repeated on at least this share of pages is running text
+RUNNING_SHARE = 0.3
+RUNNING_MIN_PAGES = 3
+
+_DIGITS = re.compile(r"\d+")
+_NUMBERED = re.compile(r"^\d+(?:\.\d+)*[.)]?\s")
+_SPACES = re.compile(r"\s+")
+
+
+class _Candidate(NamedTuple):
+    page: int
+    index: int  # row position on the page
+    size_bin: int
+    size: float
+    top: float
+    bottom: float
+    text: str
+    key: str
+
+
+def _running_key(text: str) -> str:
+    # "Page 3 of 40" and "Page 4 of 40" share a key
+    return _SPACES.sub(" ", _DIGITS.sub("#", text.lower())).strip()
+
+
+def _dominant_size(line) -> float:
+    """
+    Size of the span carrying the most characters, so a bold lead-in or
+    a footnote marker does not decide the size of the whole row.
+    """
+    best = max(line.spans, key=lambda span: len(span.text.strip()))
+    return best.size
+
+
+class FontHeadingCollector:
+    def __init__(self):
+        self._bins = array("q")
+        self._weights = array("f")
+        self._candidates: List[_Candidate] = []
+        self._margin_pages: Dict[str, Set[int]] = defaultdict(set)
+        self._pages = 0
+
+    def add(self, layout: PageLayout):
+        self._pages += 1
+        top_band = layout.height * MARGIN_BAND
+        bottom_band = layout.height - top_band
+        for index, line in enumerate(layout.lines):
+            if not line.spans:
+                continue
+            text = line.text
+            size = _dominant_size(line)
+            size_bin = round(size / SIZE_BIN)
+            self._bins.append(size_bin)
+            self._weights.append(len(text))
+            x0, y0, x1, y1 = line.bbox
+            key = _running_key(text)
+            if y1 <= top_band or y0 >= bottom_band:
+                self._margin_pages[key].add(layout.number)
+            if (
+                3 < len(text) <= MAX_TITLE_LENGTH
+                and not text.islower()
+                and any(c.isalpha() for c in text)
+            ):
+                self._candidates.append(
+                    _Candidate(layout.number, index, size_bin, size, y0, y1, text, key)
+                )
+
+    def merge(self, other: "FontHeadingCollector"):
+        """
+        Appends the state collected by another instance over the pages
+        that follow this one's, e.g. from a parallel page range.
+        """
+        self._bins.extend(other._bins)
+        self._weights.extend(other._weights)
+        self._candidates.extend(other._candidates)
+        for key, pages in other._margin_pages.items():
+            self._margin_pages[key].update(pages)
+        self._pages += other._pages
+
+    def heading_tiers(self) -> List[int]:
+        """
+        Size bins used for headings, largest first. The body size is the
+        histogram mode by character count; tiers are the larger, rare
+        sizes above it.
+        """
+        if not self._bins:
+            return []
+        bins = np.frombuffer(self._bins, dtype=np.int64)
+        weights = np.frombuffer(self._weights, dtype=np.float32)
+        offset = int(bins.min())
+        histogram = np.bincount(bins - offset, weights=weights)
+        body_bin = int(histogram.argmax()) + offset
+        present = np.nonzero(histogram)[0]
+        shares = histogram[present] / histogram.sum()
+        present = present + offset
+        mask = (present >= body_bin * MIN_SIZE_RATIO) & (shares <= MAX_TIER_SHARE)
+        return sorted(present[mask].tolist(), reverse=True)[:MAX_TIERS]
+
+    def _running_keys(self) -> Set[str]:
+        if self._pages < RUNNING_MIN_PAGES:
+            return set()
+        threshold = max(RUNNING_MIN_PAGES, self._pages * RUNNING_SHARE)
+        return {
+            key for key, pages in self._margin_pages.items() if len(pages) >= threshold
+        }
+
+    def headings(self) -> List[list]:
+        """
+        Returns [level, title, page] entries in document order.
+        Consecutive rows of the same tier on a page (a heading wrapped
+        over several lines) become one entry.
+        """
+        tiers = self.heading_tiers()
+        if not tiers:
+            return []
+        levels = {size_bin: level for level, size_bin in enumerate(tiers, 1)}
+        running = self._running_keys()
+        bookmarks = []
+        previous = None
+        for candidate in self._candidates:
+            level = levels.get(candidate.size_bin)
+            if level is None or candidate.key in running:
+                continue
+            if (
+                previous is not None
+                and previous.page == candidate.page
+                and previous.index + 1 == candidate.index
+                and bookmarks[-1][0] == level
+                and candidate.top - previous.bottom < candidate.size / 2
+                and not _NUMBERED.match(candidate.text)
+            ):
+                bookmarks[-1][1] = f"{bookmarks[-1][1]} {candidate.text}"
+            else:
+                bookmarks.append([level, candidate.text, candidate.page])
+            previous = candidate
+        return bookmarks
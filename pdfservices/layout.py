@@ -0,0 +1,185 @@
+"""
+One-pass page layout extraction shared by the bookmark engine and QC.
+
+Each page is read once with PyMuPDF get_text("dict") and reduced to a
+compact PageLayout: visual text rows with their spans, font sizes and
+bounding boxes. iter_page_layouts yields them one page at a time, so
+callers never hold more than the page they are working on.
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterator, List, NamedTuple, Optional, Tuple
+import pymupdf
+from core import config
+from core.executor import run_in_process
+
+# Dict extraction without image blocks: decoding embedded images is the
+# most expensive part of get_text("dict") and nothing here needs them.
+TEXT_FLAGS = pymupdf.TEXTFLAGS_DICT & ~pymupdf.TEXT_PRESERVE_IMAGES
+
+# Lines whose baselines are this close (in points) belong to one row
+BASELINE_TOLERANCE = 2.0
+
+BBox = Tuple[float, float, float, float]
+# Called with (pages_done, page_count) as analysis advances
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+class Span(NamedTuple):
+    text: str
+    size: float
+    font: str
+    flags: int
+    bbox: BBox
+
+
+class Line(NamedTuple):
+    """
+    One visual row of text. PyMuPDF splits a row into several lines when
+    it crosses blocks (e.g. a TOC title, its dot leader and the page
+    number); they are merged back here, left to right.
+    """
+    text: str
+    spans: Tuple[Span, ...]
+    bbox: BBox
+
+    @property
+    def size(self) -> float:
+        return max((span.size for span in self.spans), default=0.0)
+
+
+@dataclass
+class PageLayout:
+    number: int  # 0-based page index
+    width: float
+    height: float
+    lines: List[Line]
+
+    @property
+    def text(self) -> str:
+        return "\n".join(line.text for line in self.lines)
+
+
+def _merge_row(raw_lines: list) -> Line:
+    raw_lines.sort(key=lambda raw: raw["bbox"][0])
+    spans = tuple(
+        Span(
+            span["text"],
+            span["size"],
+            span["font"],
+            span["flags"],
+            tuple(span["bbox"]),
+        )
+        for raw in raw_lines
+        for span in raw["spans"]
+        if span["text"]
+    )
+    text = " ".join(
+        "".join(span["text"] for span in raw["spans"]).strip() for raw in raw_lines
+    ).strip()
+    x0 = min(raw["bbox"][0] for raw in raw_lines)
+    y0 = min(raw["bbox"][1] for raw in raw_lines)
+    x1 = max(raw["bbox"][2] for raw in raw_lines)
+    y1 = max(raw["bbox"][3] for raw in raw_lines)
+    return Line(text, spans, (x0, y0, x1, y1))
+
+
+def extract_page_layout(page: pymupdf.Page) -> PageLayout:
+    """
+    Reads one page's text with a single get_text("dict") call.
+    """
+    raw_lines = [
+        raw
+        for block in page.get_text("dict", flags=TEXT_FLAGS)["blocks"]
+        for raw in block.get("lines", ())
+        if raw["spans"]
+    ]
+    # Group by baseline (bottom of the line box), top to bottom
+    raw_lines.sort(key=lambda raw: raw["bbox"][3])
+    lines: List[Line] = []
+    row: list = []
+    for raw in raw_lines:
+        if row and raw["bbox"][3] - row[0]["bbox"][3] > BASELINE_TOLERANCE:
+            lines.append(_merge_row(row))
+            row = []
+        row.append(raw)
+    if row:
+        lines.append(_merge_row(row))
+    rect = page.rect
+    return PageLayout(
+        number=page.number,
+        width=rect.width,
+        height=rect.height,
+        lines=[line for line in lines if line.text],
+    )
+
+
+def iter_page_layouts(
+    doc: pymupdf.Document, start: int = 0, stop: Optional[int] = None
+) -> Iterator[PageLayout]:
+    """
+    Yields the layout of pages [start, stop) in order. Pages MuPDF cannot
+    parse are skipped rather than failing the whole document.
+    """
+    stop = doc.page_count if stop is None else min(stop, doc.page_count)
+    for page in doc.pages(start, stop):
+        try:
+            yield extract_page_layout(page)
+        except (RuntimeError, ValueError):
+            continue
+
+
+def split_page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """
+    Splits [0, page_count) into at most parts contiguous ranges of near
+    equal size, each at least config.PDF_PARALLEL_MIN_PAGES long.
+    """
+    parts = max(1, min(parts, page_count // max(config.PDF_PARALLEL_MIN_PAGES, 1)))
+    bounds = [page_count * i // parts for i in range(parts + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def get_page_count(file_path: str) -> int:
+    with pymupdf.open(file_path) as doc:
+        if doc.needs_pass:
+            raise ValueError("PDF is password protected")
+        return doc.page_count
+
+
+async def page_ranges(file_path: str) -> List[Tuple[int, int]]:
+    """
+    Page ranges to analyse file_path in, one per pool process. A single
+    range means the document should be handled in one task; that is also
+    the answer for files that cannot be opened or read here, so the engine
+    reports the error itself.
+    """
+    try:
+        page_count = await asyncio.to_thread(get_page_count, file_path)
+    except Exception:
+        return [(0, 0)]
+    return split_page_ranges(page_count, config.PDF_PROCESS_WORKERS)
+
+
+async def map_page_ranges(
+    func: Callable[..., Any],
+    file_path: str,
+    ranges: List[Tuple[int, int]],
+    on_progress: Optional[ProgressCallback] = None,
+) -> list:
+    """
+    Runs func(file_path, start, stop) for every range in the process pool
+    and returns the results in range order, whatever order they finish
+    in. on_progress is awaited as each range completes.
+    """
+    page_count = ranges[-1][1]
+    pages_done = 0
+
+    async def run(start: int, stop: int):
+        nonlocal pages_done
+        result = await run_in_process(func, file_path, start, stop)
+        pages_done += stop - start
+        if on_progress is not None:
+            await on_progress(pages_done, page_count)
+        return result
+
+    return await asyncio.gather(*(run(start, stop) for start, stop in ranges))
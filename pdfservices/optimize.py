@@ -0,0 +1,48 @@
+"""
+Output optimisation for generated PDFs: a full PyMuPDF rewrite that drops
+unused objects, deflates every stream and packs objects into compressed
+object streams.
+
+MuPDF 1.24+ no longer writes linearised files ("fast web view"); quick
+first-page display comes from HTTP range requests on the download
+endpoint instead, which compact files make cheaper.
+"""
+import os
+import tempfile
+import pymupdf
+
+# garbage=2 also compacts the xref table; 3+ adds object de-duplication,
+# which is superlinear and costs seconds on large scans for ~0.1% gain.
+SAVE_OPTIONS = dict(
+    garbage=2,
+    deflate=True,
+    deflate_images=True,
+    deflate_fonts=True,
+    use_objstms=1,
+)
+
+
+def optimize_pdf(path: str) -> dict:
+    """
+    Rewrites the PDF at path in place when that makes it smaller.
+
+    Returns:
+        {"size_before": ..., "size_after": ...} in bytes.
+    """
+    size_before = os.path.getsize(path)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", prefix=".optimize-", suffix=".pdf"
+    )
+    os.close(fd)
+    try:
+        with pymupdf.open(path) as doc:
+            doc.save(tmp_path, **SAVE_OPTIONS)
+        size_after = os.path.getsize(tmp_path)
+        if size_after < size_before:
+            os.replace(tmp_path, path)
+        else:
+            size_after = size_before
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return {"size_before": size_before, "size_after": size_after}
@@ -0,0 +1,76 @@
+"""
+Outline-tree builder shared by every bookmark strategy.
+
+Each strategy (printed TOC, numbered bullets, font-size headings) reduces
+its findings to OutlineRecords in document order. build_outline resolves
+every record's parent in a single pass with a stack of open ancestors,
+drops repeated headings and returns the nested outline as the
+[level, title, page] list PyMuPDF's set_toc and the bookmarkitem table
+both use.
+"""
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+_SPACES = re.compile(r"\s+")
+
+
+class OutlineRecord(NamedTuple):
+    # Dotted section number ("2.3.1") when the heading is numbered. A
+    # keyed record is nested under the closest open ancestor key, so
+    # "2.3.1" lands under "2.3" (or "2" when 2.3 was never seen).
+    key: Optional[str]
+    title: str
+    page: int  # 0-based page index
+    # Requested depth, 1 = top level. Only used to place unkeyed records,
+    # and clamped so it is never more than one below the parent.
+    level: int
+
+
+_Signature = Tuple[Optional[str], str]
+
+
+class _Frame(NamedTuple):
+    key: Optional[str]
+    level: int
+    # Frames of the children emitted under this entry so far
+    children: Dict[_Signature, "_Frame"]
+
+
+def _is_ancestor(frame: _Frame, record: OutlineRecord) -> bool:
+    if record.key is not None and frame.key is not None:
+        return record.key.startswith(frame.key + ".")
+    return frame.level < record.level
+
+
+def _signature(record: OutlineRecord) -> _Signature:
+    return record.key, _SPACES.sub(" ", record.title).strip().casefold()
+
+
+def build_outline(records: List[OutlineRecord]) -> List[list]:
+    """
+    Returns [level, title, page] entries in document order, where level
+    is the entry's depth in the resolved tree.
+
+    A record repeating the key and title of an earlier sibling (the same
+    heading printed again, e.g. in a running header or a cross
+    reference) is dropped, and the records that follow it nest under the
+    first occurrence instead.
+    """
+    outline = []
+    root = _Frame(None, 0, {})
+    stack: List[_Frame] = [root]
+    for record in records:
+        if not record.title:
+            continue
+        # One push per record bounds the pops too: O(n) overall
+        while len(stack) > 1 and not _is_ancestor(stack[-1], record):
+            stack.pop()
+        parent = stack[-1]
+        signature = _signature(record)
+        frame = parent.children.get(signature)
+        if frame is None:
+            outline.append([len(stack), record.title, record.page])
+            frame = _Frame(record.key, max(record.level, parent.level + 1), {})
+            parent.children[signature] = frame
+        stack.append(frame)
+    return outline
@@ -1,20 +1,59 @@
 import os
+from typing import List, Optional
 import pymupdf  # PyMuPDF
-from PyPDF2 import PdfReader
-import os
-import asyncio
+from core.executor import run_in_process
+from pdfservices.layout import (
+    ProgressCallback,
+    extract_page_layout,
+    map_page_ranges,
+    page_ranges,
+)
 
 
-async def analyze_pdf_quality(file_path: str) -> dict:
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"PDF file not found: {file_path}")
+STANDARD_FONTS = frozenset(
+    [
+        "Courier",
+        "Courier-Bold",
+        "Courier-Oblique",
+        "Courier-BoldOblique",
+        "Helvetica",
+        "Helvetica-Bold",
+        "Helvetica-Oblique",
+        "Helvetica-BoldOblique",
+        "Times-Roman",
+        "Times-Bold",
+        "Times-Italic",
+        "Times-BoldItalic",
+        "Symbol",
+        "ZapfDingbats",
+    ]
+)
+
+MEDIA_ANNOT_TYPES = frozenset(
+    [
+        pymupdf.PDF_ANNOT_MOVIE,
+        pymupdf.PDF_ANNOT_SOUND,
+        pymupdf.PDF_ANNOT_SCREEN,
+        pymupdf.PDF_ANNOT_RICH_MEDIA,
+    ]
+)
 
-    reader = PdfReader(file_path)
+# Flags resolved by walking the pages; once all are True the walk stops.
+PAGE_FLAGS = (
+    "has_images",
+    "has_links",
+    "has_annotations",
+    "has_form_fields",
+    "has_media",
+    "has_tables",
+    "has_non_standard_fonts",
+)
 
-    is_encrypted = reader.is_encrypted
-    result = {
+
+def _empty_result() -> dict:
+    return {
         "is_security": False,
-        "is_encrypted": is_encrypted,
+        "is_encrypted": False,
         "has_bookmarks": False,
         "has_tags": False,
         "has_media": False,
@@ -27,63 +66,111 @@ async def analyze_pdf_quality(file_path: str) -> dict:
         "has_form_fields": False,
     }
 
-    if is_encrypted:
-        # PDF is password protected, stop further analysis
-        result["is_security"] = True
-        return result
-    else:
-        result["is_security"] = reader.metadata is not None and reader.metadata != {}
-        result["has_bookmarks"] = bool(reader.outline) if hasattr(reader, "outline") else False
-        result["has_tags"] = "/MarkInfo" in reader.pages[0].keys() if reader.pages else False
-        result["has_form_fields"] = any(
-            page.get("/Annots") for page in reader.pages if page.get("/Annots")
+
+def _catalog_has(doc: pymupdf.Document, key: str) -> bool:
+    return doc.xref_get_key(doc.pdf_catalog(), key)[0] != "null"
+
+
+def _has_outline(doc: pymupdf.Document) -> bool:
+    kind, value = doc.xref_get_key(doc.pdf_catalog(), "Outlines")
+    if kind != "xref":
+        return False
+    return doc.xref_get_key(int(value.split()[0]), "First")[0] != "null"
+
+
+def _has_metadata(doc: pymupdf.Document) -> bool:
+    return any(
+        value for key, value in doc.metadata.items() if key not in ("format", "encryption")
+    )
+
+
+def _scan_page(page: pymupdf.Page, result: dict, font_memo: dict):
+    """
+    Updates the page-level flags in result from a single page. Checks whose
+    flag is already set are skipped. font_memo maps font xref -> is_standard
+    so each embedded font is classified once per document.
+    """
+    if not result["has_images"] and page.get_images():
+        result["has_images"] = True
+    if not result["has_links"] and page.first_link is not None:
+        result["has_links"] = True
+    if not result["has_form_fields"] and page.first_widget is not None:
+        result["has_form_fields"] = True
+    if page.first_annot is not None:
+        result["has_annotations"] = True
+        if not result["has_media"]:
+            result["has_media"] = any(
+                annot.type[0] in MEDIA_ANNOT_TYPES for annot in page.annots()
+            )
+    if not result["has_non_standard_fonts"]:
+        for xref, _ext, _type, basefont, *_ in page.get_fonts():
+            result["has_fonts"] = True
+            if xref not in font_memo:
+                # Strip the subset prefix, e.g. "ABCDEF+Arial" -> "Arial"
+                font_memo[xref] = basefont.split("+")[-1] in STANDARD_FONTS
+            if not font_memo[xref]:
+                result["has_non_standard_fonts"] = True
+                break
+    if not result["has_tables"]:
+        # Only this page's text is held, never the whole document's
+        result["has_tables"] = "table" in extract_page_layout(page).text.lower()
+
+
+def check_pdf_quality(file_path: str, start: int = 0, stop: Optional[int] = None) -> dict:
+    """
+    Runs every QC check over a PDF with one open and one page walk.
+
+    start and stop restrict the page walk to a range so a large document
+    can be checked in parallel; document-level checks are cheap catalog
+    lookups and run in every range. See merge_qc_results.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"PDF file not found: {file_path}")
+
+    result = _empty_result()
+    with pymupdf.open(file_path) as doc:
+        result["is_encrypted"] = doc.needs_pass or bool(doc.metadata.get("encryption"))
+        if result["is_encrypted"]:
+            # PDF is password protected, stop further analysis
+            result["is_security"] = True
+            return result
+
+        result["is_security"] = _has_metadata(doc)
+        result["has_bookmarks"] = _has_outline(doc)
+        result["has_tags"] = _catalog_has(doc, "MarkInfo") or _catalog_has(
+            doc, "StructTreeRoot"
         )
 
-        standard_fonts = [
-            "Courier",
-            "Courier-Bold",
-            "Courier-Oblique",
-            "Courier-BoldOblique",
-            "Helvetica",
-            "Helvetica-Bold",
-            "Helvetica-Oblique",
-            "Helvetica-BoldOblique",
-            "Times-Roman",
-            "Times-Bold",
-            "Times-Italic",
-            "Times-BoldItalic",
-            "Symbol",
-            "ZapfDingbats",
-        ]
-
-        try:
-            doc = pymupdf.open(file_path)
-            text = ""
-            all_fonts = set()
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text()
-                if not result["has_images"] and page.get_images(full=True):
-                    result["has_images"] = True
-                if not result["has_links"] and page.get_links():
-                    result["has_links"] = True
-                if not result["has_annotations"] and page.annots():
-                    result["has_annotations"] = True
-                fonts = page.get_fonts(full=True)
-                if fonts:
-                    result["has_fonts"] = True
-                    for font in fonts:
-                        font_name = doc.xref_object(font[0])[7].decode('utf-8') if isinstance(doc.xref_object(font[0])[7], bytes) else doc.xref_object(font[0])[7]
-                        all_fonts.add(font_name.split('+')[-1]) # Extract base font name
-
-            doc.close()
-            result["has_tables"] = "table" in text.lower()
-            result["has_non_standard_fonts"] = any(font not in standard_fonts for font in all_fonts)
-            # Media detection requires deeper XObject stream parsing, skipping for now
-            # result["has_media"] = ...
-
-        except Exception as e:
-            print(f"Error processing file with PyMuPDF: {e}")
-            # Continue with other information if available
-
-    return result
\ No newline at end of file
+        font_memo = {}
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for page in doc.pages(start, stop):
+            _scan_page(page, result, font_memo)
+            if all(result[flag] for flag in PAGE_FLAGS):
+                break
+
+    return result
+
+
+def merge_qc_results(results: List[dict]) -> dict:
+    """
+    Combines check_pdf_quality results of page ranges: a flag is set for
+    the document if it is set for any range.
+    """
+    merged = _empty_result()
+    for result in results:
+        for key, value in result.items():
+            merged[key] = merged.get(key, False) or value
+    return merged
+
+
+async def analyze_pdf_quality(
+    file_path: str, on_progress: Optional[ProgressCallback] = None
+) -> dict:
+    ranges = await page_ranges(file_path)
+    if len(ranges) == 1:
+        result = await run_in_process(check_pdf_quality, file_path)
+        if on_progress is not None and ranges[0][1]:
+            await on_progress(ranges[0][1], ranges[0][1])
+        return result
+    results = await map_page_ranges(check_pdf_quality, file_path, ranges, on_progress)
+    return merge_qc_results(results)
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel
 
@@ -17,6 +18,16 @@ class TokenData(BaseModel):
     email: Optional[str] = None
 
 
+class TokenClaims(BaseModel):
+    """
+    Verified claims of an access token; user_id is the "sub" claim.
+    """
+    user_id: int
+    email: str
+    role: str
+    exp: datetime
+
+
 class GoogleAuth(BaseModel):
     token: str
 
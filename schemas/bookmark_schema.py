@@ -0,0 +1,23 @@
+from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class BookmarkItemCreate(BaseModel):
+    """
+    Pydantic model for one outline entry generated for a PDF file.
+    page_number is 1-based.
+    """
+    title: str
+    page_number: int
+    level: int
+    pdf_file_id: int
+
+
+class BookmarkItemRead(BookmarkItemCreate):
+    """
+    Pydantic model representing the 'bookmarkitem' table.
+    """
+    id: int
+    createdon: Optional[datetime] = None
+    updatedon: Optional[datetime] = None
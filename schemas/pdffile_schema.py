@@ -15,6 +15,8 @@ class PDFFileCreate(BaseModel):
     processing_end_time: Optional[datetime] = None
     status: Optional[str] = ""
     status_message: Optional[str] = ""
+    content_hash: Optional[str] = None
+    processed_hash: Optional[str] = None
 
     class Config:
         json_encoders = {datetime: lambda v: v.isoformat() if v else None}
@@ -0,0 +1,37 @@
+from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel
+
+JOB_QC = "QC"
+JOB_BOOKMARKS = "BOOKMARKS"
+JOB_SPELLCHECK = "SPELLCHECK"
+
+
+class PDFJobCreate(BaseModel):
+    """
+    Pydantic model for enqueueing a PDF processing job.
+    """
+    pdf_file_id: int
+    job_type: str
+    payload: dict = {}
+    max_attempts: Optional[int] = None
+
+
+class PDFJobRead(BaseModel):
+    """
+    Pydantic model representing the 'pdfjob' table.
+    """
+    id: int
+    pdf_file_id: int
+    job_type: str
+    status: str
+    payload: dict = {}
+    result: dict = {}
+    attempts: int
+    max_attempts: int
+    run_after: Optional[datetime] = None
+    locked_by: Optional[str] = None
+    locked_until: Optional[datetime] = None
+    last_error: Optional[str] = None
+    createdon: Optional[datetime] = None
+    updatedon: Optional[datetime] = None
@@ -1,4 +1,5 @@
-from core.database import get_database
+from core import auth
+from core.database import acquire
 from schemas.user_company_schema import UserCompanyCreate, UserCompanyRead
 from typing import Optional, List
 import asyncpg
@@ -16,7 +17,6 @@ class UserCompanyService:
         """
         Creates a new user-company relationship entry in the database.
         """
-        conn: asyncpg.Connection = await get_database()
         query = """
             INSERT INTO usercompany (
                 user_id, company_id
@@ -28,8 +28,11 @@ class UserCompanyService:
             user_company.company_id,
         )
         try:
-            result = await conn.fetchrow(query, *values)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, *values)
+                if result:
+                    # The user's cached company_id is now out of date
+                    await auth.invalidate_user(result["user_id"], conn)
             if result:
                 return UserCompanyRead(
                     id=result["id"],
@@ -39,18 +42,16 @@ class UserCompanyService:
             return None
         except Exception as e:
             logging.error(f"Error creating user-company link: {e}")
-            await conn.close()
             raise
 
     async def get_user_company(self, user_company_id: int) -> Optional[UserCompanyRead]:
         """
         Retrieves a user-company relationship by its ID.
         """
-        conn: asyncpg.Connection = await get_database()
         query = "SELECT * FROM usercompany WHERE id = $1"
         try:
-            result = await conn.fetchrow(query, user_company_id)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, user_company_id)
             if result:
                 return UserCompanyRead(
                     id=result["id"],
@@ -60,18 +61,16 @@ class UserCompanyService:
             return None
         except Exception as e:
             logging.error(f"Error getting user-company link: {e}")
-            await conn.close()
             raise
 
     async def get_all_user_companies(self) -> List[UserCompanyRead]:
         """
         Retrieves all user-company relationship entries.
         """
-        conn: asyncpg.Connection = await get_database()
         query = "SELECT * FROM usercompany"
         try:
-            results = await conn.fetch(query)
-            await conn.close()
+            async with acquire() as conn:
+                results = await conn.fetch(query)
             finalresult: List[UserCompanyRead] = []
             if results:
                 for row in results:
@@ -84,7 +83,6 @@ class UserCompanyService:
             return finalresult
         except Exception as e:
             logging.error(f"Error getting all user-company links: {e}")
-            await conn.close()
             raise
 
     async def update_user_company(
@@ -93,13 +91,13 @@ class UserCompanyService:
         """
         Updates a user-company relationship.
         """
-        conn: asyncpg.Connection = await get_database()
         query = """
-            UPDATE usercompany SET
+            UPDATE usercompany uc SET
                 user_id = $1,
                 company_id = $2
-            WHERE id = $3
-            RETURNING id, user_id, company_id
+            FROM (SELECT id, user_id FROM usercompany WHERE id = $3 FOR UPDATE) old
+            WHERE uc.id = old.id
+            RETURNING uc.id, uc.user_id, uc.company_id, old.user_id AS old_user_id
         """
         values = (
             user_company.user_id,
@@ -107,8 +105,12 @@ class UserCompanyService:
             user_company_id,
         )
         try:
-            result = await conn.fetchrow(query, *values)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, *values)
+                if result:
+                    # Both the user moved out and the one moved in changed
+                    for user_id in {result["old_user_id"], result["user_id"]}:
+                        await auth.invalidate_user(user_id, conn)
             if result:
                 return UserCompanyRead(
                     id=result["id"],
@@ -118,20 +120,19 @@ class UserCompanyService:
             return None
         except Exception as e:
             logging.error(f"Error updating user-company link: {e}")
-            await conn.close()
             raise
 
     async def delete_user_company(self, user_company_id: int) -> bool:
         """
         Deletes a user-company relationship by ID.
         """
-        conn: asyncpg.Connection = await get_database()
         query = "DELETE FROM usercompany WHERE id = $1 RETURNING *"
         try:
-            result = await conn.fetchrow(query, user_company_id)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, user_company_id)
+                if result is not None:
+                    await auth.invalidate_user(result["user_id"], conn)
             return result is not None
         except Exception as e:
             logging.error(f"Error deleting user-company link: {e}")
-            await conn.close()
             raise
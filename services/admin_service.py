@@ -1,18 +1,17 @@
 import asyncpg
-from core.database import get_database
+from core.database import acquire
 from typing import List, Optional
 from schemas.user_schema import GetUser
 
 class AdminService:
     async def get_all_users(self) -> List[GetUser]:
-        conn: asyncpg.Connection = await get_database()
         query = '''
             SELECT id, email, phone_number, profile_picture, firstname, lastname, role, subscription_id,  createdon, updatedon
             FROM "user"
             ORDER BY createdon
         '''
-        result = await conn.fetch(query)
-        await conn.close()
+        async with acquire() as conn:
+            result = await conn.fetch(query)
         users: List[GetUser] = []
         for user in result:
             users.append(
@@ -32,14 +31,13 @@ class AdminService:
         return users
 
     async def get_user(self, user_id: int) -> Optional[GetUser]:
-        conn: asyncpg.Connection = await get_database()
         query = '''
             SELECT id, email, phone_number, profile_picture, firstname, lastname, subscription_id, company_id, role, createdon, updatedon
             FROM "user"
             WHERE id = $1
         '''
-        row = await conn.fetchrow(query, user_id)
-        await conn.close()
+        async with acquire() as conn:
+            row = await conn.fetchrow(query, user_id)
         if row:
             return GetUser(
                 id=int(row["id"]),
@@ -0,0 +1,58 @@
+from core.database import acquire
+from schemas.bookmark_schema import BookmarkItemCreate, BookmarkItemRead
+from typing import Optional, List
+import asyncpg
+import logging
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+# bookmarkitem.title is VARCHAR(255)
+MAX_TITLE_LENGTH = 255
+
+
+class BookmarkService:
+    async def replace_bookmarks(
+        self,
+        pdf_file_id: int,
+        items: List[BookmarkItemCreate],
+        conn: Optional[asyncpg.Connection] = None,
+    ) -> int:
+        """
+        Replaces the stored outline of a PDF file.
+
+        The old rows are deleted and the new ones streamed in with COPY, in
+        one transaction, so readers see either the previous outline or the
+        complete new one. Rows keep the order of items.
+
+        Returns:
+            The number of bookmarks stored.
+        """
+        records = [
+            (item.title[:MAX_TITLE_LENGTH], item.page_number, item.level, pdf_file_id)
+            for item in items
+        ]
+        async with acquire(conn) as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    "DELETE FROM bookmarkitem WHERE pdf_file_id = $1", pdf_file_id
+                )
+                if records:
+                    await conn.copy_records_to_table(
+                        "bookmarkitem",
+                        records=records,
+                        columns=["title", "page_number", "level", "pdf_file_id"],
+                    )
+        return len(records)
+
+    async def get_bookmarks(self, pdf_file_id: int) -> List[BookmarkItemRead]:
+        """
+        Returns the stored outline of a PDF file in document order.
+        """
+        query = """
+            SELECT id, title, page_number, level, pdf_file_id, createdon, updatedon
+            FROM bookmarkitem WHERE pdf_file_id = $1 ORDER BY id
+        """
+        async with acquire() as conn:
+            rows = await conn.fetch(query, pdf_file_id)
+        return [BookmarkItemRead(**dict(row)) for row in rows]
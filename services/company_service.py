@@ -1,4 +1,4 @@
-from core.database import get_database
+from core.database import acquire
 from schemas.company_schema import CompanyCreate, CompanyRead
 from typing import Optional, List
 from datetime import datetime, timezone
@@ -14,7 +14,6 @@ class CompanyService:
         """
         Creates a new company entry in the database.
         """
-        conn: asyncpg.Connection = await get_database()
         query = """
             INSERT INTO company (
                 name, address, city, state, zip_code, country,
@@ -41,8 +40,8 @@ class CompanyService:
             company.subscription_id,
         )
         try:
-            result = await conn.fetchrow(query, *values)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, *values)
             if result:
                 return CompanyRead(
                     id=result["id"],
@@ -61,14 +60,12 @@ class CompanyService:
             return None
         except Exception as e:
             logging.error(f"Error creating company: {e}")
-            await conn.close()
             raise
 
     async def get_company(self, company_id: int) -> Optional[CompanyRead]:
         """
         Retrieves a company entry by its ID.
         """
-        conn: asyncpg.Connection = await get_database()
         query = """
             SELECT id, name, address, city, state, zip_code, country,
                    phone_number, email, company_website, logo, subscription_id
@@ -76,8 +73,8 @@ class CompanyService:
             WHERE id = $1
         """
         try:
-            result = await conn.fetchrow(query, company_id)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, company_id)
             if result:
                 return CompanyRead(
                     id=result["id"],
@@ -96,7 +93,6 @@ class CompanyService:
             return None
         except Exception as e:
             logging.error(f"Error retrieving company: {e}")
-            await conn.close()
             raise
 
 
@@ -106,7 +102,6 @@ class CompanyService:
         """
         Updates an existing company entry in the database.
         """
-        conn: asyncpg.Connection = await get_database()
         query = """
             UPDATE company
             SET name = $1, address = $2, city = $3, state = $4, zip_code = $5, country = $6,
@@ -130,8 +125,8 @@ class CompanyService:
             company_id,
         )
         try:
-            result = await conn.fetchrow(query, *values)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, *values)
             if result:
                 return CompanyRead(
                     id=result["id"],
@@ -150,37 +145,33 @@ class CompanyService:
             return None
         except Exception as e:
             logging.error(f"Error updating company: {e}")
-            await conn.close()
             raise
 
     async def delete_company(self, company_id: int) -> bool:
         """
         Deletes a company entry from the database.
         """
-        conn: asyncpg.Connection = await get_database()
         query = "DELETE FROM company WHERE id = $1"
         try:
-            result = await conn.execute(query, company_id)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.execute(query, company_id)
             return result == "DELETE 1"
         except Exception as e:
             logging.error(f"Error deleting company: {e}")
-            await conn.close()
             raise
 
     async def list_companies(self) -> List[CompanyRead]:
         """
         Retrieves all company entries from the database.
         """
-        conn: asyncpg.Connection = await get_database()
         query = """
             SELECT id, name, address, city, state, zip_code, country,
                    phone_number, email, company_website, logo, subscription_id
             FROM company
         """
         try:
-            results = await conn.fetch(query)
-            await conn.close()
+            async with acquire() as conn:
+                results = await conn.fetch(query)
             companies = [
                 CompanyRead(
                     id=row["id"],
@@ -201,7 +192,6 @@ class CompanyService:
             return companies
         except Exception as e:
             logging.error(f"Error listing companies: {e}")
-            await conn.close()
             raise
         
             
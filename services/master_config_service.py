@@ -1,4 +1,4 @@
-from core.database import get_database
+from core.database import acquire
 from schemas.master_config_schema import PdfMasterConfigCreate, PdfMasterConfigRead
 from typing import Optional, List
 from datetime import datetime, timezone
@@ -16,7 +16,6 @@ class PdfMasterConfigService:
         """
         Creates a new PDF master config entry in the database.
         """
-        conn: asyncpg.Connection = await get_database()
         query = """
             INSERT INTO pdfMasterConfig (
                 configType, configName, configValue, configDescription, isChild, createdOn, updatedOn
@@ -34,8 +33,8 @@ class PdfMasterConfigService:
             now,
         )
         try:
-            result = await conn.fetchrow(query, *values)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, *values)
             if result:
                 return PdfMasterConfigRead(
                     id=result["id"],
@@ -52,7 +51,6 @@ class PdfMasterConfigService:
             return None
         except Exception as e:
             logging.error(f"Error creating PDF master config: {e}")
-            await conn.close()
             raise
 
     async def get_pdf_master_config(
@@ -61,11 +59,10 @@ class PdfMasterConfigService:
         """
         Retrieves a PDF master config entry by its ID.
         """
-        conn: asyncpg.Connection = await get_database()
         query = "SELECT * FROM pdfMasterConfig WHERE id = $1"
         try:
-            result = await conn.fetchrow(query, config_id)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, config_id)
             if result:
                 return PdfMasterConfigRead(
                     id=result["id"],
@@ -82,18 +79,16 @@ class PdfMasterConfigService:
             return None
         except Exception as e:
             logging.error(f"Error getting PDF master config: {e}")
-            await conn.close()
             raise
 
     async def get_all_pdf_master_configs(self) -> List[PdfMasterConfigRead]:
         """
         Retrieves all PDF master config entries.
         """
-        conn: asyncpg.Connection = await get_database()
         query = "SELECT * FROM pdfMasterConfig"
         try:
-            results = await conn.fetch(query)
-            await conn.close()
+            async with acquire() as conn:
+                results = await conn.fetch(query)
             finalresult: List[PdfMasterConfigRead] = []
             for row in results:
                 fr = PdfMasterConfigRead(
@@ -112,7 +107,6 @@ class PdfMasterConfigService:
             return finalresult
         except Exception as e:
             logging.error(f"Error getting all PDF master configs: {e}")
-            await conn.close()
             raise
 
     async def update_pdf_master_config(
@@ -121,7 +115,6 @@ class PdfMasterConfigService:
         """
         Updates an existing PDF master config entry.
         """
-        conn: asyncpg.Connection = await get_database()
         query = """
             UPDATE pdfMasterConfig SET
                 configType = $1,
@@ -143,8 +136,8 @@ class PdfMasterConfigService:
             config_id,
         )
         try:
-            result = await conn.fetchrow(query, *values)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, *values)
             if result:
                 return PdfMasterConfigRead(
                     id=result["id"],
@@ -161,20 +154,17 @@ class PdfMasterConfigService:
             return None
         except Exception as e:
             logging.error(f"Error updating PDF master config: {e}")
-            await conn.close()
             raise
 
     async def delete_pdf_master_config(self, config_id: int) -> bool:
         """
         Deletes a PDF master config entry by its ID.
         """
-        conn: asyncpg.Connection = await get_database()
         query = "DELETE FROM pdfMasterConfig WHERE id = $1 RETURNING *"
         try:
-            result = await conn.fetchrow(query, config_id)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, config_id)
             return result is not None
         except Exception as e:
             logging.error(f"Error deleting PDF master config: {e}")
-            await conn.close()
             raise
@@ -1,23 +1,57 @@
-from core.database import get_database
+from core import queries
+from core.database import acquire
 from schemas.pdffile_schema import PDFFileCreate, PDFFileRead
 from typing import Optional, List
 from datetime import datetime, timezone
+import asyncio
 import asyncpg
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+GET_PDF_FILE = queries.register("pdffile.get", "SELECT * FROM pdffile WHERE id = $1")
+
+UPDATE_PDF_FILE_STATUS = queries.register(
+    "pdffile.update_status",
+    "UPDATE public.pdffile set status=$1, updatedOn=$2 where id=$3 RETURNING *",
+)
+
+START_PROCESSING = queries.register(
+    "pdffile.start_processing",
+    """
+        UPDATE pdffile SET
+            status = 'processing', status_message = $2,
+            processing_start_time = $3, processing_end_time = NULL, updatedOn = $3
+        WHERE id = $1
+        RETURNING *
+    """,
+)
+
+FINISH_PROCESSING = queries.register(
+    "pdffile.finish_processing",
+    """
+        UPDATE pdffile SET
+            status = $2, status_message = $3,
+            processed_filename = COALESCE($4, processed_filename),
+            processed_path = COALESCE($5, processed_path),
+            processed_hash = COALESCE($7, processed_hash),
+            processing_end_time = $6, updatedOn = $6
+        WHERE id = $1
+        RETURNING *
+    """,
+)
+
 
 class PDFFileService:
     async def create_pdf_file(self, data: PDFFileCreate) -> Optional[PDFFileRead]:
-        conn = await get_database()
         query = """
             INSERT INTO pdffile (
                 user_id, filename, path, size, original_filename, processed_filename,
                 processed_path, processing_start_time, processing_end_time, status,status_message,
-                createdOn, updatedOn
-            ) VALUES ($1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12,$13)
+                content_hash, createdOn, updatedOn
+            ) VALUES ($1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12,$13,$14)
             RETURNING *
         """
         now = datetime.now(timezone.utc)
@@ -33,40 +67,138 @@ class PDFFileService:
             data.processing_end_time,
             data.status,
             data.status_message,
+            data.content_hash,
             now,
             now,
         )
-        result = await conn.fetchrow(query, *values)
-        await conn.close()
+        async with acquire() as conn:
+            result = await conn.fetchrow(query, *values)
         return PDFFileRead(**dict(result)) if result else None
 
+    async def create_pdf_files(
+        self, items: List[PDFFileCreate], conn: Optional[asyncpg.Connection] = None
+    ) -> List[PDFFileRead]:
+        """
+        Inserts many pdffile rows in a single round trip. Pass conn to make the
+        insert part of the caller's transaction.
+        """
+        if not items:
+            return []
+        query = """
+            INSERT INTO pdffile (
+                user_id, filename, path, size, original_filename, processed_filename,
+                processed_path, processing_start_time, processing_end_time, status,status_message,
+                content_hash, createdOn, updatedOn
+            )
+            SELECT u.*, $13::timestamptz, $13::timestamptz FROM unnest(
+                $1::integer[], $2::varchar[], $3::varchar[], $4::bigint[], $5::varchar[],
+                $6::varchar[], $7::varchar[], $8::timestamptz[], $9::timestamptz[],
+                $10::varchar[], $11::varchar[], $12::varchar[]
+            ) AS u
+            RETURNING *
+        """
+        now = datetime.now(timezone.utc)
+        values = (
+            [d.user_id for d in items],
+            [d.filename for d in items],
+            [d.path for d in items],
+            [d.size for d in items],
+            [d.original_filename for d in items],
+            [d.processed_filename for d in items],
+            [d.processed_path for d in items],
+            [d.processing_start_time for d in items],
+            [d.processing_end_time for d in items],
+            [d.status for d in items],
+            [d.status_message for d in items],
+            [d.content_hash for d in items],
+            now,
+        )
+        async with acquire(conn) as conn:
+            rows = await conn.fetch(query, *values)
+        # ids are assigned in input order
+        return sorted((PDFFileRead(**dict(row)) for row in rows), key=lambda f: f.id)
+
     async def get_all_pdf_files(self) -> List[PDFFileRead]:
-        conn = await get_database()
         query = "SELECT * FROM pdffile"
-        rows = await conn.fetch(query)
-        await conn.close()
+        async with acquire() as conn:
+            rows = await conn.fetch(query)
         return [PDFFileRead(**dict(row)) for row in rows]
 
     async def get_pdf_file(self, file_id: int) -> Optional[PDFFileRead]:
-        conn = await get_database()
-        query = "SELECT * FROM pdffile WHERE id = $1"
-        row = await conn.fetchrow(query, file_id)
-        await conn.close()
+        async with acquire() as conn:
+            row = await queries.fetchrow(conn, GET_PDF_FILE, file_id)
         return PDFFileRead(**dict(row)) if row else None
 
+    async def get_processed_by_hash(
+        self, content_hash: str, output_suffix: str, exclude_id: Optional[int] = None
+    ) -> Optional[PDFFileRead]:
+        """
+        Returns the most recent file with the same content whose processed
+        output still exists on disk and was named with output_suffix (which
+        records how it was produced, e.g. optimized), so its results can be
+        reused.
+        """
+        query = """
+            SELECT * FROM pdffile
+            WHERE content_hash = $1 AND id <> $2 AND processed_filename LIKE $3
+            ORDER BY processing_end_time DESC NULLS LAST
+        """
+        name_pattern = "%" + output_suffix.replace("_", r"\_") + ".%"
+        values = (content_hash, exclude_id or 0, name_pattern)
+        async with acquire() as conn:
+            rows = await conn.fetch(query, *values)
+        for row in rows:
+            pdffile = PDFFileRead(**dict(row))
+            if await asyncio.to_thread(
+                os.path.isfile,
+                os.path.join(pdffile.processed_path, pdffile.processed_filename),
+            ):
+                return pdffile
+        return None
+
     async def delete_pdf_file(self, file_id: int) -> Optional[PDFFileRead]:
-        conn = await get_database()
         query = "DELETE FROM pdffile WHERE id = $1 RETURNING *"
-        row = await conn.fetchrow(query, file_id)
-        await conn.close()
+        async with acquire() as conn:
+            row = await conn.fetchrow(query, file_id)
+        return PDFFileRead(**dict(row)) if row else None
+
+    async def update_pdf_file_status(
+        self, file_id: int, status: str
+    ) -> Optional[PDFFileRead]:
+        values = (status, datetime.now(timezone.utc), file_id)
+        async with acquire() as conn:
+            row = await queries.fetchrow(conn, UPDATE_PDF_FILE_STATUS, *values)
         return PDFFileRead(**dict(row)) if row else None
 
-    async def update_pdf_file_status(self, file_id: int, status: str):
-        conn = await get_database()
-        query = "UPDATE public.pdffile set status=$1 where id=$2 RETURNING *"
-        values = (status, file_id)
-        await conn.execute(query, *values)
-        row = await conn.fetchrow(query, file_id)
-        await conn.close()
-        
-        
+    async def start_processing(
+        self, file_id: int, status_message: str = ""
+    ) -> Optional[PDFFileRead]:
+        now = datetime.now(timezone.utc)
+        async with acquire() as conn:
+            row = await queries.fetchrow(
+                conn, START_PROCESSING, file_id, status_message, now
+            )
+        return PDFFileRead(**dict(row)) if row else None
+
+    async def finish_processing(
+        self,
+        file_id: int,
+        status: str,
+        status_message: str = "",
+        processed_filename: Optional[str] = None,
+        processed_path: Optional[str] = None,
+        processed_hash: Optional[str] = None,
+    ) -> Optional[PDFFileRead]:
+        now = datetime.now(timezone.utc)
+        values = (
+            file_id,
+            status,
+            status_message[:255],
+            processed_filename,
+            processed_path,
+            now,
+            processed_hash,
+        )
+        async with acquire() as conn:
+            row = await queries.fetchrow(conn, FINISH_PROCESSING, *values)
+        return PDFFileRead(**dict(row)) if row else None
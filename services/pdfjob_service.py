@@ -0,0 +1,210 @@
+from core.database import acquire
+from core import config, queries
+from schemas.pdfjob_schema import PDFJobCreate, PDFJobRead
+from typing import Optional, List, Tuple
+import asyncpg
+import logging
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+CLAIM_JOB = queries.register(
+    "pdfjob.claim",
+    """
+        WITH next_job AS (
+            SELECT id FROM pdfjob
+            WHERE job_type = ANY($1::varchar[])
+              AND ((status = 'queued' AND run_after <= NOW())
+                   OR (status = 'running' AND locked_until < NOW()))
+            ORDER BY run_after, id
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE pdfjob AS job SET
+            status = 'running',
+            attempts = job.attempts + 1,
+            locked_by = $2,
+            locked_until = NOW() + make_interval(secs => $3),
+            updatedon = NOW()
+        FROM next_job
+        WHERE job.id = next_job.id
+        RETURNING job.*
+    """,
+)
+
+EXTEND_LOCK = queries.register(
+    "pdfjob.extend_lock",
+    """
+        UPDATE pdfjob SET locked_until = NOW() + make_interval(secs => $3)
+        WHERE id = $1 AND locked_by = $2 AND status = 'running'
+    """,
+)
+
+COMPLETE_JOB = queries.register(
+    "pdfjob.complete",
+    """
+        UPDATE pdfjob SET
+            status = 'done', locked_by = NULL, locked_until = NULL,
+            last_error = NULL, result = $3, updatedon = NOW()
+        WHERE id = $1 AND locked_by = $2
+    """,
+)
+
+
+class PDFJobService:
+    async def enqueue_job(self, job: PDFJobCreate) -> Optional[PDFJobRead]:
+        """
+        Adds a job to the queue; it becomes claimable immediately.
+
+        Args:
+            job: The PDFJobCreate object describing the work.
+
+        Returns:
+            The queued job as a PDFJobRead object.
+        """
+        query = """
+            INSERT INTO pdfjob (
+                pdf_file_id, job_type, payload, max_attempts, createdon, updatedon
+            ) VALUES ($1, $2, $3, $4, NOW(), NOW())
+            RETURNING *
+        """
+        values = (
+            job.pdf_file_id,
+            job.job_type,
+            job.payload,
+            job.max_attempts or config.JOB_MAX_ATTEMPTS,
+        )
+        async with acquire() as conn:
+            row = await conn.fetchrow(query, *values)
+        return PDFJobRead(**dict(row)) if row else None
+
+    async def enqueue_jobs(
+        self, jobs: List[PDFJobCreate], conn: Optional[asyncpg.Connection] = None
+    ) -> List[PDFJobRead]:
+        """
+        Adds many jobs in a single round trip. Pass conn to enqueue inside the
+        caller's transaction, so jobs only exist if the rest of it commits.
+        """
+        if not jobs:
+            return []
+        query = """
+            INSERT INTO pdfjob (
+                pdf_file_id, job_type, payload, max_attempts, createdon, updatedon
+            )
+            SELECT u.*, NOW(), NOW()
+            FROM unnest($1::integer[], $2::varchar[], $3::jsonb[], $4::integer[]) AS u
+            RETURNING *
+        """
+        values = (
+            [job.pdf_file_id for job in jobs],
+            [job.job_type for job in jobs],
+            [job.payload for job in jobs],
+            [job.max_attempts or config.JOB_MAX_ATTEMPTS for job in jobs],
+        )
+        async with acquire(conn) as conn:
+            rows = await conn.fetch(query, *values)
+        return sorted((PDFJobRead(**dict(row)) for row in rows), key=lambda j: j.id)
+
+    async def claim_job(
+        self, worker_id: str, job_types: List[str]
+    ) -> Optional[PDFJobRead]:
+        """
+        Claims the next runnable job for worker_id.
+
+        Queued jobs whose run_after has passed are eligible, as are running
+        jobs whose lock expired because their worker died. SKIP LOCKED lets
+        any number of workers on any number of nodes poll concurrently
+        without handing out the same job twice.
+
+        Args:
+            worker_id: Identifier recorded in locked_by.
+            job_types: Job types this worker can handle.
+
+        Returns:
+            The claimed job, or None if nothing is runnable.
+        """
+        async with acquire() as conn:
+            row = await queries.fetchrow(
+                conn, CLAIM_JOB, job_types, worker_id, config.JOB_VISIBILITY_TIMEOUT
+            )
+        return PDFJobRead(**dict(row)) if row else None
+
+    async def extend_lock(self, job_id: int, worker_id: str) -> bool:
+        """
+        Pushes locked_until forward for a job this worker still owns.
+
+        Returns:
+            False if the lock was lost to another worker.
+        """
+        async with acquire() as conn:
+            result = await queries.execute(
+                conn, EXTEND_LOCK, job_id, worker_id, config.JOB_VISIBILITY_TIMEOUT
+            )
+        return result == "UPDATE 1"
+
+    async def complete_job(
+        self, job_id: int, worker_id: str, result: Optional[dict] = None
+    ) -> bool:
+        async with acquire() as conn:
+            status = await queries.execute(
+                conn, COMPLETE_JOB, job_id, worker_id, result or {}
+            )
+        return status == "UPDATE 1"
+
+    async def fail_job(
+        self, job_id: int, worker_id: str, error: str, retry: bool = True
+    ) -> Optional[PDFJobRead]:
+        """
+        Records a failed attempt. The job is re-queued with exponential
+        backoff until it runs out of attempts, after which it is marked
+        failed. With retry=False it is marked failed straight away.
+
+        Returns:
+            The updated job, or None if this worker no longer owned it.
+        """
+        query = """
+            UPDATE pdfjob SET
+                status = CASE
+                    WHEN NOT $6 OR attempts >= max_attempts THEN 'failed' ELSE 'queued'
+                END,
+                run_after = NOW() + make_interval(
+                    secs => LEAST($4 * power(2, GREATEST(attempts - 1, 0)), $5)
+                ),
+                last_error = $3,
+                locked_by = NULL,
+                locked_until = NULL,
+                updatedon = NOW()
+            WHERE id = $1 AND locked_by = $2
+            RETURNING *
+        """
+        values = (
+            job_id,
+            worker_id,
+            error,
+            config.JOB_RETRY_BACKOFF_BASE,
+            config.JOB_RETRY_BACKOFF_MAX,
+            retry,
+        )
+        async with acquire() as conn:
+            row = await conn.fetchrow(query, *values)
+        return PDFJobRead(**dict(row)) if row else None
+
+    async def count_pending_jobs(self) -> List[Tuple[str, str, int]]:
+        """
+        Queue depth: (job_type, status, count) for queued and running jobs.
+        Served by the claimable-jobs partial index.
+        """
+        query = """
+            SELECT job_type, status, COUNT(*) AS jobs FROM pdfjob
+            WHERE status IN ('queued', 'running')
+            GROUP BY job_type, status
+        """
+        async with acquire() as conn:
+            rows = await conn.fetch(query)
+        return [(row["job_type"], row["status"], row["jobs"]) for row in rows]
+
+    async def get_jobs_for_file(self, pdf_file_id: int) -> List[PDFJobRead]:
+        query = "SELECT * FROM pdfjob WHERE pdf_file_id = $1 ORDER BY id"
+        async with acquire() as conn:
+            rows = await conn.fetch(query, pdf_file_id)
+        return [PDFJobRead(**dict(row)) for row in rows]
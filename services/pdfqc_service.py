@@ -1,6 +1,8 @@
-from core.database import get_database
+from core import config, queries
+from core.database import acquire
+from core.pagination import decode_cursor, encode_cursor
 from schemas.pdfqc_schema import PDFQCCreate, PDFQCRead
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List, Tuple
 from datetime import datetime, timezone
 import asyncpg
 import logging
@@ -8,11 +10,10 @@ import logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-
-class PDFQCService:
-    async def create_pdf_qc(self, data: PDFQCCreate) -> Optional[PDFQCRead]:
-        conn = await get_database()
-        query = """
+CREATE_PDF_QC = queries.register(
+    "pdfqc.create",
+    """
+        WITH qc AS (
             INSERT INTO pdfqc (
                 doc_id, is_security, is_encrypted, has_bookmarks, has_tags,
                 has_media, has_images, has_fonts, has_tables, has_links,
@@ -20,7 +21,15 @@ class PDFQCService:
             ) VALUES (
                 $1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12,$13,$14
             ) RETURNING *
-        """
+        )
+        SELECT qc.*, file.filename, file.path as filepath, file.status
+        FROM qc inner join public.pdffile as file on file.id=qc.doc_id
+    """,
+)
+
+
+class PDFQCService:
+    async def create_pdf_qc(self, data: PDFQCCreate) -> Optional[PDFQCRead]:
         now = datetime.now(timezone.utc)
         values = (
             data.doc_id,
@@ -38,28 +47,126 @@ class PDFQCService:
             now,
             now,
         )
-        result = await conn.fetchrow(query, *values)
-        await conn.close()
+        async with acquire() as conn:
+            result = await queries.fetchrow(conn, CREATE_PDF_QC, *values)
         return PDFQCRead(**dict(result)) if result else None
 
     async def get_all_pdf_qc(self) -> List[PDFQCRead]:
-        conn = await get_database()
         query = "SELECT qc.doc_id, file.filename,file.path as filepath,file.status,qc.is_security as has_metadata,qc.is_encrypted,qc.has_media,qc.has_bookmarks,qc.has_tags,qc.has_media,qc.has_images,qc.has_fonts,qc.has_tables,qc.has_links,qc.has_annotations,has_form_fields FROM public.pdffile as file inner join public.pdfqc as qc on  file.id=qc.doc_id"
-        rows = await conn.fetch(query)
-        await conn.close()
+        async with acquire() as conn:
+            rows = await conn.fetch(query)
         return [PDFQCRead(**dict(row)) for row in rows]
 
+    def _pdf_qc_listing(
+        self,
+        user_id: Optional[int] = None,
+        status: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[str, list]:
+        """
+        Builds the listing query: one row per PDF file with its latest QC
+        result, newest file first. Only the filters given become
+        conditions, so each combination gets a plan that can use the
+        (user_id, createdOn, id) / (createdOn, id) indexes.
+        """
+        conditions, args = [], []
+
+        def param(value) -> str:
+            args.append(value)
+            return f"${len(args)}"
+
+        if user_id is not None:
+            conditions.append(f"file.user_id = {param(user_id)}")
+        if status is not None:
+            conditions.append(f"file.status = {param(status)}")
+        if created_from is not None:
+            conditions.append(f"file.createdOn >= {param(created_from)}")
+        if created_to is not None:
+            conditions.append(f"file.createdOn < {param(created_to)}")
+        if cursor is not None:
+            created_on, last_id = decode_cursor(cursor)
+            conditions.append(
+                f"(file.createdOn, file.id) < ({param(created_on)}, {param(last_id)})"
+            )
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"""
+            SELECT qc.doc_id, file.filename, file.path as filepath, file.status,
+                qc.is_security, qc.is_encrypted, qc.has_bookmarks, qc.has_tags,
+                qc.has_media, qc.has_images, qc.has_fonts, qc.has_tables,
+                qc.has_links, qc.has_annotations, qc.has_form_fields,
+                qc.createdOn as "createdOn", qc.updatedOn as "updatedOn",
+                file.createdOn as file_createdon
+            FROM public.pdffile as file
+            CROSS JOIN LATERAL (
+                SELECT * FROM public.pdfqc WHERE doc_id = file.id ORDER BY id DESC LIMIT 1
+            ) as qc
+            {where}
+            ORDER BY file.createdOn DESC, file.id DESC
+        """
+        return query, args
+
+    async def get_pdf_qc_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        **filters,
+    ) -> Tuple[List[PDFQCRead], Optional[str]]:
+        """
+        Returns one page of the QC listing and the cursor of the next page,
+        or None on the last page. filters are those of _pdf_qc_listing.
+        """
+        query, args = self._pdf_qc_listing(cursor=cursor, **filters)
+        # One extra row tells whether another page follows
+        query += f" LIMIT ${len(args) + 1}"
+        async with acquire() as conn:
+            rows = await conn.fetch(query, *args, limit + 1)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["file_createdon"], rows[-1]["doc_id"])
+        return [PDFQCRead(**dict(row)) for row in rows], next_cursor
+
+    async def iter_pdf_qc(self, **filters) -> AsyncIterator[dict]:
+        """
+        Yields every row of the QC listing as a dict, fetched from a
+        server-side cursor so exports never hold the result in memory.
+        """
+        query, args = self._pdf_qc_listing(**filters)
+        async with acquire() as conn:
+            async with conn.transaction():
+                async for row in conn.cursor(
+                    query, *args, prefetch=config.EXPORT_FETCH_SIZE
+                ):
+                    record = dict(row)
+                    del record["file_createdon"]
+                    yield record
+
+    async def get_pdf_qc_by_hash(self, content_hash: str) -> Optional[PDFQCCreate]:
+        """
+        Returns the latest QC flags recorded for any file with this content.
+        """
+        query = """
+            SELECT qc.* FROM public.pdfqc as qc
+            inner join public.pdffile as file on file.id=qc.doc_id
+            WHERE file.content_hash=$1
+            ORDER BY qc.id DESC
+            LIMIT 1
+        """
+        async with acquire() as conn:
+            row = await conn.fetchrow(query, content_hash)
+        return PDFQCCreate(**dict(row)) if row else None
+
     async def get_pdf_qc(self, qc_id: int) -> Optional[PDFQCRead]:
-        conn = await get_database()
         query = """SELECT qc.doc_id, file.filename,file.path as filepath,file.status,qc.is_security as has_metadata,qc.is_encrypted,qc.has_media,qc.has_bookmarks,qc.has_tags,qc.has_media,qc.has_images,qc.has_fonts,qc.has_tables,qc.has_links,qc.has_annotations,has_form_fields FROM public.pdffile as file inner join public.pdfqc as qc on  file.id=qc.doc_id
                  where doc_id=$1"""
-        row = await conn.fetchrow(query, qc_id)
-        await conn.close()
+        async with acquire() as conn:
+            row = await conn.fetchrow(query, qc_id)
         return PDFQCRead(**dict(row)) if row else None
 
     async def delete_pdf_qc(self, qc_id: int) -> Optional[PDFQCRead]:
-        conn = await get_database()
         query = "DELETE FROM pdfqc WHERE id = $1 RETURNING *"
-        row = await conn.fetchrow(query, qc_id)
-        await conn.close()
+        async with acquire() as conn:
+            row = await conn.fetchrow(query, qc_id)
         return PDFQCRead(**dict(row)) if row else None
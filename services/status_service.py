@@ -1,8 +1,11 @@
-from core.database import get_database
+from core import config
+from core.database import acquire
+from core.pagination import decode_cursor, encode_cursor
 from schemas.status_schema import SiteStatusCreate, SiteStatusRead
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List, Tuple
 from datetime import datetime, timezone
 import asyncpg
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,7 +26,6 @@ class StatusService:
         Returns:
             The created site status entry as a SiteStatusRead object.
         """
-        conn: asyncpg.Connection = await get_database()
         query = """
             INSERT INTO sitestatus (
                 status_type, status_message, pdf_file_id, createdon, updatedon
@@ -38,8 +40,8 @@ class StatusService:
             datetime.now(timezone.utc),
         )
         try:
-            result = await conn.fetchrow(query, *values)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, *values)
             if result:
                 return SiteStatusRead(
                     id=result["id"],
@@ -52,7 +54,56 @@ class StatusService:
             return None
         except Exception as e:
             logging.error(f"Error creating site status: {e}")
-            await conn.close()
+            raise
+
+    async def create_site_statuses(
+        self,
+        site_statuses: List[SiteStatusCreate],
+        conn: Optional[asyncpg.Connection] = None,
+    ) -> List[SiteStatusRead]:
+        """
+        Creates many site status entries in a single round trip.
+
+        Args:
+            site_statuses: The SiteStatusCreate objects to insert.
+            conn: Optional connection, to make the insert part of the caller's
+                transaction.
+
+        Returns:
+            The created entries as SiteStatusRead objects, in input order.
+        """
+        if not site_statuses:
+            return []
+        query = """
+            INSERT INTO sitestatus (
+                status_type, status_message, pdf_file_id, createdon, updatedon
+            )
+            SELECT u.*, $4::timestamptz, $4::timestamptz
+            FROM unnest($1::varchar[], $2::varchar[], $3::integer[]) AS u
+            RETURNING id, status_type, status_message, pdf_file_id, createdon, updatedon
+        """
+        values = (
+            [s.status_type for s in site_statuses],
+            [s.status_message for s in site_statuses],
+            [s.pdf_file_id for s in site_statuses],
+            datetime.now(timezone.utc),
+        )
+        try:
+            async with acquire(conn) as conn:
+                results = await conn.fetch(query, *values)
+            return [
+                SiteStatusRead(
+                    id=row["id"],
+                    status_type=row["status_type"],
+                    status_message=row["status_message"],
+                    pdf_file_id=row["pdf_file_id"],
+                    createdon=row["createdon"].strftime("%Y-%m-%d %H:%M:%S"),
+                    updatedon=row["updatedon"].strftime("%Y-%m-%d %H:%M:%S"),
+                )
+                for row in sorted(results, key=lambda row: row["id"])
+            ]
+        except Exception as e:
+            logging.error(f"Error creating site statuses: {e}")
             raise
 
     async def get_site_status(self, site_status_id: int) -> Optional[SiteStatusRead]:
@@ -65,11 +116,10 @@ class StatusService:
         Returns:
             The site status entry as a SiteStatusRead object if found, otherwise None.
         """
-        conn: asyncpg.Connection = await get_database()
         query = "SELECT * FROM sitestatus WHERE id = $1"
         try:
-            result = await conn.fetchrow(query, site_status_id)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, site_status_id)
             if result:
                 return SiteStatusRead(
                     id=result["id"],
@@ -82,20 +132,135 @@ class StatusService:
             return None
         except Exception as e:
             logging.error(f"Error getting site status: {e}")
-            await conn.close()
             raise
 
+    async def get_site_statuses_for_file(
+        self, pdf_file_id: int, after_id: int = 0
+    ) -> List[SiteStatusRead]:
+        """
+        Retrieves the status entries of a PDF file with an ID greater than
+        after_id, oldest first.
+        """
+        query = """
+            SELECT id, status_type, status_message, pdf_file_id, createdon, updatedon
+            FROM sitestatus WHERE pdf_file_id = $1 AND id > $2 ORDER BY id
+        """
+        async with acquire() as conn:
+            results = await conn.fetch(query, pdf_file_id, after_id)
+        return [SiteStatusRead(**dict(row)) for row in results]
+
+    async def notify_progress(
+        self, pdf_file_id: int, stage: str, pages_done: int, page_count: int
+    ):
+        """
+        Publishes a PDF_PROGRESS event to listeners of the file without
+        storing a sitestatus row for it.
+        """
+        payload = json.dumps(
+            {
+                "status_type": "PDF_PROGRESS",
+                "pdf_file_id": pdf_file_id,
+                "stage": stage,
+                "pages_done": pages_done,
+                "page_count": page_count,
+            }
+        )
+        async with acquire() as conn:
+            await conn.execute(
+                "SELECT pg_notify($1, $2)", config.STATUS_EVENTS_CHANNEL, payload
+            )
+
+    def _site_status_listing(
+        self,
+        user_id: Optional[int] = None,
+        pdf_file_id: Optional[int] = None,
+        status_type: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[str, list]:
+        """
+        Builds the status listing query, newest first. Only the filters
+        given become conditions.
+        """
+        conditions, args = [], []
+
+        def param(value) -> str:
+            args.append(value)
+            return f"${len(args)}"
+
+        join = ""
+        if user_id is not None:
+            join = "INNER JOIN pdffile AS file ON file.id = status.pdf_file_id"
+            conditions.append(f"file.user_id = {param(user_id)}")
+        if pdf_file_id is not None:
+            conditions.append(f"status.pdf_file_id = {param(pdf_file_id)}")
+        if status_type is not None:
+            conditions.append(f"status.status_type = {param(status_type)}")
+        if created_from is not None:
+            conditions.append(f"status.createdon >= {param(created_from)}")
+        if created_to is not None:
+            conditions.append(f"status.createdon < {param(created_to)}")
+        if cursor is not None:
+            created_on, last_id = decode_cursor(cursor)
+            conditions.append(
+                f"(status.createdon, status.id) < ({param(created_on)}, {param(last_id)})"
+            )
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"""
+            SELECT status.id, status.status_type, status.status_message,
+                status.pdf_file_id, status.createdon, status.updatedon
+            FROM sitestatus AS status
+            {join}
+            {where}
+            ORDER BY status.createdon DESC, status.id DESC
+        """
+        return query, args
+
+    async def get_site_status_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        **filters,
+    ) -> Tuple[List[SiteStatusRead], Optional[str]]:
+        """
+        Returns one page of status entries and the cursor of the next page,
+        or None on the last page. filters are those of _site_status_listing.
+        """
+        query, args = self._site_status_listing(cursor=cursor, **filters)
+        # One extra row tells whether another page follows
+        query += f" LIMIT ${len(args) + 1}"
+        async with acquire() as conn:
+            results = await conn.fetch(query, *args, limit + 1)
+        next_cursor = None
+        if len(results) > limit:
+            results = results[:limit]
+            next_cursor = encode_cursor(results[-1]["createdon"], results[-1]["id"])
+        return [SiteStatusRead(**dict(row)) for row in results], next_cursor
+
+    async def iter_site_statuses(self, **filters) -> AsyncIterator[dict]:
+        """
+        Yields every matching status entry as a dict, fetched from a
+        server-side cursor so exports never hold the result in memory.
+        """
+        query, args = self._site_status_listing(**filters)
+        async with acquire() as conn:
+            async with conn.transaction():
+                async for row in conn.cursor(
+                    query, *args, prefetch=config.EXPORT_FETCH_SIZE
+                ):
+                    yield dict(row)
+
     async def get_all_site_statuses(self) -> List[SiteStatusRead]:
         """
         Retrieves all site status entries.
         Returns:
             A list of site status entries as SiteStatusRead objects.
         """
-        conn: asyncpg.Connection = await get_database()
         query = "SELECT * FROM sitestatus"
         try:
-            results = await conn.fetch(query)
-            await conn.close()
+            async with acquire() as conn:
+                results = await conn.fetch(query)
             finalresult: List[SiteStatusRead] = []
             if results:
                 for row in results:
@@ -111,7 +276,6 @@ class StatusService:
             return finalresult
         except Exception as e:
             logging.error(f"Error getting all site statuses: {e}")
-            await conn.close()
             raise
 
     async def update_site_status(
@@ -127,7 +291,6 @@ class StatusService:
         Returns:
             The updated site status entry as a SiteStatusRead object if updated, otherwise None.
         """
-        conn: asyncpg.Connection = await get_database()
         query = """
             UPDATE sitestatus SET
                 status_type = $1,
@@ -145,8 +308,8 @@ class StatusService:
             site_status_id,
         )
         try:
-            result = await conn.fetchrow(query, *values)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, *values)
             if result:
                 return SiteStatusRead(
                     id=result["id"],
@@ -159,7 +322,6 @@ class StatusService:
             return None
         except Exception as e:
             logging.error(f"Error updating site status: {e}")
-            await conn.close()
             raise
 
     async def delete_site_status(self, site_status_id: int) -> bool:
@@ -172,13 +334,11 @@ class StatusService:
         Returns:
             True if the entry was deleted, False otherwise.
         """
-        conn: asyncpg.Connection = await get_database()
         query = "DELETE FROM sitestatus WHERE id = $1 RETURNING *"
         try:
-            result = await conn.fetchrow(query, site_status_id)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, site_status_id)
             return result is not None  # Returns True if a row was deleted
         except Exception as e:
             logging.error(f"Error deleting site status: {e}")
-            await conn.close()
             raise
@@ -1,4 +1,4 @@
-from core.database import get_database
+from core.database import acquire
 from schemas.subscription_schema import (
     SubscriptionCreate,
     SubscriptionRead,
@@ -17,7 +17,6 @@ class SubscriptionService:
     async def create_subscription(
         self, subscription_data: SubscriptionCreate
     ) -> Optional[SubscriptionRead]:
-        conn: asyncpg.Connection = await get_database()
         query = """
             INSERT INTO subscription (
                 plan_name, plan_details, stripe_monthly_price_id, stripe_yearly_price_id,monthly_price,yearly_price,createdOn, updatedOn
@@ -34,7 +33,8 @@ class SubscriptionService:
             datetime.now(timezone.utc),
             None,
         )
-        results = await conn.fetch(query, *values)
+        async with acquire() as conn:
+            results = await conn.fetch(query, *values)
         fr: Optional[SubscriptionRead] = None
         if results:
             row = results[0]
@@ -51,15 +51,13 @@ class SubscriptionService:
                 updatedOn=row["updatedon"].strftime("%Y-%m-%d %H:%M:%S") if row["updatedon"] else None,
             )
 
-        await conn.close()
         return fr
 
     async def get_all_subscriptions(self) -> list[SubscriptionRead]:
         finalresult: list[SubscriptionRead] = []
-        conn: asyncpg.Connection = await get_database()
         query = "SELECT * FROM subscription"
-        results = await conn.fetch(query)
-        await conn.close()
+        async with acquire() as conn:
+            results = await conn.fetch(query)
         if results:
             for row in results:
                 fr = SubscriptionRead(
@@ -79,10 +77,9 @@ class SubscriptionService:
     async def get_subscription(
         self, subscription_id: int
     ) -> Optional[SubscriptionRead]:
-        conn: asyncpg.Connection = await get_database()
         query = "SELECT * FROM subscription WHERE id = $1"
-        result = await conn.fetch(query, subscription_id)
-        await conn.close()
+        async with acquire() as conn:
+            result = await conn.fetch(query, subscription_id)
         if result:
             row = result[0]
             fr = SubscriptionRead(
@@ -101,7 +98,6 @@ class SubscriptionService:
     async def update_subscription(
         self, subscription_id: int, subscription_data: SubscriptionCreate
     ) -> Optional[SubscriptionRead]:
-        conn: asyncpg.Connection = await get_database()
         query = """
             UPDATE subscription SET
                 plan_name = $1,
@@ -124,15 +120,14 @@ class SubscriptionService:
             datetime.now(timezone.utc),
             subscription_id,
         )
-        result = await conn.fetchrow(query, *values)
-        await conn.close()
+        async with acquire() as conn:
+            result = await conn.fetchrow(query, *values)
         return SubscriptionRead(**dict(result)) if result else None
 
     async def delete_subscription(
         self, subscription_id: int
     ) -> Optional[SubscriptionRead]:
-        conn: asyncpg.Connection = await get_database()
         query = "DELETE FROM subscription WHERE id = $1 RETURNING *"
-        result = await conn.fetchrow(query, subscription_id)
-        await conn.close()
+        async with acquire() as conn:
+            result = await conn.fetchrow(query, subscription_id)
         return SubscriptionRead(**dict(result)) if result else None
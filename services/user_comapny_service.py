@@ -1,4 +1,5 @@
-from core.database import get_database
+from core import auth
+from core.database import acquire
 from schemas.user_company_schema import UserCompanyCreate, UserCompanyRead
 from schemas.company_schema import CompanyRead  # Assuming CompanyRead schema exists
 from typing import Optional, List
@@ -16,7 +17,6 @@ class UserCompanyService:
         """
         Associates a user with a company in the database.
         """
-        conn: asyncpg.Connection = await get_database()
         query = """
             INSERT INTO usercompany (
                 user_id, company_id
@@ -31,8 +31,11 @@ class UserCompanyService:
             user_company.company_id,
         )
         try:
-            result = await conn.fetchrow(query, *values)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, *values)
+                if result:
+                    # The user's cached company_id is now out of date
+                    await auth.invalidate_user(result["user_id"], conn)
             if result:
                 return UserCompanyRead(
                     id=result["id"],
@@ -42,22 +45,20 @@ class UserCompanyService:
             return None
         except Exception as e:
             logging.error(f"Error creating user-company association: {e}")
-            await conn.close()
             raise
 
     async def get_user_company(self, user_company_id: int) -> Optional[UserCompanyRead]:
         """
         Retrieves a user-company association by its ID.
         """
-        conn: asyncpg.Connection = await get_database()
         query = """
             SELECT id, user_id, company_id
             FROM usercompany
             WHERE id = $1
         """
         try:
-            result = await conn.fetchrow(query, user_company_id)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, user_company_id)
             if result:
                 return UserCompanyRead(
                     id=result["id"],
@@ -67,7 +68,6 @@ class UserCompanyService:
             return None
         except Exception as e:
             logging.error(f"Error retrieving user-company association: {e}")
-            await conn.close()
             raise
 
     async def update_user_company(
@@ -76,12 +76,12 @@ class UserCompanyService:
         """
         Updates an existing user-company association in the database.
         """
-        conn: asyncpg.Connection = await get_database()
         query = """
-            UPDATE usercompany
+            UPDATE usercompany uc
             SET user_id = $1, company_id = $2
-            WHERE id = $3
-            RETURNING id, user_id, company_id
+            FROM (SELECT id, user_id FROM usercompany WHERE id = $3 FOR UPDATE) old
+            WHERE uc.id = old.id
+            RETURNING uc.id, uc.user_id, uc.company_id, old.user_id AS old_user_id
         """
         values = (
             user_company.user_id,
@@ -89,8 +89,12 @@ class UserCompanyService:
             user_company_id,
         )
         try:
-            result = await conn.fetchrow(query, *values)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, *values)
+                if result:
+                    # Both the user moved out and the one moved in changed
+                    for user_id in {result["old_user_id"], result["user_id"]}:
+                        await auth.invalidate_user(user_id, conn)
             if result:
                 return UserCompanyRead(
                     id=result["id"],
@@ -100,36 +104,34 @@ class UserCompanyService:
             return None
         except Exception as e:
             logging.error(f"Error updating user-company association: {e}")
-            await conn.close()
             raise
 
     async def delete_user_company(self, user_company_id: int) -> bool:
         """
         Deletes a user-company association from the database.
         """
-        conn: asyncpg.Connection = await get_database()
-        query = "DELETE FROM usercompany WHERE id = $1"
+        query = "DELETE FROM usercompany WHERE id = $1 RETURNING user_id"
         try:
-            result = await conn.execute(query, user_company_id)
-            await conn.close()
-            return result == "DELETE 1"
+            async with acquire() as conn:
+                user_id = await conn.fetchval(query, user_company_id)
+                if user_id is not None:
+                    await auth.invalidate_user(user_id, conn)
+            return user_id is not None
         except Exception as e:
             logging.error(f"Error deleting user-company association: {e}")
-            await conn.close()
             raise
 
     async def list_user_companies(self) -> List[UserCompanyRead]:
         """
         Retrieves all user-company associations from the database.
         """
-        conn: asyncpg.Connection = await get_database()
         query = """
             SELECT id, user_id, company_id
             FROM usercompany
         """
         try:
-            results = await conn.fetch(query)
-            await conn.close()
+            async with acquire() as conn:
+                results = await conn.fetch(query)
             user_companies = [
                 UserCompanyRead(
                     id=row["id"],
@@ -141,25 +143,22 @@ class UserCompanyService:
             return user_companies
         except Exception as e:
             logging.error(f"Error listing user-company associations: {e}")
-            await conn.close()
             raise
 
     async def does_user_belong_to_company(self, user_id: int, company_id: int) -> bool:
         """
         Checks if a user belongs to a specific company.
         """
-        conn: asyncpg.Connection = await get_database()
         query = """
             SELECT COUNT(*) FROM usercompany
             WHERE user_id = $1 AND company_id = $2
         """
         try:
-            count = await conn.fetchval(query, user_id, company_id)
-            await conn.close()
+            async with acquire() as conn:
+                count = await conn.fetchval(query, user_id, company_id)
             return count > 0
         except Exception as e:
             logging.error(f"Error checking user-company membership: {e}")
-            await conn.close()
             raise
 
     async def get_company_for_user(self, user_id: int) -> Optional[UserCompanyRead]:
@@ -167,7 +166,6 @@ class UserCompanyService:
         Retrieves the company (or companies) a user belongs to.
         Returns a list of CompanyRead objects as a user can potentially belong to multiple companies.
         """
-        conn: asyncpg.Connection = await get_database()
         query = """
                     SELECT
                     company_id,user_id
@@ -175,8 +173,8 @@ class UserCompanyService:
                     WHERE user_id = $1
                             """
         try:
-            result = await conn.fetchrow(query, user_id)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, user_id)
             if result:
                 retcompany = UserCompanyRead(
                     id=result["id"],
@@ -187,5 +185,4 @@ class UserCompanyService:
             return None
         except Exception as e:
             logging.error(f"Error retrieving company for user: {e}")
-            await conn.close()
             raise
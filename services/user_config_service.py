@@ -1,4 +1,4 @@
-from core.database import get_database
+from core.database import acquire
 import asyncpg
 import logging
 from typing import Optional, List
@@ -14,7 +14,6 @@ class PdfUserConfigService:
     async def create_pdf_user_config(
         self, config: PdfUserConfigCreate
     ) -> Optional[PdfUserConfigRead]:
-        conn: asyncpg.Connection = await get_database()
         query = """
             INSERT INTO pdfUserConfig (
                 config_id, user_id, doc_id, createdOn, updatedOn
@@ -29,8 +28,8 @@ class PdfUserConfigService:
             datetime.now(timezone.utc),
         )
         try:
-            result = await conn.fetchrow(query, *values)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, *values)
             if result:
                 return PdfUserConfigRead(
                     id=result["id"],
@@ -43,15 +42,13 @@ class PdfUserConfigService:
             return None
         except Exception as e:
             logging.error(f"Error creating PDF user config: {e}")
-            await conn.close()
             raise
 
     async def get_pdf_user_config(self, config_id: int) -> Optional[PdfUserConfigRead]:
-        conn: asyncpg.Connection = await get_database()
         query = "SELECT * FROM pdfUserConfig WHERE id = $1"
         try:
-            result = await conn.fetchrow(query, config_id)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, config_id)
             if result:
                 return PdfUserConfigRead(
                     id=result["id"],
@@ -64,15 +61,13 @@ class PdfUserConfigService:
             return None
         except Exception as e:
             logging.error(f"Error retrieving PDF user config: {e}")
-            await conn.close()
             raise
 
     async def get_all_pdf_user_configs(self) -> List[PdfUserConfigRead]:
-        conn: asyncpg.Connection = await get_database()
         query = "SELECT * FROM pdfUserConfig"
         try:
-            results = await conn.fetch(query)
-            await conn.close()
+            async with acquire() as conn:
+                results = await conn.fetch(query)
             configs = []
             for row in results:
                 configs.append(
@@ -88,13 +83,11 @@ class PdfUserConfigService:
             return configs
         except Exception as e:
             logging.error(f"Error fetching all PDF user configs: {e}")
-            await conn.close()
             raise
 
     async def update_pdf_user_config(
         self, config_id: int, config: PdfUserConfigCreate
     ) -> Optional[PdfUserConfigRead]:
-        conn: asyncpg.Connection = await get_database()
         query = """
             UPDATE pdfUserConfig SET
                 config_id = $1,
@@ -112,8 +105,8 @@ class PdfUserConfigService:
             config_id,
         )
         try:
-            result = await conn.fetchrow(query, *values)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, *values)
             if result:
                 return PdfUserConfigRead(
                     id=result["id"],
@@ -126,17 +119,14 @@ class PdfUserConfigService:
             return None
         except Exception as e:
             logging.error(f"Error updating PDF user config: {e}")
-            await conn.close()
             raise
 
     async def delete_pdf_user_config(self, config_id: int) -> bool:
-        conn: asyncpg.Connection = await get_database()
         query = "DELETE FROM pdfUserConfig WHERE id = $1 RETURNING id"
         try:
-            result = await conn.fetchrow(query, config_id)
-            await conn.close()
+            async with acquire() as conn:
+                result = await conn.fetchrow(query, config_id)
             return result is not None
         except Exception as e:
             logging.error(f"Error deleting PDF user config: {e}")
-            await conn.close()
             raise
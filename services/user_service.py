@@ -1,6 +1,7 @@
-from core.security import hash_password
+from core.security import hash_password_async
 import logging
-from core.database import get_database
+from core import auth, queries
+from core.database import acquire
 from datetime import datetime, timezone
 import asyncpg
 from typing import List, Optional
@@ -9,17 +10,28 @@ from schemas.user_schema import GetUser, CreateUser, GetUserPassword
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+GET_USER_BY_EMAIL = queries.register(
+    "user.get_by_email",
+    """
+        SELECT u.id, u.email, u.password_hash, u.phone_number, u.profile_picture,
+               u.firstname, u.lastname, u.role, u.subscription_id, uc.company_id,
+               u.createdon, u.updatedon
+        FROM "user" u
+        LEFT JOIN usercompany uc ON u.id = uc.user_id
+        WHERE u.email = $1
+    """,
+)
+
 
 class UserService:
     async def get_all_users(self) -> List[GetUser]:
-        conn: asyncpg.Connection = await get_database()
         query = """
             SELECT id, email, phone_number, profile_picture, firstname, lastname, role, subscription_id,  createdon, updatedon
             FROM "user"
             ORDER BY createdon
         """
-        result = await conn.fetch(query)
-        await conn.close()
+        async with acquire() as conn:
+            result = await conn.fetch(query)
         users: List[GetUser] = []
         for user in result:
             users.append(
@@ -39,7 +51,6 @@ class UserService:
         return users
 
     async def create_user(self, user_create_data: CreateUser) -> Optional[GetUser]:
-        conn: asyncpg.Connection = await get_database()
         created_time = datetime.now(timezone.utc)
         query = """
             INSERT INTO "user" (
@@ -61,8 +72,8 @@ class UserService:
             created_time,
             created_time,
         )
-        row = await conn.fetchrow(query, *values)
-        await conn.close()
+        async with acquire() as conn:
+            row = await conn.fetchrow(query, *values)
         if row:
             return GetUser(
                 id=int(row["id"]),
@@ -80,31 +91,8 @@ class UserService:
         return None
 
     async def get_user_by_email(self, email: str) -> Optional[GetUserPassword]:
-        conn: asyncpg.Connection = await get_database()
-        query = """
-            SELECT 
-  u.id, 
-  u.email, 
-  u.password_hash, 
-  u.phone_number, 
-  u.profile_picture, 
-  u.firstname, 
-  u.lastname, 
-  u.role, 
-  u.subscription_id, 
-  uc.company_id, 
-  u.createdon, 
-  u.updatedon
-FROM 
-  "user" u
-LEFT JOIN 
-  usercompany uc 
-ON 
-  u.id = uc.user_id;
-            WHERE email = $1
-        """
-        row = await conn.fetchrow(query, email)
-        await conn.close()
+        async with acquire() as conn:
+            row = await queries.fetchrow(conn, GET_USER_BY_EMAIL, email)
         if row:
             return GetUserPassword(
                 id=int(row["id"]),
@@ -122,14 +110,15 @@ ON
         return None
 
     async def get_user(self, user_id: int) -> Optional[GetUser]:
-        conn: asyncpg.Connection = await get_database()
         query = """
-            SELECT id, email, phone_number, profile_picture, firstname, lastname, subscription_id, company_id, role, createdon, updatedon
-            FROM "user"
-            WHERE id = $1
+            SELECT u.id, u.email, u.phone_number, u.profile_picture, u.firstname, u.lastname,
+                   u.subscription_id, uc.company_id, u.role, u.createdon, u.updatedon
+            FROM "user" u
+            LEFT JOIN usercompany uc ON u.id = uc.user_id
+            WHERE u.id = $1
         """
-        row = await conn.fetchrow(query, user_id)
-        await conn.close()
+        async with acquire() as conn:
+            row = await conn.fetchrow(query, user_id)
         if row:
             return GetUser(
                 id=int(row["id"]),
@@ -149,8 +138,7 @@ ON
     async def update_user(
         self, user_id: int, user_update_data: CreateUser
     ) -> Optional[GetUser]:
-        conn: asyncpg.Connection = await get_database()
-        password_hash = hash_password(user_update_data.password)
+        password_hash = await hash_password_async(user_update_data.password)
         updated_time = datetime.now(timezone.utc)
         query = """
             UPDATE "user"
@@ -161,10 +149,9 @@ ON
                 phone_number = $5,
                 profile_picture = $6,
                 subscription_id = $7,
-                company_id = $8,
-                role = $9,
-                updatedon = $10
-            WHERE id = $11
+                role = $8,
+                updatedon = $9
+            WHERE id = $10
             RETURNING *
         """
         values = (
@@ -175,13 +162,14 @@ ON
             user_update_data.phone_number,
             user_update_data.profile_picture,
             user_update_data.subscription_id,
-            user_update_data.company_id,
             user_update_data.role,
             updated_time,
             user_id,
         )
-        row = await conn.fetchrow(query, *values)
-        await conn.close()
+        async with acquire() as conn:
+            row = await conn.fetchrow(query, *values)
+            if row:
+                await auth.invalidate_user(user_id, conn)
         if row:
             return GetUser(
                 id=int(row["id"]),
@@ -199,13 +187,12 @@ ON
         return None
 
     async def delete_user(self, user_id: int):
-        conn: asyncpg.Connection = await get_database()
         query = 'DELETE FROM "user" WHERE id = $1'
-        await conn.execute(query, user_id)
-        await conn.close()
+        async with acquire() as conn:
+            await conn.execute(query, user_id)
+            await auth.invalidate_user(user_id, conn)
 
     async def update_user_doc_count(self, user_id: int, new_doc_count: int):
-        conn: asyncpg.Connection = await get_database()
         updated_time = datetime.now(timezone.utc)
         query = """
             UPDATE "user"
@@ -213,5 +200,5 @@ ON
                 updatedon = $2
             WHERE id = $3
         """
-        await conn.execute(query, new_doc_count, updated_time, user_id)
-        await conn.close()
+        async with acquire() as conn:
+            await conn.execute(query, new_doc_count, updated_time, user_id)
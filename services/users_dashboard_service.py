@@ -1,31 +1,27 @@
 import asyncpg
-from core.database import get_database
+from core.database import acquire
 
 class UsersDashboardService:
     async def get_user_count(self) -> dict:
-        conn: asyncpg.Connection = await get_database()
         query = 'SELECT COUNT(*) FROM "user"'
-        count = await conn.fetchval(query)
-        await conn.close()
+        async with acquire() as conn:
+            count = await conn.fetchval(query)
         return {"user_count": count}
 
     async def get_document_count(self) -> dict:
-        conn: asyncpg.Connection = await get_database()
-        query = "SELECT COUNT(*) FROM pdf_file"
-        count = await conn.fetchval(query)
-        await conn.close()
+        query = "SELECT COUNT(*) FROM pdffile"
+        async with acquire() as conn:
+            count = await conn.fetchval(query)
         return {"document_count": count}
 
     async def get_total_revenue(self) -> dict:
-        conn: asyncpg.Connection = await get_database()
-        query = "SELECT SUM(amount) FROM user_payment"
-        revenue = await conn.fetchval(query)
-        await conn.close()
+        query = "SELECT SUM(amount) FROM userpayment"
+        async with acquire() as conn:
+            revenue = await conn.fetchval(query)
         return {"total_revenue": revenue}
 
     async def get_subscription_count(self) -> dict:
-        conn: asyncpg.Connection = await get_database()
         query = "SELECT COUNT(*) FROM subscription"
-        count = await conn.fetchval(query)
-        await conn.close()
+        async with acquire() as conn:
+            count = await conn.fetchval(query)
         return {"subscription_count": count}
@@ -0,0 +1,395 @@
+"""
+PDF job worker. Claims jobs from the pdfjob table and runs them.
+
+Run one or more per node, independently of the API workers:
+
+    python -m workers.pdf_worker
+"""
+import asyncio
+import logging
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from contextlib import nullcontext
+from typing import Awaitable, Callable, Dict, Optional
+from prometheus_client import multiprocess, start_http_server
+from core import config, metrics, profiling
+from core.timing import collect
+from core.database import init_pool, close_pool
+from core.executor import init_process_pool, shutdown_process_pool
+from pdfservices.qcCheck import analyze_pdf_quality
+from pdfservices.bookmarks import (
+    add_bookmarks_to_pdf_file,
+    bookmarked_path,
+    bookmarked_suffix,
+)
+from pdfservices.layout import ProgressCallback
+from services.bookmark_service import BookmarkService
+from services.pdfFile_service import PDFFileService
+from services.pdfjob_service import PDFJobService
+from services.pdfqc_service import PDFQCService
+from services.status_service import StatusService
+from schemas.bookmark_schema import BookmarkItemCreate
+from schemas.pdffile_schema import PDFFileRead
+from schemas.pdfjob_schema import PDFJobRead, JOB_QC, JOB_BOOKMARKS
+from schemas.pdfqc_schema import PDFQCCreate
+from schemas.status_schema import SiteStatusCreate
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+pdf_file_service = PDFFileService()
+pdfqc_service = PDFQCService()
+status_service = StatusService()
+job_service = PDFJobService()
+bookmark_service = BookmarkService()
+
+class PermanentJobError(Exception):
+    """
+    Raised by a handler for a failure a retry cannot fix, such as a
+    password-protected PDF; the job is failed without further attempts.
+    """
+
+
+# A handler runs one job and returns keyword arguments for
+# PDFFileService.finish_processing (status_message, processed_* ...), plus
+# an optional "result" dict stored on the job.
+JobHandler = Callable[[PDFJobRead, PDFFileRead], Awaitable[dict]]
+
+
+def pdf_file_path(pdffile: PDFFileRead) -> str:
+    return os.path.abspath(os.path.join(pdffile.path, pdffile.filename))
+
+
+def link_output(source: str, output_path: str):
+    """
+    Makes output_path a hard link to source, or a copy where hard links
+    are not supported. Outputs are only ever replaced by rename, never
+    rewritten in place, so the link stays valid when either side is
+    regenerated.
+    """
+    if os.path.abspath(source) == os.path.abspath(output_path):
+        return
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(output_path) or ".", prefix=".bookmarks-", suffix=".pdf"
+    )
+    os.close(fd)
+    try:
+        os.unlink(tmp_path)
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def progress_reporter(pdffile: PDFFileRead, stage: str) -> ProgressCallback:
+    pages = metrics.PAGES_PROCESSED.labels(stage)
+    reported = 0
+
+    async def report(pages_done: int, page_count: int):
+        nonlocal reported
+        pages.inc(pages_done - reported)
+        reported = pages_done
+        try:
+            await status_service.notify_progress(pdffile.id, stage, pages_done, page_count)
+        except Exception as e:
+            # Progress is best effort and must never fail the job
+            logger.error(f"Error publishing progress for file {pdffile.id}: {e}")
+
+    return report
+
+
+async def run_qc_job(job: PDFJobRead, pdffile: PDFFileRead) -> dict:
+    await status_service.create_site_status(
+        SiteStatusCreate(
+            status_type="PDF_QC_START",
+            status_message=f"PDF QC started for {pdffile.original_filename}.",
+            pdf_file_id=pdffile.id,
+        )
+    )
+    cached = None
+    if pdffile.content_hash:
+        cached = await pdfqc_service.get_pdf_qc_by_hash(pdffile.content_hash)
+    if cached:
+        # Identical bytes were already checked; skip the PyMuPDF pass
+        pdfqccreate = cached.model_copy(update={"doc_id": pdffile.id})
+    else:
+        qcresult = await analyze_pdf_quality(
+            pdf_file_path(pdffile), on_progress=progress_reporter(pdffile, job.job_type)
+        )
+        pdfqccreate = PDFQCCreate(
+            doc_id=pdffile.id,
+            **{k: v for k, v in qcresult.items() if k in PDFQCCreate.model_fields},
+        )
+    await pdfqc_service.create_pdf_qc(pdfqccreate)
+    await status_service.create_site_status(
+        SiteStatusCreate(
+            status_type="PDF_QC_END",
+            status_message=f"PDF QC completed for {pdffile.original_filename}.",
+            pdf_file_id=pdffile.id,
+        )
+    )
+    return {"status_message": f"PDF QC completed for {pdffile.original_filename}."}
+
+
+async def run_bookmarks_job(job: PDFJobRead, pdffile: PDFFileRead) -> dict:
+    await status_service.create_site_status(
+        SiteStatusCreate(
+            status_type="BOOKMARKS_START",
+            status_message=f"Bookmark generation started for {pdffile.original_filename}.",
+            pdf_file_id=pdffile.id,
+        )
+    )
+    optimize = job.payload.get("optimize", config.PDF_OPTIMIZE_OUTPUT)
+    cached = None
+    if pdffile.content_hash:
+        cached = await pdf_file_service.get_processed_by_hash(
+            pdffile.content_hash, bookmarked_suffix(optimize), exclude_id=pdffile.id
+        )
+    message = f"Bookmarks created for {pdffile.original_filename}."
+    job_result = {}
+    if cached:
+        # Identical bytes were already bookmarked. Give this file its own
+        # link to that output rather than pointing at another row's file,
+        # which its owner may replace.
+        output_path = bookmarked_path(pdf_file_path(pdffile), optimize)
+        await asyncio.to_thread(
+            link_output,
+            os.path.join(cached.processed_path, cached.processed_filename),
+            output_path,
+        )
+        output_hash = cached.processed_hash
+        job_result["reused_from"] = cached.id
+        items = [
+            BookmarkItemCreate(
+                title=item.title,
+                page_number=item.page_number,
+                level=item.level,
+                pdf_file_id=pdffile.id,
+            )
+            for item in await bookmark_service.get_bookmarks(cached.id)
+        ]
+    else:
+        result = await add_bookmarks_to_pdf_file(
+            pdf_file_path(pdffile),
+            on_progress=progress_reporter(pdffile, job.job_type),
+            optimize=optimize,
+        )
+        if result.get("status") == "error":
+            raise PermanentJobError(result.get("message", "Bookmark generation failed"))
+        output_path = result["bookmarked_file"]
+        output_hash = result["bookmarked_sha256"]
+        if result.get("optimization"):
+            job_result.update(result["optimization"])
+            message = (
+                f"Bookmarks created for {pdffile.original_filename}, optimized "
+                f"from {result['optimization']['size_before']} to "
+                f"{result['optimization']['size_after']} bytes."
+            )
+        items = [
+            BookmarkItemCreate(
+                title=title, page_number=page, level=level, pdf_file_id=pdffile.id
+            )
+            for level, title, page in result["toc"]
+        ]
+    await bookmark_service.replace_bookmarks(pdffile.id, items)
+    await status_service.create_site_status(
+        SiteStatusCreate(
+            status_type="BOOKMARKS_END",
+            status_message=message,
+            pdf_file_id=pdffile.id,
+        )
+    )
+    return {
+        "status_message": message,
+        "processed_filename": os.path.basename(output_path),
+        "processed_path": os.path.relpath(os.path.dirname(output_path)),
+        "processed_hash": output_hash,
+        "result": job_result,
+    }
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {
+    JOB_QC: run_qc_job,
+    JOB_BOOKMARKS: run_bookmarks_job,
+}
+
+
+class PDFJobWorker:
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        concurrency: int = config.JOB_WORKER_CONCURRENCY,
+        handlers: Dict[str, JobHandler] = JOB_HANDLERS,
+    ):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency
+        self.handlers = handlers
+        self._stopping = asyncio.Event()
+
+    def stop(self):
+        """
+        Asks the worker to exit once the jobs it is running have finished.
+        """
+        self._stopping.set()
+
+    async def run(self):
+        logger.info(
+            f"PDF job worker {self.worker_id} started with "
+            f"{self.concurrency} slots for {sorted(self.handlers)}"
+        )
+        await asyncio.gather(*(self._loop() for _ in range(self.concurrency)))
+        logger.info(f"PDF job worker {self.worker_id} stopped")
+
+    async def _idle(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _loop(self):
+        job_types = list(self.handlers)
+        while not self._stopping.is_set():
+            try:
+                job = await job_service.claim_job(self.worker_id, job_types)
+            except Exception as e:
+                logger.error(f"Error claiming PDF job: {e}")
+                await self._idle(config.JOB_POLL_INTERVAL)
+                continue
+            if job is None:
+                await self._idle(config.JOB_POLL_INTERVAL)
+                continue
+            await self._process(job)
+
+    async def _heartbeat(self, job: PDFJobRead, work: asyncio.Task) -> bool:
+        """
+        Keeps the job's lock alive while work runs. If another worker has
+        taken the job over, cancels work so this one writes no results for
+        it, and returns True.
+        """
+        interval = max(config.JOB_VISIBILITY_TIMEOUT / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await job_service.extend_lock(job.id, self.worker_id):
+                    logger.warning(f"Lost lock on PDF job {job.id}, abandoning it")
+                    work.cancel()
+                    return True
+            except Exception as e:
+                logger.error(f"Error extending lock on PDF job {job.id}: {e}")
+
+    async def _process(self, job: PDFJobRead):
+        logger.info(
+            f"Running {job.job_type} job {job.id} for file {job.pdf_file_id} "
+            f"(attempt {job.attempts}/{job.max_attempts})"
+        )
+        work = asyncio.create_task(self._run_job(job))
+        heartbeat = asyncio.create_task(self._heartbeat(job, work))
+        started = time.perf_counter()
+        outcome = "failed"
+        try:
+            outcome = await work
+        except asyncio.CancelledError:
+            if not (heartbeat.done() and heartbeat.result()):
+                raise
+            # The job was reclaimed by another worker, which now owns its
+            # file and result
+            outcome = "lost"
+        finally:
+            heartbeat.cancel()
+            metrics.JOB_SECONDS.labels(job.job_type, outcome).observe(
+                time.perf_counter() - started
+            )
+
+    async def _run_job(self, job: PDFJobRead) -> str:
+        pdffile: Optional[PDFFileRead] = None
+        try:
+            if job.attempts > job.max_attempts:
+                # Reclaimed after its worker died on the final attempt
+                raise RuntimeError("Job exceeded max attempts")
+            pdffile = await pdf_file_service.get_pdf_file(job.pdf_file_id)
+            if pdffile is None:
+                raise LookupError(f"PDF file {job.pdf_file_id} not found")
+            await pdf_file_service.start_processing(
+                pdffile.id, f"{job.job_type} processing started."
+            )
+            profile = (
+                profiling.profile_to(
+                    profiling.profile_path(
+                        pdffile.id, f"{job.job_type.lower()}-{job.id}{profiling.PROFILE_SUFFIX}"
+                    )
+                )
+                if job.payload.get("profile", config.PDF_PROFILE)
+                else nullcontext()
+            )
+            with collect() as timings:
+                async with profile:
+                    finish = await self.handlers[job.job_type](job, pdffile)
+            logger.info(
+                f"job id={job.id} type={job.job_type} file={pdffile.id} "
+                f"{timings.log_fields()}"
+            )
+            result = finish.pop("result", None)
+            await pdf_file_service.finish_processing(pdffile.id, "processed", **finish)
+            await job_service.complete_job(job.id, self.worker_id, result)
+            return "done"
+        except Exception as e:
+            logger.error(f"PDF job {job.id} failed: {e}")
+            await self._record_failure(job, pdffile, e)
+            return "failed"
+
+    async def _record_failure(
+        self, job: PDFJobRead, pdffile: Optional[PDFFileRead], error: Exception
+    ):
+        try:
+            failed = await job_service.fail_job(
+                job.id,
+                self.worker_id,
+                str(error),
+                retry=not isinstance(error, PermanentJobError),
+            )
+            if failed is None or pdffile is None:
+                return
+            if failed.status == "failed":
+                await pdf_file_service.finish_processing(
+                    pdffile.id, "failed", f"{job.job_type} failed: {error}"
+                )
+            else:
+                await pdf_file_service.finish_processing(
+                    pdffile.id,
+                    "queued",
+                    f"{job.job_type} failed, retry {failed.attempts + 1} scheduled.",
+                )
+        except Exception as e:
+            logger.error(f"Error recording failure of PDF job {job.id}: {e}")
+
+
+async def main():
+    await init_pool()
+    init_process_pool()
+    if config.WORKER_METRICS_PORT:
+        start_http_server(config.WORKER_METRICS_PORT)
+    worker = PDFJobWorker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await shutdown_process_pool()
+        await close_pool()
+        if metrics.MULTIPROC_DIR:
+            multiprocess.mark_process_dead(os.getpid())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())